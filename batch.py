@@ -0,0 +1,88 @@
+import argparse
+from datetime import datetime
+from typing import List, Optional
+import pandas as pd
+from engine.backtest_engine import BacktestEngine
+from engine.batch import BatchRunner
+from strategy.percentile_strategy import PercentileStrategy
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from config.data_config import DATA_SOURCES
+
+
+def run_batch(strategy_name: str, data_dir: str, start_date: str, end_date: str,
+              symbols: Optional[List[str]] = None, patterns: Optional[List[str]] = None,
+              workers: int = None, chunksize: int = 1, mode: str = 'cerebro',
+              output: str = 'batch_results.csv') -> pd.DataFrame:
+    """
+    批量回测数据目录下的多个标的
+    :param strategy_name: 策略名称
+    :param data_dir: 数据目录
+    :param start_date: 开始日期 (YYYY-MM-DD)
+    :param end_date: 结束日期 (YYYY-MM-DD)
+    :param symbols: 标的代码列表，默认回测目录下的全部文件
+    :param patterns: 文件匹配模式
+    :param workers: 进程数
+    :param chunksize: 每次分发给单个进程的标的数
+    :param mode: 回测模式 ('cerebro' 或 'vectorized')
+    :param output: 汇总结果保存路径 (.csv)
+    :return: 汇总结果表
+    """
+    if strategy_name != 'PercentileStrategy':
+        raise ValueError(f"不支持的策略名称: {strategy_name}")
+
+    runner = BatchRunner(
+        PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'],
+        data_dir=data_dir,
+        initial_cash=BACKTEST_PARAMS['initial_cash'],
+        workers=workers,
+        chunksize=chunksize,
+        mode=mode,
+    )
+
+    def progress(row):
+        if row['error']:
+            print(f"{row['symbol']} 失败: {row['error']}")
+        else:
+            print(f"{row['symbol']} 总收益率: {row['total_return']*100:.2f}%")
+
+    table = runner.run(
+        datetime.strptime(start_date, '%Y-%m-%d'),
+        datetime.strptime(end_date, '%Y-%m-%d'),
+        symbols=symbols,
+        patterns=patterns,
+        output=output,
+        callback=progress,
+    )
+
+    failed = int(table['error'].notna().sum()) if 'error' in table else 0
+    print(f"\n=== 批量回测完成: {len(table)} 个标的, 失败 {failed} 个, 结果已保存到 {output} ===")
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 多标的批量回测')
+    parser.add_argument('--strategy', default='PercentileStrategy')
+    parser.add_argument('--data-dir', default=DATA_SOURCES['excel']['data_dir'])
+    parser.add_argument('--start-date', default='2022-03-22')
+    parser.add_argument('--end-date', default='2025-06-07')
+    parser.add_argument('--symbols', nargs='*', default=None, help='标的代码列表，默认回测目录下的全部文件')
+    parser.add_argument('--pattern', action='append', default=None, help='文件匹配模式，可重复')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--mode', default='cerebro', choices=BacktestEngine.MODES)
+    parser.add_argument('--output', default='batch_results.csv')
+    args = parser.parse_args()
+
+    run_batch(
+        strategy_name=args.strategy,
+        data_dir=args.data_dir,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        symbols=args.symbols,
+        patterns=args.pattern,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        mode=args.mode,
+        output=args.output,
+    )
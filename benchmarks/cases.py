@@ -0,0 +1,146 @@
+import os
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from typing import Dict, Any
+from benchmarks.synthetic import make_ohlcv
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from data.file_loader import FileDataLoader
+from engine.backtest_engine import BacktestEngine
+from engine.optimizer import ParameterOptimizer, grid_params
+from engine.portfolio import PortfolioEngine
+from data.dates import date2num_array
+from indicator.percentile_indicator import PercentileIndicator, percentile_rank
+from strategy.percentile_strategy import PercentileStrategy
+
+# Excel 单个工作表的最大行数
+EXCEL_MAX_ROWS = 1_048_575
+
+# 每个用例在 setup 阶段准备好数据，返回被计时的函数；被计时函数返回本次处理的 bar 数
+# setup 签名: (df, workdir, options) -> Callable[[], int]
+
+
+def _date_range(df: pd.DataFrame):
+    # 年化收益按自然日计算，区间至少为一天
+    start = df.index[0].to_pydatetime()
+    end = max(df.index[-1].to_pydatetime(), start + timedelta(days=1))
+    return start, end
+
+
+def load_excel(df, workdir, options):
+    df.to_excel(os.path.join(workdir, 'bench.xlsx'))
+    loader = FileDataLoader(workdir, use_cache=False)
+    return lambda: len(loader.load_excel('bench.xlsx'))
+
+
+def load_csv(df, workdir, options):
+    df.to_csv(os.path.join(workdir, 'bench.csv'))
+    loader = FileDataLoader(workdir, use_cache=False)
+    return lambda: len(loader.load_csv('bench.csv'))
+
+
+def load_cached(df, workdir, options):
+    df.to_csv(os.path.join(workdir, 'bench.csv'))
+    FileDataLoader(workdir).load_csv('bench.csv')
+    loader = FileDataLoader(workdir)
+    return lambda: len(loader.load_csv('bench.csv'))
+
+
+def indicator_once(df, workdir, options):
+    dates = date2num_array(df.index)
+    closes = df['close'].to_numpy(dtype=np.float64)
+    lookback = STRATEGY_PARAMS['PercentileStrategy']['lookback_days']
+    return lambda: len(percentile_rank(dates, closes, lookback))
+
+
+class _IndicatorOnly(bt.Strategy):
+    params = (('lookback_days', 365),)
+
+    def __init__(self):
+        self.percentile = PercentileIndicator(lookback_days=self.params.lookback_days)
+
+
+def indicator_next(df, workdir, options):
+    lookback = STRATEGY_PARAMS['PercentileStrategy']['lookback_days']
+
+    def run():
+        cerebro = bt.Cerebro(runonce=False, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(_IndicatorOnly, lookback_days=lookback)
+        cerebro.run()
+        return len(df)
+    return run
+
+
+def _engine_run(df, mode):
+    start, end = _date_range(df)
+
+    def run():
+        engine = BacktestEngine(mode=mode)
+        engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+        engine.set_data(df)
+        engine.set_initial_cash(BACKTEST_PARAMS['initial_cash'])
+        engine.run(start, end)
+        return len(df)
+    return run
+
+
+def cerebro_run(df, workdir, options):
+    return _engine_run(df, 'cerebro')
+
+
+def vectorized_run(df, workdir, options):
+    return _engine_run(df, 'vectorized')
+
+
+def sweep(df, workdir, options):
+    start, end = _date_range(df)
+    grid = {
+        'percentile_threshold': [0.005, 0.05, 0.1, 0.2],
+        'profit_threshold': [0.1, 0.2, 0.3],
+        'max_loss_threshold': [0.05, 0.1],
+    }
+    params = grid_params(grid)
+    optimizer = ParameterOptimizer(
+        PercentileStrategy, df, start, end,
+        base_params=STRATEGY_PARAMS['PercentileStrategy'],
+        workers=options.get('workers'),
+        chunksize=options.get('chunksize', 1),
+        mode=options.get('sweep_mode', 'vectorized'),
+    )
+
+    def run():
+        for _ in optimizer.iter_results(params):
+            pass
+        return len(df) * len(params)
+    return run
+
+
+def portfolio(df, workdir, options):
+    # 以 df 的日期为时间轴生成多个合成标的，共享资金同时回测
+    start, end = _date_range(df)
+    symbols = options.get('symbols', 100)
+    data = {f'S{i:04d}': make_ohlcv(len(df), seed=i).set_axis(df.index) for i in range(symbols)}
+    engine = PortfolioEngine(STRATEGY_PARAMS['PercentileStrategy'], initial_cash=BACKTEST_PARAMS['initial_cash'] * symbols)
+    engine.set_data(data)
+
+    def run():
+        engine.run(start, end)
+        return len(df) * symbols
+    return run
+
+
+# 用例名 -> (setup, 默认的最大 bar 数；超过则跳过)
+CASES: Dict[str, Any] = {
+    'load_excel': (load_excel, 100_000),
+    'load_csv': (load_csv, None),
+    'load_cached': (load_cached, None),
+    'indicator_once': (indicator_once, None),
+    'indicator_next': (indicator_next, 1_000_000),
+    'cerebro_run': (cerebro_run, 1_000_000),
+    'vectorized_run': (vectorized_run, None),
+    'sweep': (sweep, 1_000_000),
+    'portfolio': (portfolio, 100_000),
+}
@@ -0,0 +1,85 @@
+import os
+import sys
+import argparse
+from datetime import timedelta
+from typing import Dict, Any, List
+
+# 允许以 python benchmarks/drift.py 方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from benchmarks.synthetic import make_ohlcv
+from config.backtest_config import BACKTEST_PARAMS
+from config.strategy_config import STRATEGY_PARAMS
+from data.compact import CompactBars, PRICE_DTYPES
+from data.file_loader import FileDataLoader
+from engine.backtest_engine import BacktestEngine
+from strategy import trade_log
+from strategy.percentile_strategy import PercentileStrategy
+
+
+def _run(data, mode: str) -> Dict[str, Any]:
+    start = data.index[0].to_pydatetime()
+    end = max(data.index[-1].to_pydatetime(), start + timedelta(days=1))
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, {**STRATEGY_PARAMS['PercentileStrategy'], 'log_level': trade_log.OFF})
+    engine.set_data(data)
+    engine.set_initial_cash(BACKTEST_PARAMS['initial_cash'])
+    return engine.run(start, end)
+
+
+def drift(df: pd.DataFrame, modes=('cerebro', 'vectorized'), price_dtypes=PRICE_DTYPES,
+          price_scale: int = 10000) -> List[Dict[str, Any]]:
+    """
+    比较紧凑存储与 float64 DataFrame 的回测结果
+    :param df: 行情数据
+    :param modes: 回测模式
+    :param price_dtypes: 紧凑存储的价格类型
+    :param price_scale: int32 价格的放大倍数
+    :return: 每个 (模式, 价格类型) 一行：最终资金的相对误差、最大回撤的绝对误差、成交记录是否一致
+    """
+    rows = []
+    for mode in modes:
+        reference = _run(df, mode)
+        for price_dtype in price_dtypes:
+            bars = CompactBars.from_frame(df, price_dtype=price_dtype, price_scale=price_scale)
+            result = _run(bars, mode)
+            rows.append({
+                'mode': mode,
+                'price_dtype': price_dtype,
+                'final_value': result['final_value'],
+                'reference_final_value': reference['final_value'],
+                'final_value_drift': abs(result['final_value'] - reference['final_value']) / reference['final_value'],
+                'max_drawdown_drift': abs(result['max_drawdown'] - reference['max_drawdown']),
+                'trades': len(result['trades']),
+                'same_trades': result['trades'] == reference['trades'],
+            })
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='紧凑存储（float32 / int32）与 float64 的回测结果误差检查')
+    parser.add_argument('--data-file', default=None, help='data 目录下的 .xlsx / .csv 文件，默认使用合成数据')
+    parser.add_argument('--bars', type=int, default=5000, help='合成数据的 bar 数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--modes', nargs='*', default=['cerebro', 'vectorized'], choices=BacktestEngine.MODES)
+    parser.add_argument('--price-scale', type=int, default=10000)
+    parser.add_argument('--tolerance', type=float, default=1e-3, help='最终资金允许的相对误差')
+    parser.add_argument('--exact', nargs='*', default=['int32'], choices=list(PRICE_DTYPES),
+                        help='要求成交记录与 float64 完全一致的价格类型')
+    args = parser.parse_args()
+
+    if args.data_file:
+        loader = FileDataLoader()
+        frame = loader.load_excel(args.data_file) if args.data_file.endswith('.xlsx') else loader.load_csv(args.data_file)
+    else:
+        frame = make_ohlcv(args.bars, seed=args.seed)
+
+    report = pd.DataFrame(drift(frame, args.modes, price_scale=args.price_scale))
+    print(report.to_string(index=False))
+    failed = report[(report['final_value_drift'] > args.tolerance)
+                    | (report['price_dtype'].isin(args.exact) & ~report['same_trades'])]
+    if len(failed):
+        print(f'\n{len(failed)} 项超出允许误差')
+        sys.exit(1)
+    print(f'\n全部在允许误差内（最终资金相对误差 <= {args.tolerance:g}）')
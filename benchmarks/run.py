@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# 允许以 python benchmarks/run.py 方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import CASES, EXCEL_MAX_ROWS
+from benchmarks.synthetic import make_ohlcv, MAX_DAILY_BARS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def _peak_rss(who: int = resource.RUSAGE_SELF) -> int:
+    # Linux 下 ru_maxrss 的单位为 KB，macOS 下为字节
+    # RUSAGE_CHILDREN 是已结束子进程中最大的一个的峰值（不是总和），sweep 用例的工作进程计入这里
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_case(case: str, bars: int, freq: str, repeat: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在独立进程中运行单个用例，保证峰值内存互不影响
+    """
+    setup, _ = CASES[case]
+    df = make_ohlcv(bars, freq, seed=options.get('seed', 0))
+    with tempfile.TemporaryDirectory() as workdir:
+        # 用例的临时文件都写在 workdir 下
+        func = setup(df, workdir, options)
+        times = []
+        processed = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            processed = func()
+            times.append(time.perf_counter() - start)
+
+    wall = min(times)
+    return {
+        'case': case,
+        'bars': bars,
+        'freq': freq,
+        'wall_time': wall,
+        'wall_times': times,
+        'peak_rss': _peak_rss(),
+        'peak_rss_children': _peak_rss(resource.RUSAGE_CHILDREN),
+        'bars_per_sec': processed / wall if wall > 0 else float('inf'),
+    }
+
+
+def run_benchmarks(cases: List[str], sizes: List[int], freqs: List[str], repeat: int = 3,
+                   max_bars: Optional[Dict[str, int]] = None,
+                   options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    运行基准测试
+    :param cases: 用例名列表
+    :param sizes: 数据长度列表
+    :param freqs: 数据频率列表（'daily' / 'minute'）
+    :param repeat: 每个用例的重复次数，取最短耗时
+    :param max_bars: 各用例允许的最大 bar 数，覆盖默认值
+    :param options: 传给用例的额外参数（workers, chunksize, sweep_mode, symbols, seed）
+    :return: 结果，含环境信息和每个用例的耗时、峰值内存、吞吐量
+    """
+    options = options or {}
+    limits = {case: CASES[case][1] for case in cases}
+    limits.update(max_bars or {})
+
+    results = []
+    context = mp.get_context('spawn')
+    for freq in freqs:
+        for bars in sizes:
+            for case in cases:
+                limit = limits.get(case)
+                if case == 'load_excel':
+                    limit = min(limit or EXCEL_MAX_ROWS, EXCEL_MAX_ROWS)
+                if freq == 'daily':
+                    limit = min(limit or MAX_DAILY_BARS, MAX_DAILY_BARS)
+                key = f'{case}/{freq}/{bars}'
+                if limit is not None and bars > limit:
+                    print(f'{key:<32} 跳过（超过 {limit:,} bars）')
+                    continue
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(_run_case, case, bars, freq, repeat, options).result()
+                results.append(result)
+                line = (f"{key:<32} {result['wall_time']:>10.4f}s {result['bars_per_sec']:>14,.0f} bars/s "
+                        f"{result['peak_rss'] / 2 ** 20:>8.1f} MB")
+                if result['peak_rss_children']:
+                    line += f" (子进程 {result['peak_rss_children'] / 2 ** 20:.1f} MB)"
+                print(line)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    与基线比较吞吐量，低于基线 (1 - threshold) 倍视为性能回退
+    :param current: 本次结果
+    :param baseline: 基线结果
+    :param threshold: 允许的下降比例
+    :return: 回退的用例列表
+    """
+    reference = {(r['case'], r['freq'], r['bars']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = reference.get((result['case'], result['freq'], result['bars']))
+        if base is None:
+            continue
+        ratio = result['bars_per_sec'] / base['bars_per_sec']
+        if ratio < 1 - threshold:
+            regressions.append({
+                'case': result['case'],
+                'freq': result['freq'],
+                'bars': result['bars'],
+                'baseline_bars_per_sec': base['bars_per_sec'],
+                'bars_per_sec': result['bars_per_sec'],
+                'ratio': ratio,
+            })
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='加载器、指标、策略和引擎的基准测试')
+    parser.add_argument('--cases', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--sizes', nargs='*', type=int, default=[10_000, 100_000])
+    parser.add_argument('--freqs', nargs='*', default=['daily', 'minute'], choices=['daily', 'minute'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-bars', action='append', default=[], help='case=N，覆盖用例的最大 bar 数')
+    parser.add_argument('--workers', type=int, default=None, help='sweep 用例的进程数')
+    parser.add_argument('--chunksize', type=int, default=1, help='sweep 用例的 chunksize')
+    parser.add_argument('--sweep-mode', default='vectorized', choices=['cerebro', 'vectorized'])
+    parser.add_argument('--symbols', type=int, default=100, help='portfolio 用例的标的数')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的吞吐量下降比例')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--require-baseline', action='store_true', help='找不到基线时以非零状态退出（CI 使用）')
+    args = parser.parse_args()
+
+    max_bars = {}
+    for item in args.max_bars:
+        case, _, value = item.partition('=')
+        max_bars[case] = int(value)
+
+    current = run_benchmarks(
+        args.cases, args.sizes, args.freqs, repeat=args.repeat, max_bars=max_bars,
+        options={'workers': args.workers, 'chunksize': args.chunksize, 'sweep_mode': args.sweep_mode,
+                 'symbols': args.symbols},
+    )
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    print(f'\n结果已保存到 {args.output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f'基线已保存到 {args.baseline}')
+    elif not os.path.exists(args.baseline):
+        print(f'找不到基线 {args.baseline}，未做回退检查；用 --save-baseline 在当前机器上生成基线')
+        if args.require_baseline:
+            sys.exit(2)
+    else:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        compared = {(b['case'], b['freq'], b['bars']) for b in baseline['results']}
+        if not any((r['case'], r['freq'], r['bars']) in compared for r in current['results']):
+            print('基线中没有与本次相同的用例/频率/长度，未做回退检查')
+            if args.require_baseline:
+                sys.exit(2)
+        for r in regressions:
+            print(f"性能回退 {r['case']}/{r['freq']}/{r['bars']}: "
+                  f"{r['baseline_bars_per_sec']:,.0f} -> {r['bars_per_sec']:,.0f} bars/s ({r['ratio']:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f'与基线相比无性能回退（阈值 {args.threshold:.0%}）')
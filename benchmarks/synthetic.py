@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# 分钟线每个交易日的 bar 数（A 股 4 小时交易）
+MINUTES_PER_DAY = 240
+
+# 日线从默认起始日期起、在纳秒时间戳范围内（至 2262 年）最多能生成的 bar 数
+MAX_DAILY_BARS = int(np.busday_count('2000-01-03', '2262-04-11'))
+
+
+def make_ohlcv(n: int, freq: str = 'daily', seed: int = 0, start: str = '2000-01-03') -> pd.DataFrame:
+    """
+    生成合成的 OHLCV 数据，收盘价为几何随机游走，列和索引与 FileDataLoader 的输出一致
+    :param n: bar 数量
+    :param freq: 'daily'（工作日日线）或 'minute'（每个工作日 240 根分钟线）
+    :param seed: 随机种子
+    :param start: 起始日期
+    :return: 以 day 为索引的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    if freq == 'daily':
+        index = pd.bdate_range(start, periods=n)
+        volatility = 0.02
+    elif freq == 'minute':
+        days = pd.bdate_range(start, periods=-(-n // MINUTES_PER_DAY))
+        offsets = pd.Timedelta(hours=9, minutes=30) + pd.to_timedelta(np.arange(MINUTES_PER_DAY), unit='min')
+        index = pd.DatetimeIndex((days.values[:, None] + offsets.values[None, :]).ravel()[:n])
+        volatility = 0.02 / np.sqrt(MINUTES_PER_DAY)
+    else:
+        raise ValueError(f"不支持的频率: {freq}")
+
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, volatility, n))), 2)
+    spread = np.abs(rng.normal(0, volatility, (3, n)))
+    open_ = np.round(close * (1 + rng.normal(0, volatility / 2, n)), 2)
+    high = np.round(np.maximum(open_, close) * (1 + spread[0]), 2)
+    low = np.round(np.minimum(open_, close) * (1 - spread[1]), 2)
+    volume = rng.integers(1_000, 1_000_000, n)
+
+    df = pd.DataFrame({
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+    }, index=index)
+    df.index.name = 'day'
+    return df
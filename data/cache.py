@@ -0,0 +1,206 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Any, Optional
+from config.data_config import DATA_SOURCES
+
+
+class DataCache:
+    """
+    文件数据的列式磁盘缓存
+    首次加载 .xlsx / .csv 时把解析结果按列保存为 .npy 文件，之后以内存映射方式读取
+    缓存以文件的修改时间 + 大小快速校验，不一致时再比较内容哈希，哈希相同则仍然命中
+    """
+
+    META_FILE = 'meta.json'
+    HASH_CHUNK = 1 << 20
+
+    def __init__(self, cache_dir: str):
+        """
+        初始化缓存
+        :param cache_dir: 缓存目录
+        """
+        self.cache_dir = cache_dir
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_read': 0, 'bytes_written': 0}
+
+    def load(self, file_path: str, reader: Callable[[], pd.DataFrame], **read_params) -> pd.DataFrame:
+        """
+        读取文件数据，命中缓存时直接映射列文件，否则调用 reader 解析并写入缓存
+        :param file_path: 源文件路径
+        :param reader: 解析源文件的函数
+        :param read_params: 解析参数，参与缓存校验
+        :return: DataFrame
+        """
+        entry = self._entry_dir(file_path, read_params)
+        stat = os.stat(file_path)
+        meta = self._read_meta(entry)
+        digest = None
+
+        if meta is not None and meta['params'] == read_params:
+            if meta['mtime_ns'] != stat.st_mtime_ns or meta['size'] != stat.st_size:
+                digest = self.file_hash(file_path)
+                if digest == meta['sha256']:
+                    # 内容未变，仅更新修改时间
+                    meta['mtime_ns'] = stat.st_mtime_ns
+                    meta['size'] = stat.st_size
+                    self._write_meta(entry, meta)
+                else:
+                    meta = None
+            if meta is not None:
+                df = self._read_entry(entry, meta)
+                if df is not None:
+                    self.stats['hits'] += 1
+                    return df
+
+        self.stats['misses'] += 1
+        df = reader()
+        self._write_entry(entry, df, {
+            'source': os.path.abspath(file_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest or self.file_hash(file_path),
+            'params': read_params,
+        })
+        return df
+
+    def clear(self):
+        """
+        删除全部缓存
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    @classmethod
+    def file_hash(cls, file_path: str) -> str:
+        """
+        计算文件内容的 SHA-256
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_dir(self, file_path: str, read_params: Dict[str, Any]) -> str:
+        key = json.dumps([os.path.abspath(file_path), read_params], sort_keys=True, default=str)
+        name = os.path.basename(file_path)
+        return os.path.join(self.cache_dir, f'{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}')
+
+    def _read_meta(self, entry: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(entry, self.META_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry: str, meta: Dict[str, Any]):
+        tmp_path = os.path.join(entry, f'{self.META_FILE}.{os.getpid()}')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(entry, self.META_FILE))
+
+    def _read_entry(self, entry: str, meta: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        try:
+            index = self._load_array(entry, 'index.npy')
+            columns = {
+                column['name']: self._load_array(entry, column['file'])
+                for column in meta['columns']
+            }
+        except (OSError, ValueError):
+            return None
+
+        if meta['index_kind'] == 'datetime':
+            index = pd.DatetimeIndex(index, name=meta['index_name'])
+        else:
+            index = pd.Index(index, name=meta['index_name'])
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def _load_array(self, entry: str, file_name: str) -> np.ndarray:
+        path = os.path.join(entry, file_name)
+        self.stats['bytes_read'] += os.path.getsize(path)
+        try:
+            # 写时复制：返回的 DataFrame 可以修改，修改不会写回缓存文件；
+            # 转成普通 ndarray 视图，避免 memmap 子类泄漏到列里
+            return np.load(path, mmap_mode='c').view(np.ndarray)
+        except ValueError:
+            # object 列无法内存映射
+            return np.load(path, allow_pickle=True)
+
+    def _write_entry(self, entry: str, df: pd.DataFrame, meta: Dict[str, Any]):
+        # 先写入临时目录再整体替换，避免并发加载读到写了一半的缓存
+        tmp_entry = f'{entry}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+
+        written = self._save_array(tmp_entry, 'index.npy', df.index.to_numpy())
+        columns = []
+        for i, name in enumerate(df.columns):
+            file_name = f'col_{i}.npy'
+            written += self._save_array(tmp_entry, file_name, df[name].to_numpy())
+            columns.append({'name': name, 'file': file_name})
+
+        meta.update(
+            index_name=df.index.name,
+            index_kind='datetime' if isinstance(df.index, pd.DatetimeIndex) else 'other',
+            columns=columns,
+            length=len(df),
+        )
+        self._write_meta(tmp_entry, meta)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # 其他进程已写入同一缓存
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+        self.stats['bytes_written'] += written
+
+    @staticmethod
+    def _save_array(entry: str, file_name: str, values: np.ndarray) -> int:
+        path = os.path.join(entry, file_name)
+        np.save(path, values, allow_pickle=values.dtype == object)
+        return os.path.getsize(path)
+
+
+def warm_cache(data_dir: str = 'data', patterns=None) -> Dict[str, Any]:
+    """
+    批量预转换目录下的数据文件
+    :param data_dir: 数据目录
+    :param patterns: 文件匹配模式，默认使用 DATA_SOURCES 中 excel / csv 的 file_pattern
+    :return: 缓存统计
+    """
+    from .file_loader import FileDataLoader
+
+    if patterns is None:
+        patterns = [DATA_SOURCES['excel']['file_pattern'], DATA_SOURCES['csv']['file_pattern']]
+    loader = FileDataLoader(data_dir)
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(data_dir, pattern))):
+            file_name = os.path.relpath(path, data_dir)
+            try:
+                if file_name.endswith('.xlsx'):
+                    loader.load_excel(file_name)
+                elif file_name.endswith('.csv'):
+                    loader.load_csv(file_name)
+            except Exception as e:
+                print(f"缓存失败 {file_name}: {e}")
+    return loader.cache.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='数据文件缓存')
+    parser.add_argument('command', choices=['warm', 'clear'])
+    parser.add_argument('data_dir', nargs='?', default=DATA_SOURCES['excel']['data_dir'])
+    args = parser.parse_args()
+
+    if args.command == 'warm':
+        stats = warm_cache(args.data_dir)
+        print(f"命中: {stats['hits']}, 转换: {stats['misses']}, 写入: {stats['bytes_written']:,} 字节")
+    else:
+        from .file_loader import FileDataLoader
+        FileDataLoader(args.data_dir).cache.clear()
@@ -0,0 +1,230 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, Iterable, Union
+from .dates import date2num_array
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+COLUMNS = PRICE_COLUMNS + ('volume',)
+# 紧凑存储的价格类型：float32，或按 price_scale 放大后取整的 int32
+PRICE_DTYPES = ('float32', 'int32')
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class _PositionIndexer:
+    """
+    CompactBars.iloc：按位置切片，返回共享底层数组的视图
+    """
+
+    def __init__(self, bars: 'CompactBars'):
+        self.bars = bars
+
+    def __getitem__(self, key: slice) -> 'CompactBars':
+        if not isinstance(key, slice):
+            raise ValueError("CompactBars.iloc only supports slices")
+        bars = self.bars
+        return CompactBars(bars.timestamps[key], bars.prices[key], bars.volume[key],
+                           price_scale=bars.price_scale, symbol=bars.symbol)
+
+
+class CompactBars:
+    """
+    紧凑的行情数据
+    时间戳为 int64（纳秒），价格为连续的 (n, 4) float32 数组或按 price_scale 放大的 int32 数组，成交量为 float32；
+    只实现引擎用到的 DataFrame 接口（index / iloc / 按列名取值），切片不复制数据，
+    cerebro 模式下由 CompactData 直接从数组逐 bar 供数，不经过 DataFrame
+    """
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray, volume: np.ndarray,
+                 price_scale: Optional[int] = None, symbol: Optional[str] = None):
+        """
+        :param timestamps: int64 纳秒时间戳，升序
+        :param prices: (n, 4) 的 open / high / low / close 数组
+        :param volume: 成交量
+        :param price_scale: int32 价格的放大倍数，float32 价格时为 None
+        :param symbol: 标的代码
+        """
+        if not (len(timestamps) == len(prices) == len(volume)):
+            raise ValueError("timestamps, prices and volume must have the same length")
+        self.timestamps = timestamps
+        self.prices = prices
+        self.volume = volume
+        self.price_scale = price_scale
+        self.symbol = symbol
+        self._index = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, price_dtype: str = 'float32', price_scale: int = 10000,
+                   symbol: Optional[str] = None) -> 'CompactBars':
+        """
+        从 DataFrame 转换
+        :param df: 含 open / high / low / close / volume 列、以日期为索引的 DataFrame
+        :param price_dtype: 'float32'，或 'int32'（价格乘以 price_scale 后取整，小数位不超过 log10(price_scale) 时无损）
+        :param price_scale: int32 价格的放大倍数
+        :param symbol: 标的代码
+        :return: CompactBars
+        """
+        if price_dtype not in PRICE_DTYPES:
+            raise ValueError(f"不支持的价格类型: {price_dtype}")
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        timestamps = pd.DatetimeIndex(df.index).as_unit('ns').asi8.copy()
+        prices = df[list(PRICE_COLUMNS)].to_numpy(dtype=np.float64)
+        if price_dtype == 'float32':
+            prices = np.ascontiguousarray(prices, dtype=np.float32)
+            price_scale = None
+        else:
+            if np.isnan(prices).any():
+                raise ValueError("int32 prices cannot represent NaN")
+            scaled = np.rint(prices * price_scale)
+            if len(scaled) and np.abs(scaled).max() > INT32_MAX:
+                raise ValueError(f"价格乘以 {price_scale} 后超出 int32 范围")
+            prices = np.ascontiguousarray(scaled, dtype=np.int32)
+        volume = df['volume'].to_numpy(dtype=np.float32)
+        return cls(timestamps, prices, volume, price_scale=price_scale, symbol=symbol)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """
+        日期索引（时间戳数组的视图）
+        """
+        if self._index is None:
+            self._index = pd.DatetimeIndex(self.timestamps.view('datetime64[ns]'), name='day', copy=False)
+        return self._index
+
+    @property
+    def iloc(self) -> _PositionIndexer:
+        return _PositionIndexer(self)
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(COLUMNS)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        按列名取值，价格列为 float32 视图；int32 价格时还原为 float64
+        """
+        if name == 'volume':
+            return self.volume
+        values = self.prices[:, PRICE_COLUMNS.index(name)]
+        if self.price_scale is None:
+            return values
+        return values / self.price_scale
+
+    def __getitem__(self, name: str) -> pd.Series:
+        return pd.Series(self.column(name), name=name, copy=False)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        转为 float64 的 DataFrame（供需要完整 DataFrame 的组件使用）
+        """
+        return pd.DataFrame({name: self.column(name).astype(np.float64) for name in COLUMNS},
+                            index=self.index.copy())
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.prices.nbytes + self.volume.nbytes
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        内存占用：本对象的字节数，以及同样数据以 float64 DataFrame 存储时的字节数
+        """
+        n = len(self)
+        # float64 DataFrame：5 列 float64 + int64 日期索引
+        float64_bytes = n * 8 * (len(COLUMNS) + 1)
+        return {
+            'symbol': self.symbol,
+            'bars': n,
+            'price_dtype': self.prices.dtype.name,
+            'bytes': self.nbytes,
+            'bytes_per_bar': self.nbytes / n if n else 0.0,
+            'float64_bytes': float64_bytes,
+            'ratio': self.nbytes / float64_bytes if n else 0.0,
+        }
+
+
+def memory_report(data: Union[Dict[str, Any], Iterable[Any]]) -> pd.DataFrame:
+    """
+    各标的行情数据的内存占用
+    :param data: {标的: CompactBars 或 DataFrame}，或 CompactBars 列表
+    :return: 每个标的一行（symbol / bars / price_dtype / bytes / bytes_per_bar / float64_bytes / ratio），末行为合计
+    """
+    items = data.items() if isinstance(data, dict) else ((getattr(bars, 'symbol', None), bars) for bars in data)
+    rows = []
+    for symbol, bars in items:
+        if isinstance(bars, CompactBars):
+            row = bars.memory_report()
+        else:
+            n = len(bars)
+            nbytes = int(bars.memory_usage(index=True, deep=True).sum())
+            float64_bytes = n * 8 * (len(COLUMNS) + 1)
+            row = {
+                'price_dtype': 'float64',
+                'bars': n,
+                'bytes': nbytes,
+                'bytes_per_bar': nbytes / n if n else 0.0,
+                'float64_bytes': float64_bytes,
+                'ratio': nbytes / float64_bytes if n else 0.0,
+            }
+        row['symbol'] = symbol
+        rows.append(row)
+
+    report = pd.DataFrame(rows, columns=['symbol', 'bars', 'price_dtype', 'bytes', 'bytes_per_bar',
+                                         'float64_bytes', 'ratio'])
+    if rows:
+        total = {
+            'symbol': 'total',
+            'bars': report['bars'].sum(),
+            'price_dtype': '',
+            'bytes': report['bytes'].sum(),
+            'float64_bytes': report['float64_bytes'].sum(),
+        }
+        total['bytes_per_bar'] = total['bytes'] / total['bars'] if total['bars'] else 0.0
+        total['ratio'] = total['bytes'] / total['float64_bytes'] if total['float64_bytes'] else 0.0
+        report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    return report
+
+
+class CompactData(bt.feed.DataBase):
+    """
+    从 CompactBars 的数组逐 bar 供数的 backtrader 数据源，不经过 DataFrame
+    """
+    params = (
+        ('bars', None),
+    )
+
+    def start(self):
+        super().start()
+        if self.p.bars is None:
+            raise ValueError("CompactData requires bars")
+        self._idx = 0
+        # 运行期间临时转换浮点日期，结束时释放
+        self._dates = date2num_array(self.p.bars.index)
+
+    def stop(self):
+        self._dates = None
+        super().stop()
+
+    def _load(self):
+        bars = self.p.bars
+        i = self._idx
+        if i >= len(bars):
+            return False
+        self._idx = i + 1
+
+        open_, high, low, close = bars.prices[i].tolist()
+        if bars.price_scale is not None:
+            scale = bars.price_scale
+            open_, high, low, close = open_ / scale, high / scale, low / scale, close / scale
+        lines = self.lines
+        lines.datetime[0] = self._dates[i]
+        lines.open[0] = open_
+        lines.high[0] = high
+        lines.low[0] = low
+        lines.close[0] = close
+        lines.volume[0] = float(bars.volume[i])
+        lines.openinterest[0] = 0.0
+        return True
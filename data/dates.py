@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+def date2num_array(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    向量化的 bt.date2num：把 DatetimeIndex 转为 backtrader 的浮点日期
+    与 date2num 相同，按 (序数日, 时, 分, 秒, 微秒) 分项求和，使用补偿求和保证与 math.fsum 一致
+    :param index: 日期索引
+    :return: 浮点日期数组
+    """
+    index = pd.DatetimeIndex(index).as_unit('ns')
+    ordinal = (index.normalize().asi8 // NS_PER_DAY + 719163).astype(np.float64)
+    parts = (
+        index.hour.to_numpy() / 24.0,
+        index.minute.to_numpy() / 1440.0,
+        index.second.to_numpy() / 86400.0,
+        index.microsecond.to_numpy() / 86400000000.0,
+    )
+    total = ordinal
+    error = np.zeros(len(index))
+    for part in parts:
+        # ordinal 远大于各分项，(total - s) + part 为精确的舍入误差
+        s = total + part
+        error += (total - s) + part
+        total = s
+    return total + error
+
+
+def num2date_array(dates: np.ndarray) -> pd.DatetimeIndex:
+    """
+    向量化的 bt.num2date：把 backtrader 的浮点日期转为 DatetimeIndex
+    与 num2date 相同，按时、分、秒逐级取整，微秒部分小于 10 或大于 999990 时按舍入误差处理
+    :param dates: 浮点日期数组
+    :return: 日期索引
+    """
+    dates = np.asarray(dates, dtype=np.float64)
+    days = np.trunc(dates)
+    hour, remainder = np.divmod((dates - days) * 24.0, 1)
+    minute, remainder = np.divmod(remainder * 60.0, 1)
+    second, remainder = np.divmod(remainder * 60.0, 1)
+    micro = (remainder * 1e6).astype(np.int64)
+    micro[micro < 10] = 0
+    micros = ((days.astype(np.int64) - 719163) * 86400 + hour.astype(np.int64) * 3600
+              + minute.astype(np.int64) * 60 + second.astype(np.int64)) * 1000000 + micro
+    # 接近整秒时进位
+    micros[micro > 999990] += 1000000 - micro[micro > 999990]
+    return pd.DatetimeIndex(micros * 1000)
@@ -1,31 +1,37 @@
-import requests
-import pandas as pd
+import argparse
+from data.downloader import MarketDataDownloader
 
-# 定义接口 URL 和请求头
-url = 'https://stockdata.market.alicloudapi.com/hk/kline?symbol=09888&type=240&limit=3650'
-headers = {
-    'Authorization': 'APPCODE ce4ac5ac06e145e69bc699b3450cb769'
-}
+# 批量下载 K 线数据，默认增量更新到 data/<标的代码>.csv
+# 用法: python -m data.download 09888 00700 --concurrency 16 --rate-limit 20
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量下载 K 线数据')
+    parser.add_argument('symbols', nargs='*', default=['09888'])
+    parser.add_argument('--symbols-file', default=None, help='每行一个标的代码的文件')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--market', default='hk')
+    parser.add_argument('--type', type=int, default=240, help='K 线周期（分钟），240 为日线')
+    parser.add_argument('--limit', type=int, default=3650)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate-limit', type=float, default=None, help='每秒最多请求数')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--full', action='store_true', help='全量下载并覆盖本地文件')
+    args = parser.parse_args()
 
-# 发送 GET 请求
-response = requests.get(url, headers=headers)
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        with open(args.symbols_file, encoding='utf-8') as f:
+            symbols = [line.strip() for line in f if line.strip()]
 
-# 检查请求是否成功
-if response.status_code == 200:
-    data = response.json()
-    
-    # 检查返回的代码
-    if data['code'] == 1:
-        # 提取数据
-        kline_data = data['data']
-        
-        # 将数据转换为 DataFrame
-        df = pd.DataFrame(kline_data)
-        
-        # 保存为 Excel 文件
-        df.to_excel('stock_data.xlsx', index=False)
-        print("数据已成功保存为 stock_data.xlsx")
-    else:
-        print("错误信息:", data['message'])
-else:
-    print("请求失败，状态码:", response.status_code)
+    downloader = MarketDataDownloader(
+        data_dir=args.data_dir,
+        market=args.market,
+        kline_type=args.type,
+        limit=args.limit,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        retries=args.retries,
+    )
+    summary = downloader.run(symbols, incremental=not args.full)
+    print(summary.to_string(index=False))
+    failed = summary['error'].notna().sum()
+    print(f"数据已保存到 {args.data_dir}，成功 {len(summary) - failed} 个，失败 {failed} 个")
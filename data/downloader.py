@@ -0,0 +1,231 @@
+import os
+import math
+import random
+import asyncio
+import aiohttp
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable
+from .api_loader import APIDataLoader
+from config.data_config import DATA_SOURCES
+
+# 单个交易日的最长交易分钟数（港股），用于估算增量下载所需的 K 线数量
+TRADING_MINUTES_PER_DAY = 330
+
+
+class RateLimiter:
+    """
+    简单的异步限速器：保证相邻两次请求的间隔不小于 1 / rate 秒
+    """
+
+    def __init__(self, rate: Optional[float]):
+        """
+        :param rate: 每秒最多请求数，None 表示不限速
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class DownloadError(Exception):
+    """
+    接口返回错误或重试后仍失败
+    """
+
+
+class MarketDataDownloader:
+    """
+    异步批量下载 K 线数据
+    使用连接池并发请求多个标的，支持限速、指数退避重试和增量更新；
+    数据经 APIDataLoader.load_api_data 转换校验后按标的保存为 CSV（<标的代码>.csv，索引列 day）
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, data_dir: str = "data", api_config: Dict[str, Any] = None,
+                 market: str = 'hk', kline_type: int = 240, limit: int = 3650,
+                 concurrency: int = 8, rate_limit: Optional[float] = None,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 30):
+        """
+        初始化下载器
+        :param data_dir: 数据保存目录
+        :param api_config: API配置（base_url, headers），默认使用 DATA_SOURCES['api']
+        :param market: 市场路径，如 'hk'
+        :param kline_type: K 线周期（分钟），240 为日线
+        :param limit: 全量下载时的 K 线数量
+        :param concurrency: 最大并发请求数（同时也是连接池大小）
+        :param rate_limit: 每秒最多请求数，None 表示不限速
+        :param retries: 失败后的最大重试次数
+        :param backoff: 首次重试的等待秒数，之后按 2 倍递增
+        :param timeout: 单次请求超时秒数
+        """
+        self.data_dir = data_dir
+        self.api_config = api_config or DATA_SOURCES['api']
+        self.market = market
+        self.kline_type = kline_type
+        self.limit = limit
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.loader = APIDataLoader(data_dir, self.api_config)
+
+    def file_path(self, symbol: str) -> str:
+        """
+        标的在本地保存的文件路径
+        """
+        return os.path.join(self.data_dir, f'{symbol}.csv')
+
+    def run(self, symbols: Iterable[str], incremental: bool = True) -> pd.DataFrame:
+        """
+        同步入口：下载多个标的
+        :param symbols: 标的代码列表
+        :param incremental: 是否只下载本地最后日期之后的数据
+        :return: 下载汇总表，每行一个标的
+        """
+        return asyncio.run(self.download(symbols, incremental))
+
+    async def download(self, symbols: Iterable[str], incremental: bool = True) -> pd.DataFrame:
+        """
+        并发下载多个标的，单个标的失败不影响其他标的
+        :param symbols: 标的代码列表
+        :param incremental: 是否只下载本地最后日期之后的数据
+        :return: 下载汇总表，每行一个标的
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.rate_limit)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=self.api_config.get('headers')) as session:
+            async def worker(symbol):
+                async with semaphore:
+                    try:
+                        return await self.download_symbol(session, limiter, symbol, incremental)
+                    except Exception as e:
+                        return {'symbol': symbol, 'rows': 0, 'last_date': None,
+                                'error': f'{type(e).__name__}: {e}'}
+
+            rows = await asyncio.gather(*(worker(symbol) for symbol in symbols))
+        return pd.DataFrame(rows, columns=['symbol', 'rows', 'last_date', 'error'])
+
+    async def download_symbol(self, session: aiohttp.ClientSession, limiter: RateLimiter,
+                              symbol: str, incremental: bool = True) -> Dict[str, Any]:
+        """
+        下载单个标的并写入本地文件
+        :return: {'symbol', 'rows'（新增行数）, 'last_date', 'error'}
+        """
+        path = self.file_path(symbol)
+        last_date = self.last_stored_date(path) if incremental else None
+        limit = self.limit if last_date is None else self._incremental_limit(last_date)
+
+        payload = await self.fetch(session, limiter, symbol, limit)
+        df = self.loader.load_api_data(payload)
+        df = self._normalize(df)
+        if last_date is not None:
+            df = df[df.index > last_date]
+            self._append(path, df)
+        else:
+            df.to_csv(path, index_label='day')
+
+        stored_last = df.index[-1] if len(df) else last_date
+        return {'symbol': symbol, 'rows': len(df), 'last_date': stored_last, 'error': None}
+
+    async def fetch(self, session: aiohttp.ClientSession, limiter: RateLimiter,
+                    symbol: str, limit: int) -> Dict[str, Any]:
+        """
+        请求 K 线接口，网络错误、超时和 429/5xx 按指数退避重试
+        :return: 接口返回的 JSON
+        """
+        url = f"{self.api_config['base_url']}/{self.market}/kline"
+        params = {'symbol': symbol, 'type': self.kline_type, 'limit': limit}
+        for attempt in range(self.retries + 1):
+            await limiter.wait()
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status in self.RETRY_STATUS:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason)
+                    if response.status != 200:
+                        raise DownloadError(f"请求失败，状态码: {response.status}")
+                    data = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random() * 0.1))
+                continue
+
+            if data.get('code') != 1:
+                raise DownloadError(f"错误信息: {data.get('message')}")
+            return data
+
+    @staticmethod
+    def last_stored_date(path: str) -> Optional[pd.Timestamp]:
+        """
+        读取本地文件最后一行的日期，只读取文件末尾，不解析整个文件
+        :param path: 文件路径
+        :return: 最后日期，文件不存在或为空时返回 None
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            size = min(end, 4096)
+            f.seek(end - size)
+            lines = f.read(size).decode('utf-8').strip().splitlines()
+        if len(lines) < 2 and size == end:
+            # 只有表头
+            return None
+        try:
+            return pd.Timestamp(lines[-1].split(',')[0])
+        except ValueError:
+            return None
+
+    def _incremental_limit(self, last_date: pd.Timestamp) -> int:
+        # 按自然日估算最后日期之后最多可能有多少根 K 线，多取一根用于对齐
+        days = max((datetime.now() - last_date.to_pydatetime()).days, 0) + 1
+        bars_per_day = max(1, math.ceil(TRADING_MINUTES_PER_DAY / self.kline_type))
+        return min(self.limit, days * bars_per_day + 1)
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        # 接口返回的数值可能是字符串
+        for column in ('open', 'high', 'low', 'close', 'volume'):
+            df[column] = pd.to_numeric(df[column])
+        df = df[~df.index.duplicated(keep='last')]
+        return df.sort_index()
+
+    @staticmethod
+    def _append(path: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        with open(path, encoding='utf-8') as f:
+            columns = f.readline().strip().split(',')[1:]
+        df.reindex(columns=columns).to_csv(path, mode='a', header=False)
+
+
+def download_symbols(symbols: Iterable[str], incremental: bool = True, **kwargs) -> pd.DataFrame:
+    """
+    下载多个标的的便捷函数
+    :param symbols: 标的代码列表
+    :param incremental: 是否增量更新
+    :param kwargs: MarketDataDownloader 的参数
+    :return: 下载汇总表
+    """
+    return MarketDataDownloader(**kwargs).run(symbols, incremental)
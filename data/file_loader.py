@@ -2,8 +2,21 @@ import pandas as pd
 from typing import Optional
 import os
 from .base_loader import BaseDataLoader
+from .cache import DataCache
+from .compact import CompactBars
+from .resample import MultiTimeframe, resample_ohlcv
 
 class FileDataLoader(BaseDataLoader):
+    def __init__(self, data_dir: str = "data", use_cache: bool = True, cache_dir: Optional[str] = None):
+        """
+        初始化文件数据加载器
+        :param data_dir: 数据目录
+        :param use_cache: 是否使用列式磁盘缓存
+        :param cache_dir: 缓存目录，默认为 data_dir 下的 .cache
+        """
+        super().__init__(data_dir)
+        self.cache = DataCache(cache_dir or os.path.join(data_dir, '.cache')) if use_cache else None
+
     def load_excel(self, file_name: str, index_col: str = 'day', parse_dates: bool = True) -> pd.DataFrame:
         """
         从Excel文件加载数据
@@ -13,7 +26,7 @@ class FileDataLoader(BaseDataLoader):
         :return: DataFrame
         """
         file_path = os.path.join(self.data_dir, file_name)
-        df = pd.read_excel(file_path, index_col=index_col, parse_dates=parse_dates)
+        df = self._read(file_path, pd.read_excel, index_col=index_col, parse_dates=parse_dates)
         if not self.validate_data(df):
             raise ValueError("Invalid data format")
         return df
@@ -27,7 +40,74 @@ class FileDataLoader(BaseDataLoader):
         :return: DataFrame
         """
         file_path = os.path.join(self.data_dir, file_name)
-        df = pd.read_csv(file_path, index_col=index_col, parse_dates=parse_dates)
+        df = self._read(file_path, pd.read_csv, index_col=index_col, parse_dates=parse_dates)
         if not self.validate_data(df):
             raise ValueError("Invalid data format")
-        return df 
\ No newline at end of file
+        return df
+
+    def load_compact(self, file_name: str, price_dtype: str = 'float32', price_scale: int = 10000,
+                     symbol: Optional[str] = None, index_col: str = 'day', parse_dates: bool = True) -> CompactBars:
+        """
+        加载 .xlsx / .csv 文件并转为紧凑存储，转换后不保留 float64 的 DataFrame
+        :param file_name: 文件名
+        :param price_dtype: 价格类型，'float32' 或 'int32'（按 price_scale 放大后取整）
+        :param price_scale: int32 价格的放大倍数
+        :param symbol: 标的代码，默认为文件名（不含扩展名）
+        :param index_col: 索引列名
+        :param parse_dates: 是否解析日期
+        :return: CompactBars
+        """
+        if file_name.endswith('.xlsx'):
+            df = self.load_excel(file_name, index_col=index_col, parse_dates=parse_dates)
+        elif file_name.endswith('.csv'):
+            df = self.load_csv(file_name, index_col=index_col, parse_dates=parse_dates)
+        else:
+            raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+        if symbol is None:
+            symbol = os.path.splitext(os.path.basename(file_name))[0]
+        return CompactBars.from_frame(df, price_dtype=price_dtype, price_scale=price_scale, symbol=symbol)
+
+    def load_resampled(self, file_name: str, rule: str, index_col: str = 'day', parse_dates: bool = True) -> pd.DataFrame:
+        """
+        加载 .xlsx / .csv 文件并聚合为更高周期，每个周期的聚合结果单独缓存（随源文件变化失效）
+        :param file_name: 文件名
+        :param rule: 周期，见 data.resample.timeframe_ns
+        :param index_col: 索引列名
+        :param parse_dates: 是否解析日期
+        :return: DataFrame
+        """
+        load = self._loader(file_name)
+        if self.cache is None:
+            return resample_ohlcv(load(file_name, index_col=index_col, parse_dates=parse_dates), rule)
+        return self.cache.load(
+            os.path.join(self.data_dir, file_name),
+            lambda: resample_ohlcv(load(file_name, index_col=index_col, parse_dates=parse_dates), rule),
+            index_col=index_col, parse_dates=parse_dates, timeframe=rule,
+        )
+
+    def load_timeframes(self, file_name: str, rules=('1D',), index_col: str = 'day',
+                        parse_dates: bool = True) -> MultiTimeframe:
+        """
+        加载基础周期（文件本身的周期）数据和各高周期数据
+        :param file_name: 文件名
+        :param rules: 高周期列表
+        :param index_col: 索引列名
+        :param parse_dates: 是否解析日期
+        :return: MultiTimeframe
+        """
+        base = self._loader(file_name)(file_name, index_col=index_col, parse_dates=parse_dates)
+        frames = {rule: self.load_resampled(file_name, rule, index_col=index_col, parse_dates=parse_dates)
+                  for rule in rules}
+        return MultiTimeframe(base, rules, frames)
+
+    def _loader(self, file_name: str):
+        if file_name.endswith('.xlsx'):
+            return self.load_excel
+        if file_name.endswith('.csv'):
+            return self.load_csv
+        raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+
+    def _read(self, file_path: str, reader, **read_params) -> pd.DataFrame:
+        if self.cache is None:
+            return reader(file_path, **read_params)
+        return self.cache.load(file_path, lambda: reader(file_path, **read_params), **read_params)
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+
+# 各列的聚合方式，未列出的列取周期内最后一个值
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'amount': 'sum',
+}
+
+
+def timeframe_ns(rule: str) -> int:
+    """
+    周期的纳秒数，只支持固定长度的周期（如 '5min' / '1h' / '1D'），不支持按月、按周等日历周期
+    :param rule: pandas 的时间间隔写法
+    :return: 纳秒数
+    """
+    try:
+        step = pd.Timedelta(rule).value
+    except ValueError:
+        raise ValueError(f"不支持的周期: {rule}") from None
+    if step <= 0:
+        raise ValueError(f"不支持的周期: {rule}")
+    return step
+
+
+def _nanoseconds(index: pd.DatetimeIndex) -> np.ndarray:
+    # int64 纳秒时间戳；DatetimeIndex.as_unit 即使单位相同也会逐元素转换，百万级 bar 时明显更慢
+    return np.asarray(pd.DatetimeIndex(index).values, dtype='datetime64[ns]').view(np.int64)
+
+
+def bucket_starts(index: pd.DatetimeIndex, rule: str) -> np.ndarray:
+    """
+    按周期分桶，返回每个桶第一根 bar 的位置
+    桶从 1970-01-01 00:00 起按固定长度划分，日线及以上的桶从零点开始
+    :param index: 升序的日期索引
+    :param rule: 周期
+    :return: 各桶起点位置（升序）
+    """
+    keys = _nanoseconds(index) // timeframe_ns(rule)
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+
+
+def resample_ohlcv(data: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    一次向量化的分段归约把行情聚合为更高周期：open 取首值，high / low 取最值，close 取末值，volume / amount 求和
+    与 DataFrame.resample(rule).agg(...).dropna() 结果相同，没有 bar 的周期不生成空行；
+    high / low 与 pandas 一样跳过 NaN（周期内全为 NaN 时为 NaN），open / close 直接取首末 bar 的值
+    :param data: 含 open / high / low / close / volume 列、升序日期索引的 DataFrame
+    :param rule: 周期，见 timeframe_ns
+    :return: 以各周期起点为索引的 DataFrame，列与 data 相同
+    """
+    if not data.index.is_monotonic_increasing:
+        raise ValueError("data must be sorted by date")
+    stamps = _nanoseconds(data.index)
+    step = timeframe_ns(rule)
+    starts = bucket_starts(data.index, rule)
+    ends = np.append(starts[1:], len(stamps)) - 1
+
+    columns = {}
+    for name in data.columns:
+        values = data[name].to_numpy()
+        how = AGGREGATIONS.get(name, 'last')
+        if len(starts) == 0:
+            columns[name] = values[:0]
+        elif how == 'first':
+            columns[name] = values[starts]
+        elif how == 'last':
+            columns[name] = values[ends]
+        elif how == 'max':
+            columns[name] = np.fmax.reduceat(values, starts)
+        elif how == 'min':
+            columns[name] = np.fmin.reduceat(values, starts)
+        else:
+            columns[name] = np.add.reduceat(values, starts)
+    labels = pd.DatetimeIndex((stamps[starts] // step * step).view('datetime64[ns]'), name=data.index.name)
+    # 索引精度与输入一致（pandas 3 默认微秒）
+    labels = labels.as_unit(pd.DatetimeIndex(data.index).unit)
+    return pd.DataFrame(columns, index=labels)
+
+
+def align_positions(index: pd.DatetimeIndex, rule: str) -> np.ndarray:
+    """
+    基础周期的每根 bar 对应的最近一根已完成的高周期 bar 的位置
+    高周期 bar 在其最后一根基础 bar 上完成：当天最后一根分钟 bar 可以使用当天的日线，之前的分钟 bar 使用前一天的，
+    不会读到尚未走完的周期；还没有已完成的高周期 bar 时为 -1
+    :param index: 基础周期的升序日期索引
+    :param rule: 高周期
+    :return: int64 位置数组，与 index 等长
+    """
+    n = len(index)
+    starts = bucket_starts(index, rule)
+    ends = np.append(starts[1:], n) - 1
+    first = np.zeros(n, dtype=np.int64)
+    first[starts] = 1
+    bucket = np.cumsum(first) - 1
+    return bucket - (np.arange(n) != ends[bucket])
+
+
+class MultiTimeframe:
+    """
+    多周期行情：基础周期（如 1 / 5 分钟）的数据和由它聚合得到的各高周期数据
+    高周期数据在加载阶段一次聚合（或从 DataCache 读取），指标在高周期上计算一次，
+    再通过 align 映射回基础周期的每根 bar，不需要 backtrader 的逐 bar 重采样
+    """
+
+    def __init__(self, base: pd.DataFrame, rules: Iterable[str] = ('1D',),
+                 frames: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        :param base: 基础周期的行情
+        :param rules: 高周期列表
+        :param frames: 已聚合的高周期数据（如从缓存读取），缺少的周期由 base 聚合
+        """
+        if not base.index.is_monotonic_increasing:
+            base = base.sort_index()
+        self.base = base
+        self.frames = {}
+        for rule in rules:
+            frame = (frames or {}).get(rule)
+            self.frames[rule] = frame if frame is not None else resample_ohlcv(base, rule)
+        self._positions = {}
+
+    @property
+    def rules(self):
+        return list(self.frames)
+
+    def frame(self, rule: str) -> pd.DataFrame:
+        """
+        高周期数据
+        """
+        if rule not in self.frames:
+            raise ValueError(f"没有加载周期: {rule}")
+        return self.frames[rule]
+
+    def positions(self, rule: str) -> np.ndarray:
+        """
+        基础周期每根 bar 对应的已完成高周期 bar 的位置，见 align_positions
+        """
+        if rule not in self._positions:
+            self.frame(rule)
+            self._positions[rule] = align_positions(self.base.index, rule)
+        return self._positions[rule]
+
+    def align(self, rule: str, values: np.ndarray) -> np.ndarray:
+        """
+        把高周期上的序列（如日线的百分位）映射到基础周期的每根 bar
+        :param rule: 高周期
+        :param values: 与 frame(rule) 的行逐一对齐的序列
+        :return: 与基础周期等长的 float64 数组，还没有已完成的高周期 bar 时为 NaN
+        """
+        if len(values) != len(self.frame(rule)):
+            raise ValueError("values must be aligned with the timeframe")
+        positions = self.positions(rule)
+        padded = np.append(np.asarray(values, dtype=np.float64), np.nan)
+        # 位置 -1 取到末尾补的 NaN
+        return padded[positions]
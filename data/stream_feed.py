@@ -0,0 +1,46 @@
+import backtrader as bt
+
+
+class StreamingData(bt.feed.DataBase):
+    """
+    由生成器逐 bar 供数的 backtrader 数据源
+    source 为返回 (datetime, open, high, low, close, volume) 迭代器的无参函数，每次运行开始时重新调用；
+    需配合 cerebro.run(preload=False, runonce=False, exactbars=1) 使用，行缓冲只保留最近 lookback 根 bar，
+    内存占用与文件大小无关
+    """
+    params = (
+        ('source', None),
+        ('lookback', 0),  # 行缓冲至少保留的 bar 数，需覆盖指标按日期回看的最大 bar 数
+    )
+
+    def start(self):
+        super().start()
+        if self.p.source is None:
+            raise ValueError("StreamingData requires a source")
+        self._bars = iter(self.p.source())
+
+    def stop(self):
+        self._bars = None
+        super().stop()
+
+    def qbuffer(self, savemem=0, replaying=False):
+        super().qbuffer(savemem=savemem, replaying=replaying)
+        # 指标按日期回看时的 bar 数不体现在 minperiod 中，由 lookback 保证
+        if self.p.lookback:
+            for line in self.lines:
+                line.minbuffer(self.p.lookback + 1)
+
+    def _load(self):
+        try:
+            dt, open_, high, low, close, volume = next(self._bars)
+        except StopIteration:
+            return False
+        lines = self.lines
+        lines.datetime[0] = bt.date2num(dt)
+        lines.open[0] = open_
+        lines.high[0] = high
+        lines.low[0] = low
+        lines.close[0] = close
+        lines.volume[0] = volume
+        lines.openinterest[0] = 0.0
+        return True
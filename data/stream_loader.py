@@ -0,0 +1,100 @@
+import os
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterator, Tuple
+from .base_loader import BaseDataLoader
+
+# 流式读取时各列的默认类型：价格和成交量用 float32，每个块的内存约为 float64 的一半
+DEFAULT_DTYPES = {
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    'volume': 'float32',
+}
+
+Bar = Tuple[datetime, float, float, float, float, float]
+
+
+class StreamingCSVLoader(BaseDataLoader):
+    """
+    分块读取大CSV文件的加载器
+    每次只读取 chunksize 行，按显式指定的窄类型解析，并按 validate_data 的规则逐块校验；
+    整个文件不会同时驻留内存，适合逐 bar 交给 StreamingData 数据源
+    """
+
+    def __init__(self, data_dir: str = "data", chunksize: int = 100000,
+                 dtypes: Optional[Dict[str, Any]] = None):
+        """
+        初始化流式加载器
+        :param data_dir: 数据目录
+        :param chunksize: 每块的行数
+        :param dtypes: 各列的类型，覆盖 DEFAULT_DTYPES 中的同名项
+        """
+        super().__init__(data_dir)
+        if chunksize <= 0:
+            raise ValueError("chunksize must be positive")
+        self.chunksize = chunksize
+        self.dtypes = {**DEFAULT_DTYPES, **(dtypes or {})}
+
+    def iter_chunks(self, file_name: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, index_col: str = 'day') -> Iterator[pd.DataFrame]:
+        """
+        逐块读取CSV文件，只保留日期列和 dtypes 中的列
+        :param file_name: 文件名
+        :param start: 开始日期，从不晚于 start 的最后一根 bar 开始返回（预热期的起点也需要一根 bar）
+        :param end: 结束日期，之后的行不返回，读到超过 end 的块即停止
+        :param index_col: 日期列名
+        :return: 以日期为索引、按日期升序的 DataFrame 块
+        """
+        file_path = os.path.join(self.data_dir, file_name)
+        columns = list(self.dtypes)
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        last = None
+        previous = None
+
+        reader = pd.read_csv(file_path, usecols=lambda name: name == index_col or name in columns,
+                             dtype=self.dtypes, parse_dates=[index_col], index_col=index_col,
+                             chunksize=self.chunksize)
+        with reader:
+            for chunk in reader:
+                if not self.validate_data(chunk):
+                    raise ValueError("Invalid data format")
+                index = chunk.index
+                if not isinstance(index, pd.DatetimeIndex):
+                    raise ValueError(f"无法解析日期列: {index_col}")
+                # 逐 bar 回放要求日期有序，块内和块间都需检查
+                if not index.is_monotonic_increasing or (last is not None and len(index) and index[0] < last):
+                    raise ValueError(f"日期未按升序排列: {file_name}")
+                if not len(index):
+                    continue
+                last = index[-1]
+
+                if start is not None:
+                    # 从不晚于 start 的最后一根 bar 开始，该 bar 可能在上一块的末尾
+                    if index[-1] < start:
+                        previous = chunk.iloc[-1:]
+                        continue
+                    begin = index.searchsorted(start, side='right') - 1
+                    if begin >= 0:
+                        chunk = chunk.iloc[begin:]
+                    elif previous is not None:
+                        chunk = pd.concat([previous, chunk])
+                    start = None
+                if end is not None and chunk.index[-1] > end:
+                    chunk = chunk.iloc[:chunk.index.searchsorted(end, side='right')]
+                    if len(chunk):
+                        yield chunk[columns]
+                    return
+                yield chunk[columns]
+
+    def iter_bars(self, file_name: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, index_col: str = 'day') -> Iterator[Bar]:
+        """
+        逐 bar 读取CSV文件
+        :return: (datetime, open, high, low, close, volume) 元组
+        """
+        for chunk in self.iter_chunks(file_name, start, end, index_col):
+            yield from zip(chunk.index.to_pydatetime(),
+                           *(chunk[column].tolist() for column in DEFAULT_DTYPES))
@@ -0,0 +1,278 @@
+import math
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable
+
+# 回测结果中的汇总指标，优化器和批量回测的结果表使用同一组列
+SUMMARY_METRICS = ('final_value', 'total_return', 'annual_return', 'max_drawdown', 'volatility', 'sharpe',
+                   'sortino', 'round_trips', 'win_rate', 'avg_holding_days')
+
+DAYS_PER_YEAR = 365.25
+
+
+class EquityRecorder(bt.Analyzer):
+    """
+    逐 bar 记录账户价值和日期，写入预分配的数组（数据未预加载时按倍数扩容）
+    替代 AnnualReturn / Returns / DrawDown 等逐 bar 计算的分析器，指标在运行结束后由 compute_metrics 一次性计算
+
+    设置 max_points 时（流式数据源）内存与 bar 数无关：资金曲线最多保留 max_points 个点，写满后隔点抽稀、
+    之后按加倍的间隔记录（始终保留最后一根 bar）；回撤、波动率、夏普和索提诺比率由 RunningMetrics 在全部 bar 上
+    逐 bar 累计，不依赖抽稀后的曲线
+    """
+    params = (
+        ('max_points', None),
+        ('start_date', None),  # 收益率统计的开始日期，仅用于 RunningMetrics
+    )
+
+    def start(self):
+        bounded = self.p.max_points is not None
+        if bounded and self.p.max_points < 2:
+            raise ValueError("max_points must be at least 2")
+        capacity = self.p.max_points if bounded else max(self.data.buflen(), 1)
+        self.values = np.empty(capacity)
+        self.dates = np.empty(capacity)
+        self.size = 0
+        self.stride = 1
+        self.bars = 0
+        self.last = None
+        self.running = RunningMetrics(self.p.start_date) if bounded else None
+
+    def next(self):
+        value, date = self.strategy.broker.getvalue(), self.strategy.datetime[0]
+        if self.running is not None:
+            self.running.update(value, date)
+            self.last = (value, date)
+            self.bars += 1
+            if (self.bars - 1) % self.stride:
+                return
+        i = self.size
+        if i == len(self.values):
+            if self.running is not None:
+                # 隔点抽稀，之后的记录间隔加倍
+                half = (i + 1) // 2
+                self.values[:half], self.dates[:half] = self.values[:i:2], self.dates[:i:2]
+                self.size, self.stride = half, self.stride * 2
+                if (self.bars - 1) % self.stride:
+                    return
+                i = half
+            else:
+                self.values = np.resize(self.values, 2 * i)
+                self.dates = np.resize(self.dates, 2 * i)
+        self.values[i] = value
+        self.dates[i] = date
+        self.size = i + 1
+
+    def get_analysis(self) -> Dict[str, Any]:
+        values, dates = self.values[:self.size], self.dates[:self.size]
+        if self.running is None:
+            return {'values': values, 'dates': dates}
+        if self.last is not None and (not len(dates) or dates[-1] != self.last[1]):
+            values, dates = np.append(values, self.last[0]), np.append(dates, self.last[1])
+        return {'values': values, 'dates': dates, 'metrics': self.running.metrics()}
+
+
+class RunningMetrics:
+    """
+    逐 bar 累计的最大回撤、年化波动率、夏普和索提诺比率（无风险利率为 0），与 compute_metrics 的口径一致，
+    内存为 O(1)；收益率的均值和方差按 Welford 方法累计
+    """
+
+    def __init__(self, start_date: Optional[datetime] = None):
+        """
+        :param start_date: 收益率统计的开始日期（之前为预热期，只参与最大回撤），None 时从第一根 bar 开始
+        """
+        self.start = bt.date2num(start_date) if start_date is not None else float('-inf')
+        self.peak = float('-inf')
+        self.drawdown = 0.0
+        self.count = 0
+        self.first = self.last = None
+        self.previous = None
+        self.mean = self.m2 = self.downside = 0.0
+
+    def update(self, value: float, date: float):
+        """
+        :param value: 账户价值
+        :param date: backtrader 的浮点日期
+        """
+        self.peak = max(self.peak, value)
+        self.drawdown = max(self.drawdown, 100.0 * (self.peak - value) / self.peak)
+        if date < self.start:
+            return
+        if self.previous is not None:
+            r = value / self.previous - 1
+            n = self.count
+            delta = r - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (r - self.mean)
+            self.downside += min(r, 0.0) ** 2
+        else:
+            self.first = date
+        self.previous, self.last = value, date
+        self.count += 1
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        :return: max_drawdown / volatility / sharpe / sortino
+        """
+        nan = float('nan')
+        result = {'max_drawdown': self.drawdown / 100 if self.count or self.peak > float('-inf') else 0.0,
+                  'volatility': nan, 'sharpe': nan, 'sortino': nan}
+        days = self.last - self.first if self.count else 0.0
+        if self.count < 3 or days <= 0:
+            return result
+        returns = self.count - 1
+        std = math.sqrt(self.m2 / (returns - 1))
+        downside = math.sqrt(self.downside / returns)
+        scale = math.sqrt(returns / days * DAYS_PER_YEAR)
+        result.update({
+            'volatility': float(std * scale),
+            'sharpe': float(self.mean / std * scale) if std > 0 else nan,
+            'sortino': float(self.mean / downside * scale) if downside > 0 else nan,
+        })
+        return result
+
+
+def max_drawdown(values: np.ndarray) -> float:
+    """
+    最大回撤（比例），与 bt.analyzers.DrawDown 的计算方式一致
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float(np.max(100.0 * (peak - values) / peak)) / 100
+
+
+def periods_per_year(index: pd.DatetimeIndex) -> float:
+    """
+    按样本推算每年的 bar 数（日线约 252，分钟线按实际交易时段）
+    """
+    if len(index) < 2:
+        return float('nan')
+    days = (index[-1] - index[0]).total_seconds() / 86400
+    if days <= 0:
+        return float('nan')
+    return (len(index) - 1) / days * DAYS_PER_YEAR
+
+
+def ratios(values: np.ndarray, periods: float, risk_free: float = 0.0) -> Dict[str, float]:
+    """
+    逐 bar 收益率的年化波动率、夏普比率和索提诺比率
+    :param values: 账户价值序列
+    :param periods: 每年的 bar 数
+    :param risk_free: 年化无风险利率
+    """
+    values = np.asarray(values, dtype=np.float64)
+    nan = float('nan')
+    if len(values) < 3 or not periods == periods:
+        return {'volatility': nan, 'sharpe': nan, 'sortino': nan}
+    returns = values[1:] / values[:-1] - 1
+    excess = returns - risk_free / periods
+    std = returns.std(ddof=1)
+    downside = math.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+    scale = math.sqrt(periods)
+    return {
+        'volatility': float(std * scale),
+        'sharpe': float(excess.mean() / std * scale) if std > 0 else nan,
+        'sortino': float(excess.mean() / downside * scale) if downside > 0 else nan,
+    }
+
+
+def round_trips(trades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把成交记录按持仓从开仓到平仓合并为完整交易
+    :param trades: 成交记录（datetime / side / size / price / comm），size 买入为正、卖出为负；
+                   含 symbol 时按标的分别合并（组合回测）
+    :return: 每笔完整交易的 entry / exit 时间、最大持仓、投入金额（含开仓手续费）、盈亏（含手续费）、
+             收益率（盈亏 / 投入金额）和持有天数，按平仓顺序排列；未平仓的持仓不计入
+    """
+    trips = []
+    # 各标的的 [持仓, 开仓时间, 盈亏, 投入金额, 最大持仓]
+    open_trips = {}
+    for trade in trades:
+        symbol = trade.get('symbol')
+        state = open_trips.get(symbol)
+        if state is None:
+            state = open_trips[symbol] = [0, trade['datetime'], 0.0, 0.0, 0]
+        position = state[0]
+        opening = position == 0 or (position > 0) == (trade['size'] > 0)
+        position += trade['size']
+        state[0] = position
+        state[4] = max(state[4], abs(position))
+        state[2] -= trade['size'] * trade['price'] + trade['comm']
+        if opening:
+            state[3] += abs(trade['size']) * trade['price'] + trade['comm']
+        if position == 0:
+            _, entry, pnl, cost, size = open_trips.pop(symbol)
+            exit_ = trade['datetime']
+            trip = {
+                'entry': entry,
+                'exit': exit_,
+                'size': size,
+                'cost': cost,
+                'pnl': pnl,
+                'return': pnl / cost if cost else float('nan'),
+                'holding_days': (exit_ - entry).total_seconds() / 86400,
+            }
+            if symbol is not None:
+                trip['symbol'] = symbol
+            trips.append(trip)
+    return trips
+
+
+def compute_metrics(values: np.ndarray, index: pd.DatetimeIndex, trades: List[Dict[str, Any]],
+                    initial_value: float, start_date: datetime, end_date: datetime,
+                    risk_free: float = 0.0) -> Dict[str, Any]:
+    """
+    一次性计算回测的全部指标
+    预热期（start_date 之前）的账户价值只参与最大回撤（此时空仓，不影响结果），不参与收益率统计
+    :param values: 逐 bar 账户价值
+    :param index: 与 values 对齐的日期
+    :param trades: 成交记录
+    :param initial_value: 初始资金
+    :param start_date: 开始日期
+    :param end_date: 结束日期
+    :param risk_free: 年化无风险利率
+    :return: SUMMARY_METRICS 中的各项
+    """
+    values = np.asarray(values, dtype=np.float64)
+    final_value = float(values[-1]) if len(values) else float(initial_value)
+    begin = int(index.searchsorted(pd.Timestamp(start_date)))
+    active = values[begin:]
+    trips = round_trips(trades)
+    wins = sum(1 for trip in trips if trip['pnl'] > 0)
+    return {
+        'final_value': final_value,
+        'total_return': (final_value - initial_value) / initial_value,
+        'annual_return': math.pow(final_value / initial_value, 365 / (end_date - start_date).days) - 1,
+        'max_drawdown': max_drawdown(values),
+        **ratios(active, periods_per_year(index[begin:]), risk_free),
+        'round_trips': len(trips),
+        'win_rate': wins / len(trips) if trips else float('nan'),
+        'avg_holding_days': float(np.mean([trip['holding_days'] for trip in trips])) if trips else float('nan'),
+    }
+
+
+def result_metrics(result: Dict[str, Any], risk_free: float = 0.0) -> Dict[str, Any]:
+    """
+    由 BacktestEngine.run 的结果（含 equity 和 trades）重新计算指标，如更换无风险利率
+    """
+    equity = result['equity']
+    return compute_metrics(equity.to_numpy(), equity.index, result['trades'], result['initial_value'],
+                           result['start_date'], result['end_date'], risk_free)
+
+
+def metrics_table(results: Iterable[Dict[str, Any]], risk_free: float = 0.0) -> pd.DataFrame:
+    """
+    多次回测（如参数寻优、批量回测）的指标表
+    :param results: BacktestEngine.run 的结果；含 'params' 时参数展开为列
+    :return: 每个结果一行
+    """
+    rows = []
+    for result in results:
+        row = dict(result.get('params') or {})
+        row.update(result_metrics(result, risk_free))
+        rows.append(row)
+    return pd.DataFrame(rows)
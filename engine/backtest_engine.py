@@ -1,61 +1,196 @@
-import math
+import time
 import backtrader as bt
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Iterator, Tuple, Union
 from config.backtest_config import BACKTEST_PARAMS
+from data.compact import CompactBars, CompactData
+from data.dates import date2num_array, num2date_array
+from data.resample import MultiTimeframe
+from data.stream_feed import StreamingData
+from engine.optimizer import ParameterOptimizer, grid_params, random_params
+from engine.analytics import EquityRecorder, compute_metrics
+from engine.vectorized import run_percentile_vectorized
+from engine.incremental import IncrementalPercentileState
+from engine.cerebro import PreloadedCerebro
+from engine.profiler import RunProfiler
+from engine.report import BacktestReport
+from engine.result_cache import ResultCache, data_fingerprint, result_key
+from engine.writer import ColumnarWriter, WRITER_MODES
+from indicator.percentile_indicator import percentile_rank
+from indicator.store import IndicatorStore
+from strategy import trade_log
+from strategy.percentile_strategy import PercentileStrategy
+from strategy.trade_log import TradeLog
 
 class BacktestEngine:
-    def __init__(self):
-        self.cerebro = bt.Cerebro()
+    MODES = ('cerebro', 'vectorized')
+
+    def __init__(self, mode: str = 'cerebro', writer: str = 'off', output_dir: str = 'results',
+                 output_path: Optional[str] = None, writer_background: bool = False):
+        """
+        初始化回测引擎
+        :param mode: 'cerebro' 使用 backtrader 事件循环；'vectorized' 在 NumPy 数组上直接运行 PercentileStrategy
+        :param writer: 逐 bar 数据的输出模式（仅 cerebro 模式）：'off' 不输出；'memory' 保留在内存；
+                       'npz' / 'parquet' / 'csv' 在运行结束时一次性写文件
+        :param output_dir: 输出目录，每次运行生成独有的文件名
+        :param output_path: 固定的输出文件路径，覆盖 output_dir
+        :param writer_background: 是否由后台线程逐块写文件（run 不等待写完，读取文件前调用结果中 writer 的 join()）
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的回测模式: {mode}")
+        if writer not in WRITER_MODES:
+            raise ValueError(f"不支持的输出模式: {writer}")
+        self.mode = mode
+        self.writer = writer
+        self.result_cache = None
+        self.indicator_store = None
+        self.data_hash = None
+        self.cerebro = None
         self.strategy = None
+        self.strategy_params = None
         self.data = None
+        self.dataframe = None
+        self.stream = None
+        self.stream_lookback = 0
+        self.stream_equity_points = None
+        self.timeframes = None
+        self.signal_timeframe = None
+        self.signal_lines = {}
+        self.state = None
+        self.results = None
         self.start_date = None
         self.end_date = None
+        self.data_setup_time = None
+        self.feed_range = None
         self.initial_cash = BACKTEST_PARAMS['initial_cash']
-        
+        self.commission = BACKTEST_PARAMS['commission']
+        self.slippage = BACKTEST_PARAMS['slippage']
+
+        if mode == 'vectorized':
+            return
+
+        # 数据只预加载一次，同一引擎可反复运行；
+        # 结果由 writer / 分析器产出，不需要默认的 Broker、Trades、BuySell 观察器
+        self.cerebro = PreloadedCerebro(stdstats=False)
+
+        # 初始资金与向量化模式一致，不使用 broker 的默认值
+        self.cerebro.broker.setcash(self.initial_cash)
+
         # 设置手续费和滑点
-        self.cerebro.broker.setcommission(commission=BACKTEST_PARAMS['commission'])
-        self.cerebro.broker.set_slippage_perc(BACKTEST_PARAMS['slippage'])
+        self.cerebro.broker.setcommission(commission=self.commission)
+        self.cerebro.broker.set_slippage_perc(self.slippage)
 
         # 添加 observer
         # self.cerebro.addobserver(bt.observers.Broker)
 
         # 添加 writer
-        self.cerebro.addwriter(bt.WriterFile, csv=True, out="backtest_results.csv", csv_counter=True)
-
-        # 添加 annual return 分析器
-        self.cerebro.addanalyzer(bt.analyzers.AnnualReturn, _name='annual_return')
+        if writer != 'off':
+            self.cerebro.addwriter(ColumnarWriter, format=writer, out=output_path, directory=output_dir,
+                                   background=writer_background)
 
-        # 添加 return 分析器
-        self.cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+        # 只逐 bar 记录账户价值，收益、回撤等指标在运行结束后统一计算（分析器在每次运行时添加，见 _run_cerebro）
 
         # 设置当前收盘价成交
         self.cerebro.broker.set_coc(True)
 
     def set_strategy(self, strategy_class: bt.Strategy, strategy_params: Optional[Dict[str, Any]] = None):
         """
-        设置回测策略
+        设置回测策略，替换之前设置的策略
         :param strategy_class: 策略类
         :param strategy_params: 策略参数
         """
+        if self.mode == 'vectorized':
+            if not issubclass(strategy_class, PercentileStrategy):
+                raise ValueError(f"向量化模式仅支持 PercentileStrategy: {strategy_class.__name__}")
+            self.strategy = strategy_class
+            self.strategy_params = dict(strategy_params or {})
+            return
+
+        self.cerebro.strats.clear()
         if strategy_params:
             self.cerebro.addstrategy(strategy_class, **strategy_params)
         else:
             self.cerebro.addstrategy(strategy_class)
         self.strategy = strategy_class
+        self.strategy_params = dict(strategy_params or {})
 
-    def set_data(self, data: pd.DataFrame):
+    def set_data(self, data: Union[pd.DataFrame, CompactBars]):
         """
         设置回测数据
-        :param data: 数据DataFrame
+        :param data: 数据DataFrame，或紧凑存储的 CompactBars（cerebro 模式下由 CompactData 直接从数组供数）
         """
         # 使用传入的data参数而不是重新读取文件
-        self.data = bt.feeds.PandasData(
-            dataname=data
-        )
+        wall, cpu = time.perf_counter(), time.process_time()
+        if not data.index.is_monotonic_increasing:
+            # 按日期二分查找回测区间，需要有序的索引
+            data = data.sort_index()
+        self.dataframe = data
+        self.data_hash = None
+        self.stream = None
+        self.timeframes = None
+        self.signal_timeframe = None
+        self.signal_lines = {}
+        self.feed_range = (0, len(data))
+        if self.mode == 'vectorized':
+            self.data = data
+        else:
+            self.data = self._make_feed(data)
+            self.cerebro.replacedata(self.data)
+        self.data_setup_time = (time.perf_counter() - wall, time.process_time() - cpu)
 
-        self.cerebro.adddata(self.data)
+    def set_timeframes(self, data: MultiTimeframe, signal_timeframe: str = '1D'):
+        """
+        设置多周期数据：在基础周期（如 1 / 5 分钟）的 bar 上成交，PercentileStrategy 的百分位在高周期上计算
+        百分位在高周期数据上每根 bar 只计算一次，再按 MultiTimeframe.align 映射到基础周期（只使用已完成的高周期 bar），
+        两种回测模式都通过预先计算的百分位线运行，不需要 backtrader 的逐 bar 重采样
+        :param data: MultiTimeframe
+        :param signal_timeframe: 计算百分位的周期，需已在 data 中加载
+        """
+        data.frame(signal_timeframe)
+        self.set_data(data.base)
+        self.timeframes = data
+        self.signal_timeframe = signal_timeframe
+
+    def set_stream(self, source: Callable[[Optional[datetime], Optional[datetime]], Iterator[Tuple]],
+                   lookback_bars: int, equity_points: int = 10000):
+        """
+        设置流式数据源（仅 cerebro 模式），数据逐 bar 读入，不整体载入内存
+        :param source: source(start, end) 返回 (datetime, open, high, low, close, volume) 迭代器，
+                       如 StreamingCSVLoader(...).iter_bars 的偏函数
+        :param lookback_bars: 行缓冲保留的 bar 数，需覆盖策略预热期内的最大 bar 数
+        :param equity_points: 结果中资金曲线保留的最大点数（抽稀，见 EquityRecorder），
+                              回撤、波动率等指标仍按全部 bar 计算
+        """
+        if self.mode == 'vectorized':
+            raise ValueError("向量化模式不支持流式数据源")
+        self.stream = source
+        self.stream_lookback = lookback_bars
+        self.stream_equity_points = equity_points
+        self.dataframe = None
+        self.data_hash = None
+        self.timeframes = None
+        self.signal_timeframe = None
+        self.signal_lines = {}
+        self.feed_range = None
+        self.data = StreamingData(source=lambda: source(None, None), lookback=lookback_bars)
+        self.cerebro.replacedata(self.data)
+
+    def set_result_cache(self, cache: Optional[ResultCache]):
+        """
+        设置回测结果缓存，相同数据、策略、参数、资金、费率和区间的运行直接返回缓存的结果
+        :param cache: ResultCache，None 表示不使用缓存
+        """
+        self.result_cache = cache
+
+    def set_indicator_store(self, store: Optional[IndicatorStore]):
+        """
+        设置预先计算的指标线存储（仅 PercentileStrategy），百分位从内存映射的数组读取，不在每次运行时重新计算
+        :param store: IndicatorStore，None 表示不使用
+        """
+        self.indicator_store = store
 
     def set_initial_cash(self, cash: float):
         """
@@ -63,40 +198,405 @@ class BacktestEngine:
         :param cash: 初始资金金额
         """
         self.initial_cash = cash
-        self.cerebro.broker.setcash(cash)
+        if self.cerebro:
+            self.cerebro.broker.setcash(cash)
+
+    def set_commission(self, commission: float):
+        """
+        设置手续费率
+        :param commission: 按成交金额计算的手续费率
+        """
+        self.commission = commission
+        if self.cerebro:
+            self.cerebro.broker.setcommission(commission=commission)
+
+    def set_slippage(self, slippage: float):
+        """
+        设置百分比滑点
+        :param slippage: 滑点比例
+        """
+        self.slippage = slippage
+        if self.cerebro:
+            self.cerebro.broker.set_slippage_perc(slippage)
 
-    def run(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    def run(self, start_date: datetime, end_date: datetime, profile: bool = False,
+            profile_path: Optional[str] = None, cprofile: bool = False,
+            sample_interval: Optional[float] = None, use_cache: bool = True) -> Dict[str, Any]:
         """
         运行回测
-        :return: 回测结果
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param profile: 是否剖析本次运行，结果放在返回值的 'profile' 中；关闭时不安装任何钩子
+        :param profile_path: 剖析结果的 JSON 文件路径（同时生成 .folded 折叠栈 / .prof 文件）
+        :param cprofile: 剖析时是否同时开启 cProfile
+        :param sample_interval: 剖析时的调用栈采样间隔（秒），用于生成火焰图
+        :param use_cache: 设置了结果缓存时是否使用（False 时既不读取也不写入）；剖析、流式数据和输出逐 bar 数据时不使用
+        :return: 回测结果，含 analytics.SUMMARY_METRICS 中的各项指标；equity 为逐 bar 账户价值，trades 为成交记录，
+                 events 为策略的订单事件日志（TradeLog，可导出 CSV/Parquet），
+                 writer 为逐 bar 数据的 ColumnarWriter（writer='off' 或向量化模式下为 None）
         """
         if not self.strategy or self.data is None:
             raise ValueError("Strategy and data must be set before running backtest")
 
+        key = self._result_key(start_date, end_date) if use_cache and not profile else None
+        if key is not None:
+            cached = self.result_cache.get(key, self.strategy)
+            if cached is not None:
+                self.results = cached
+                return cached
+
+        if not profile:
+            if self.mode == 'vectorized':
+                results = self._run_vectorized(start_date, end_date)
+            else:
+                results = self._run_cerebro(start_date, end_date)
+            if key is not None:
+                self.result_cache.put(key, self.strategy, results)
+            self.results = results
+            return results
+
+        profiler = RunProfiler(cprofile=cprofile, sample_interval=sample_interval)
+        if self.data_setup_time is not None:
+            profiler.add_phase('set_data', *self.data_setup_time)
+        with profiler.sampling(), profiler.phase('run'):
+            if self.mode == 'vectorized':
+                results = self._run_vectorized(start_date, end_date, profiler)
+            else:
+                self._prepare_feed(start_date, end_date)
+                profiler.instrument_cerebro(self.cerebro, self.strategy)
+                try:
+                    results = self._run_cerebro(start_date, end_date, profiler)
+                finally:
+                    profiler.restore()
+
+        results['profile'] = profiler.report(mode=self.mode,
+                                             bars=None if self.dataframe is None else len(self.dataframe))
+        if profile_path:
+            profiler.save(profile_path, results['profile'])
+        self.results = results
+        return results
+
+    def date_range(self, start_date: datetime, end_date: datetime) -> Tuple[int, int]:
+        """
+        二分查找回测需要的 bar 区间 [begin, stop)
+        结束于 end_date 的最后一根 bar；策略声明了预热时长（warmup）时，
+        起点为不晚于 start_date - 预热时长 的最后一根 bar（多留一根以防浮点日期的舍入），否则从头开始
+        :return: (begin, stop) 位置
+        """
+        index = self.dataframe.index
+        stop = int(index.searchsorted(pd.Timestamp(end_date), side='right'))
+        warmup = getattr(self.strategy, 'warmup', None)
+        if warmup is None:
+            return 0, stop
+        warm_start = pd.Timestamp(start_date) - warmup(self.strategy_params)
+        begin = int(index.searchsorted(warm_start, side='right')) - 2
+        return max(begin, 0), stop
+
+    def _result_key(self, start_date: datetime, end_date: datetime) -> Optional[str]:
+        # 流式数据没有完整的数据指纹，逐 bar 输出的文件每次运行都要生成
+        if self.result_cache is None or self.dataframe is None or (self.cerebro and self.writer != 'off'):
+            return None
+        # cerebro 模式的初始资金以 broker 为准
+        cash = self.cerebro.broker.startingcash if self.cerebro else self.initial_cash
+        params = self.strategy_params
+        if self.signal_timeframe is not None:
+            params = dict(params, signal_timeframe=self.signal_timeframe)
+        return result_key(self._data_hash(), self.strategy, params, self.mode,
+                          cash, self.commission, self.slippage, start_date, end_date)
+
+    def _data_hash(self) -> str:
+        if self.data_hash is None:
+            self.data_hash = data_fingerprint(self.dataframe)
+        return self.data_hash
+
+    def _stored_percentile(self, begin: int, stop: int) -> Optional[np.ndarray]:
+        """
+        [begin, stop) 区间预先计算的百分位：设置了多周期数据时为高周期百分位映射到基础周期的结果，
+        否则在设置了指标线存储时为内存映射数组的视图；都没有时为 None（由策略自行计算）
+        指标线在全部历史上计算，回测区间的百分位与只在区间内计算时相同（区间已包含完整的预热期）
+        """
+        if self.stream is not None or not issubclass(self.strategy, PercentileStrategy):
+            return None
+        if self.signal_timeframe is None and self.indicator_store is None:
+            return None
+        lookback_days = self.strategy_params.get('lookback_days', PercentileStrategy.params.lookback_days)
+        if self.signal_timeframe is None:
+            lines = self.indicator_store.percentile(self.dataframe, [lookback_days], data_hash=self._data_hash())
+            return lines[lookback_days][begin:stop]
+
+        if lookback_days not in self.signal_lines:
+            frame = self.timeframes.frame(self.signal_timeframe)
+            if self.indicator_store is not None:
+                values = self.indicator_store.percentile(frame, [lookback_days])[lookback_days]
+            else:
+                values = percentile_rank(date2num_array(frame.index),
+                                         np.asarray(frame['close'].to_numpy(), dtype=np.float64), lookback_days)
+            self.signal_lines[lookback_days] = self.timeframes.align(self.signal_timeframe, values)
+        return self.signal_lines[lookback_days][begin:stop]
+
+    def _run_params(self, start_date: datetime) -> Dict[str, Any]:
+        # 支持 trade_start 的策略从 start_date 开始交易，之前的 bar 只用于预热
+        params = dict(self.strategy_params)
+        if 'trade_start' in self.strategy.params._getkeys():
+            params['trade_start'] = start_date
+        return params
+
+    def _prepare_feed(self, start_date: datetime, end_date: datetime):
+        if self.stream is not None:
+            # 流式数据源每次运行重新读取，只读取回测区间及其预热期（多留一天以防浮点日期的舍入）
+            warmup = getattr(self.strategy, 'warmup', None)
+            warm_start = start_date - warmup(self.strategy_params) - timedelta(days=1) if warmup else None
+            source = self.stream
+            self.data = StreamingData(source=lambda: source(warm_start, end_date), lookback=self.stream_lookback)
+            self.cerebro.replacedata(self.data)
+            return
+
+        # 只把回测区间及其预热期的数据交给 cerebro，区间不变时复用已预加载的数据
+        feed_range = self.date_range(start_date, end_date)
+        if feed_range != self.feed_range:
+            begin, stop = feed_range
+            self.data = self._make_feed(self.dataframe.iloc[begin:stop])
+            self.cerebro.replacedata(self.data)
+            self.feed_range = feed_range
+
+    @staticmethod
+    def _make_feed(data: Union[pd.DataFrame, CompactBars]) -> bt.feed.DataBase:
+        if isinstance(data, CompactBars):
+            return CompactData(bars=data)
+        return bt.feeds.PandasData(dataname=data)
+
+    def _frame(self) -> pd.DataFrame:
+        # 优化器和增量模式需要完整的 DataFrame
+        if isinstance(self.dataframe, CompactBars):
+            return self.dataframe.to_frame()
+        return self.dataframe
+
+    def _run_cerebro(self, start_date: datetime, end_date: datetime,
+                     profiler: Optional[RunProfiler] = None) -> Dict[str, Any]:
+        """
+        cerebro 模式下运行回测
+        """
+        self._prepare_feed(start_date, end_date)
+        params = self._run_params(start_date)
+        percentile = self._stored_percentile(*self.feed_range) if self.stream is None else None
+        if percentile is not None:
+            params['percentile_line'] = percentile
+        self.cerebro.strats.clear()
+        self.cerebro.addstrategy(self.strategy, **params)
+        self.cerebro.analyzers.clear()
+        if self.stream is not None:
+            # 流式运行只保留抽稀的资金曲线和逐 bar 累计的指标，内存与 bar 数无关
+            self.cerebro.addanalyzer(EquityRecorder, _name='equity', max_points=self.stream_equity_points,
+                                     start_date=start_date)
+        else:
+            self.cerebro.addanalyzer(EquityRecorder, _name='equity')
+
         # 运行回测
-        initial_value = self.cerebro.broker.getvalue()
-        results = self.cerebro.run(fromdate=start_date, todate=end_date)
+        if self.stream is not None:
+            # 逐 bar 运行，各行缓冲只保留所需的最近若干根 bar
+            results = self.cerebro.run(preload=False, runonce=False, exactbars=1)
+        else:
+            results = self.cerebro.run(preload=True, runonce=True, exactbars=False)
+        # broker 在运行开始时重置，运行前读取的是上一次运行的期末价值
+        initial_value = self.cerebro.broker.startingcash
         final_value = self.cerebro.broker.getvalue()
 
-        # 计算回测结果
-        total_return = (final_value - initial_value) / initial_value
-        # total_return = results[0].analyzers.returns.get_analysis()['rtot']
-        annual_return = results[0].analyzers.returns.get_analysis()['rnorm']
-        annual_return = math.pow(final_value / initial_value, 365 / (end_date - start_date).days) - 1
+        with profiler.phase('results') if profiler else nullcontext():
+            # 成交记录（cheat-on-close 下成交时间为下单 bar 的时间）
+            trades = [{
+                'datetime': bt.num2date(order.executed.dt),
+                'side': 'buy' if order.isbuy() else 'sell',
+                'size': order.executed.size,
+                'price': order.executed.price,
+                'comm': order.executed.comm,
+            } for order in results[0]._orders if order.status == order.Completed]
+
+            # 策略的结构化订单事件日志（如有）
+            events = getattr(results[0], 'trade_log', None)
+
+            # 逐 bar 数据的 writer（如有）
+            writer = next((w for w in self.cerebro.runwriters if isinstance(w, ColumnarWriter)), None)
+
+            # 计算回测结果
+            recorded = results[0].analyzers.equity.get_analysis()
+            equity = pd.Series(recorded['values'], index=num2date_array(recorded['dates']), name='equity')
+            metrics = compute_metrics(equity.to_numpy(), equity.index, trades, initial_value, start_date, end_date)
+            metrics.update(recorded.get('metrics', {}))
+            metrics['final_value'] = final_value
 
         return {
             'initial_value': initial_value,
-            'final_value': final_value,
-            'total_return': total_return,
-            'annual_return': annual_return,
+            **metrics,
+            'equity': equity,
+            'trades': trades,
+            'events': events,
+            'writer': writer,
             'strategy': self.strategy.__name__,
             'start_date': start_date,
             'end_date': end_date
         }
 
-    def plot(self, **kwargs):
+    def _run_vectorized(self, start_date: datetime, end_date: datetime,
+                        profiler: Optional[RunProfiler] = None) -> Dict[str, Any]:
+        """
+        向量化模式下运行回测，返回与 cerebro 模式相同的结果字典
+        """
+        initial_value = self.initial_cash
+        begin, stop = self.date_range(start_date, end_date)
+        with profiler.phase('vectorized') if profiler else nullcontext():
+            outcome = run_percentile_vectorized(self.dataframe.iloc[begin:stop], self._run_params(start_date),
+                                                initial_value, self.commission, self.slippage,
+                                                percentile=self._stored_percentile(begin, stop))
+
+        with profiler.phase('results') if profiler else nullcontext():
+            equity = pd.Series(outcome['values'], index=self.dataframe.index[begin:stop], name='equity')
+            metrics = compute_metrics(outcome['values'], equity.index, outcome['trades'], initial_value,
+                                      start_date, end_date)
+            metrics['final_value'] = outcome['final_value']
+
+            # 向量化模式只有成交事件
+            events = TradeLog(self.strategy_params.get('log_level', trade_log.INFO))
+            if events.enabled(trade_log.INFO):
+                for trade in outcome['trades']:
+                    events.record(trade_log.INFO, trade['datetime'], trade_log.FILL, trade['side'], trade['size'],
+                                  trade['price'], value=trade['size'] * trade['price'], comm=trade['comm'])
+
+        return {
+            'initial_value': initial_value,
+            **metrics,
+            'equity': equity,
+            'trades': outcome['trades'],
+            'events': events,
+            'writer': None,
+            'strategy': self.strategy.__name__,
+            'start_date': start_date,
+            'end_date': end_date
+        }
+
+    def optimize(self, start_date: datetime, end_date: datetime,
+                 param_grid: Optional[Dict[str, List[Any]]] = None,
+                 param_space: Optional[Dict[str, Any]] = None,
+                 n_iter: int = 100,
+                 seed: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 chunksize: int = 1,
+                 sort_by: str = 'total_return',
+                 callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> pd.DataFrame:
+        """
+        并行参数寻优，使用已设置的策略、数据、初始资金、手续费和滑点
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param param_grid: 网格搜索参数，{参数名: 候选值列表}
+        :param param_space: 随机搜索参数，{参数名: 候选值列表 或 (最小值, 最大值)}
+        :param n_iter: 随机搜索的采样次数
+        :param seed: 随机搜索的随机种子
+        :param workers: 进程数，默认使用全部 CPU
+        :param chunksize: 每次分发给单个进程的参数组数
+        :param sort_by: 排名所依据的指标
+        :param callback: 每得到一组结果时调用
+        :return: 按 sort_by 降序排列的结果表
+        """
+        if not self.strategy or self.dataframe is None:
+            raise ValueError("Strategy and data must be set before running optimization")
+
+        optimizer = ParameterOptimizer(
+            self.strategy, self._frame(), start_date, end_date,
+            base_params=self.strategy_params,
+            initial_cash=self.initial_cash,
+            commission=self.commission,
+            slippage=self.slippage,
+            workers=workers,
+            chunksize=chunksize,
+            mode=self.mode,
+            indicator_dir=self.indicator_store.directory if self.indicator_store else None,
+        )
+        if param_grid is not None:
+            params = grid_params(param_grid)
+        elif param_space is not None:
+            params = random_params(param_space, n_iter, seed)
+        else:
+            raise ValueError("Either param_grid or param_space must be provided")
+        return optimizer.run(params, sort_by=sort_by, callback=callback)
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        增量模式：用已设置的策略、数据和初始资金预热状态，之后可通过 append / append_bar 逐步追加新 bar
+        :return: 预热后的账户状态
+        """
+        if not self.strategy or self.dataframe is None:
+            raise ValueError("Strategy and data must be set before warming up")
+        if not issubclass(self.strategy, PercentileStrategy):
+            raise ValueError(f"增量模式仅支持 PercentileStrategy: {self.strategy.__name__}")
+
+        self.state = IncrementalPercentileState(self.strategy_params, self.initial_cash, self.commission, self.slippage)
+        self.state.append(self._frame())
+        return self.state.summary()
+
+    def append_bar(self, dt: datetime, open: float, high: float, low: float, close: float) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        增量模式：追加一根 bar，只推进该 bar 的指标和策略
+        :return: {'signals': 新产生的信号, 'orders': 新成交或失效的订单}
+        """
+        if self.state is None:
+            raise ValueError("Engine must be warmed up before appending bars")
+        return self.state.append_bar(dt, open, high, low, close)
+
+    def append(self, data: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        增量模式：追加多根 bar
+        :param data: 新数据DataFrame
+        :return: {'signals': 新产生的信号, 'orders': 新成交或失效的订单}
+        """
+        if self.state is None:
+            raise ValueError("Engine must be warmed up before appending bars")
+        return self.state.append(data)
+
+    def save_state(self, path: str):
+        """
+        把预热后的增量状态保存到磁盘
+        """
+        if self.state is None:
+            raise ValueError("Engine must be warmed up before saving state")
+        self.state.save(path)
+
+    def load_state(self, path: str) -> Dict[str, Any]:
+        """
+        从磁盘恢复增量状态，无需重新预热
+        :return: 恢复后的账户状态
+        """
+        self.state = IncrementalPercentileState.load(path)
+        return self.state.summary()
+
+    def report(self, results: Optional[Dict[str, Any]] = None, **kwargs) -> BacktestReport:
+        """
+        回测报告（价格与成交标记、百分位、账户价值、回撤），百分位线优先从指标线存储读取
+        :param results: 回测结果，默认为最近一次 run 的结果
+        :param kwargs: 传给 BacktestReport 的其他参数（max_points / method / title）
+        :return: BacktestReport
+        """
+        results = results if results is not None else self.results
+        if results is None:
+            raise ValueError("No results to report, run the backtest first")
+        data = percentile = threshold = None
+        if self.dataframe is not None:
+            begin, stop = self.date_range(results['start_date'], results['end_date'])
+            data = self._frame().iloc[begin:stop]
+            if issubclass(self.strategy, PercentileStrategy):
+                percentile = self._stored_percentile(begin, stop)
+                if percentile is None:
+                    lookback_days = self.strategy_params.get('lookback_days', PercentileStrategy.params.lookback_days)
+                    percentile = percentile_rank(date2num_array(data.index),
+                                                 np.asarray(data['close'].to_numpy(), dtype=np.float64), lookback_days)
+                threshold = self.strategy_params.get('percentile_threshold',
+                                                     PercentileStrategy.params.percentile_threshold)
+        return BacktestReport(results, data, percentile, threshold=threshold, **kwargs)
+
+    def plot(self, results: Optional[Dict[str, Any]] = None, path: str = 'backtest_report.html', **kwargs) -> str:
         """
-        绘制回测结果图表
+        生成回测报告文件，各序列降采样后绘制，耗时和文件大小与 bar 数无关
+        :param results: 回测结果，默认为最近一次 run 的结果
+        :param path: 报告路径，按扩展名生成 .html（内嵌 SVG）或 .png（需要 matplotlib）
+        :param kwargs: 传给 BacktestReport 的其他参数（max_points / method / title）
+        :return: 报告路径
         """
-        # self.cerebro.plot(**kwargs) 
-        pass
\ No newline at end of file
+        return self.report(results, **kwargs).save(path)
@@ -0,0 +1,181 @@
+import os
+import glob
+import multiprocessing as mp
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Iterable, Iterator, Tuple
+import pandas as pd
+from config.backtest_config import BACKTEST_PARAMS
+from config.data_config import DATA_SOURCES
+
+
+def find_data_files(data_dir: str, patterns: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """
+    在数据目录下查找数据文件，文件名（不含扩展名）作为标的代码
+    :param data_dir: 数据目录
+    :param patterns: 文件匹配模式，默认使用 DATA_SOURCES 中 excel / csv 的 file_pattern
+    :return: [(标的代码, 文件名)]
+    """
+    if patterns is None:
+        patterns = [DATA_SOURCES['excel']['file_pattern'], DATA_SOURCES['csv']['file_pattern']]
+    files = {}
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            file_name = os.path.relpath(path, data_dir)
+            files.setdefault(os.path.splitext(os.path.basename(path))[0], file_name)
+    return sorted(files.items())
+
+
+def resolve_symbols(data_dir: str, symbols: Iterable[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    按标的代码查找对应的数据文件（优先 .xlsx，其次 .csv），找不到时文件名为 None
+    :param data_dir: 数据目录
+    :param symbols: 标的代码列表
+    :return: [(标的代码, 文件名)]
+    """
+    resolved = []
+    for symbol in symbols:
+        file_name = None
+        for ext in ('.xlsx', '.csv'):
+            if os.path.exists(os.path.join(data_dir, symbol + ext)):
+                file_name = symbol + ext
+                break
+        resolved.append((symbol, file_name))
+    return resolved
+
+
+# 子进程内的运行上下文，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(data_dir, strategy_class, strategy_params, start_date, end_date, initial_cash, mode, quiet):
+    if quiet:
+        # 子进程不返回订单事件，不记录
+        from strategy.trade_log import quiet_params
+        strategy_params = quiet_params(strategy_class, strategy_params)
+    _worker.update(
+        data_dir=data_dir,
+        strategy_class=strategy_class,
+        strategy_params=strategy_params,
+        start_date=start_date,
+        end_date=end_date,
+        initial_cash=initial_cash,
+        mode=mode,
+    )
+
+
+def _run_symbol(task: Tuple[str, Optional[str]]) -> Dict[str, Any]:
+    from engine.analytics import SUMMARY_METRICS
+    from engine.backtest_engine import BacktestEngine
+    from data.file_loader import FileDataLoader
+
+    symbol, file_name = task
+    row = {'symbol': symbol, 'file': file_name}
+    try:
+        if file_name is None:
+            raise FileNotFoundError(f"找不到 {symbol} 的数据文件")
+        loader = FileDataLoader(_worker['data_dir'])
+        if file_name.endswith('.xlsx'):
+            data = loader.load_excel(file_name)
+        elif file_name.endswith('.csv'):
+            data = loader.load_csv(file_name)
+        else:
+            raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+
+        engine = BacktestEngine(mode=_worker['mode'])
+        engine.set_strategy(_worker['strategy_class'], _worker['strategy_params'])
+        engine.set_data(data)
+        engine.set_initial_cash(_worker['initial_cash'])
+        results = engine.run(_worker['start_date'], _worker['end_date'])
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+        return row
+
+    row.update(
+        bars=len(data),
+        initial_value=results['initial_value'],
+        **{name: results[name] for name in SUMMARY_METRICS},
+        trades=len(results['trades']),
+        error=None,
+    )
+    return row
+
+
+class BatchRunner:
+    """
+    多标的批量回测
+    每个标的在子进程中独立加载数据并回测，单个文件出错只记录在结果表中，不影响其他标的
+    """
+
+    def __init__(self, strategy_class, strategy_params: Optional[Dict[str, Any]] = None,
+                 data_dir: str = DATA_SOURCES['excel']['data_dir'],
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 workers: Optional[int] = None,
+                 chunksize: int = 1,
+                 mode: str = 'cerebro',
+                 quiet: bool = True):
+        """
+        初始化批量回测
+        :param strategy_class: 策略类
+        :param strategy_params: 策略参数
+        :param data_dir: 数据目录
+        :param initial_cash: 每个标的的初始资金
+        :param workers: 进程数，默认使用全部 CPU
+        :param chunksize: 每次分发给单个进程的标的数
+        :param mode: 回测模式，见 BacktestEngine
+        :param quiet: 子进程中是否关闭策略的订单事件记录（log_level=OFF，策略参数中显式设置时不覆盖）
+        """
+        self.strategy_class = strategy_class
+        self.strategy_params = dict(strategy_params or {})
+        self.data_dir = data_dir
+        self.initial_cash = initial_cash
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.mode = mode
+        self.quiet = quiet
+
+    def iter_results(self, start_date: datetime, end_date: datetime,
+                     tasks: Iterable[Tuple[str, Optional[str]]]) -> Iterator[Dict[str, Any]]:
+        """
+        逐个返回各标的的回测结果（按完成顺序）
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param tasks: [(标的代码, 文件名)]
+        :return: 结果迭代器
+        """
+        initargs = (self.data_dir, self.strategy_class, self.strategy_params,
+                    start_date, end_date, self.initial_cash, self.mode, self.quiet)
+        with mp.Pool(self.workers, initializer=_init_worker, initargs=initargs) as pool:
+            yield from pool.imap_unordered(_run_symbol, tasks, chunksize=self.chunksize)
+
+    def run(self, start_date: datetime, end_date: datetime,
+            symbols: Optional[Iterable[str]] = None,
+            patterns: Optional[Iterable[str]] = None,
+            output: Optional[str] = None,
+            callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> pd.DataFrame:
+        """
+        运行批量回测
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param symbols: 标的代码列表，默认回测数据目录下的全部文件
+        :param patterns: 查找数据文件的匹配模式
+        :param output: 汇总结果保存路径 (.csv)
+        :param callback: 每完成一个标的时调用
+        :return: 汇总结果表，每行一个标的
+        """
+        if symbols is None:
+            tasks = find_data_files(self.data_dir, patterns)
+        else:
+            tasks = resolve_symbols(self.data_dir, symbols)
+
+        rows = []
+        for row in self.iter_results(start_date, end_date, tasks):
+            if callback:
+                callback(row)
+            rows.append(row)
+
+        table = pd.DataFrame(rows)
+        if not table.empty:
+            table = table.sort_values('symbol').set_index('symbol')
+        if output:
+            table.to_csv(output)
+        return table
@@ -0,0 +1,53 @@
+import backtrader as bt
+
+
+class PreloadedCerebro(bt.Cerebro):
+    """
+    数据只预加载一次的 Cerebro
+    首次运行时按 cerebro 的流程预加载数据，之后的运行直接复用已填充的行缓冲，只把数据指针拨回开头；
+    broker 在每次运行开始时由 cerebro 重新初始化，策略、指标、分析器每次运行都重新创建
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._preloaded = False
+
+    def adddata(self, data, name=None):
+        self._preloaded = False
+        return super().adddata(data, name=name)
+
+    def replacedata(self, data, name=None):
+        """
+        用新的数据源替换已添加的全部数据源
+        """
+        self.release()
+        self.datas.clear()
+        self.datasbyname.clear()
+        return self.adddata(data, name=name)
+
+    def runstrategies(self, iterstrat, predata=False):
+        # 只有 preload + runonce 时数据才是完整的行缓冲，其余情况走 cerebro 原流程
+        if predata or not (self._dopreload and self._dorunonce):
+            return super().runstrategies(iterstrat, predata=predata)
+
+        if not self._preloaded:
+            for data in self.datas:
+                data.reset()
+                if self._exactbars < 1:
+                    data.extend(size=self.params.lookahead)
+                data._start()
+                data.preload()
+            self._preloaded = True
+        else:
+            for data in self.datas:
+                data.home()
+        return super().runstrategies(iterstrat, predata=True)
+
+    def release(self):
+        """
+        释放预加载的数据，下次运行时重新加载
+        """
+        if self._preloaded:
+            for data in self.datas:
+                data.stop()
+            self._preloaded = False
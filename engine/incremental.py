@@ -0,0 +1,288 @@
+import os
+import json
+import backtrader as bt
+import pandas as pd
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from config.backtest_config import BACKTEST_PARAMS
+from strategy.percentile_strategy import PercentileStrategy
+from strategy.percentile_rules import (order_size, exit_hit, cooling_end, buy_fill, sell_fill, affordable,
+                                       position_value, sell_proceeds)
+
+# 状态文件的格式版本，字段变化时递增，load 只接受已知的版本
+STATE_FORMAT = 'percentile-state'
+STATE_VERSION = 1
+
+
+class IncrementalPercentileState:
+    """
+    PercentileStrategy 的增量状态机
+    每追加一根 bar 依次完成：撮合上一根 bar 的挂单 -> 更新百分位窗口 -> 估值 -> 运行策略逻辑，
+    成交规则与 BacktestEngine 的 broker 设置一致（cheat-on-close、百分比滑点、百分比手续费）。
+    只保留回看窗口内的数据，每根 bar 的更新为 O(log w) 次比较加上有序列表 O(w) 的内存移动；
+    状态按带版本号的 JSON 保存，不依赖类的内部结构
+    """
+
+    def __init__(self, strategy_params: Optional[Dict[str, Any]] = None,
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 commission: float = BACKTEST_PARAMS['commission'],
+                 slippage: float = BACKTEST_PARAMS['slippage']):
+        """
+        初始化增量状态
+        :param strategy_params: 策略参数，缺省项使用 PercentileStrategy 的默认值
+        :param initial_cash: 初始资金
+        :param commission: 手续费率
+        :param slippage: 滑点
+        """
+        self.params = dict(PercentileStrategy.params._getitems())
+        self.params.update(strategy_params or {})
+        self.commission = commission
+        self.slippage = slippage
+
+        # 百分位窗口：窗口内 bar 的 (浮点日期, 收盘价) 以及有序的收盘价
+        self.window = deque()
+        self.sorted_closes = []
+        self.first_date = None
+        self.last_bar = None
+
+        # 账户与策略状态
+        self.initial_cash = float(initial_cash)
+        self.cash = float(initial_cash)
+        self.position_size = 0
+        self.position_price = 0.0
+        self.pending = None
+        # 冷静期结束的纳秒时间戳
+        self.cooling_until = None
+        self.bars = 0
+        self.value = self.cash
+        self.peak_value = float('-inf')
+        self.max_drawdown = 0.0
+        self.trades = []
+
+    def append(self, data: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        追加多根 bar
+        :param data: 数据DataFrame，需包含 open / high / low / close 列和日期索引
+        :return: {'signals': 新产生的信号, 'orders': 新成交或失效的订单}
+        """
+        events = {'signals': [], 'orders': []}
+        columns = [data[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close')]
+        for dt, o, h, l, c in zip(data.index.to_pydatetime(), *columns):
+            bar_events = self.append_bar(dt, o, h, l, c)
+            events['signals'].extend(bar_events['signals'])
+            events['orders'].extend(bar_events['orders'])
+        return events
+
+    def append_bar(self, dt: datetime, open: float, high: float, low: float, close: float) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        追加一根 bar
+        :return: {'signals': 新产生的信号, 'orders': 新成交或失效的订单}
+        """
+        dt = pd.Timestamp(dt).to_pydatetime()
+        date = bt.date2num(dt)
+        if self.last_bar is not None and date <= self.last_bar[0]:
+            raise ValueError(f"bar 的时间必须递增: {dt}")
+
+        orders = []
+        if self.pending is not None:
+            orders.append(self._execute(dt, high, low))
+
+        percentile = self._update_percentile(date, close)
+        self.bars += 1
+        self.last_bar = (date, close)
+
+        # 估值与回撤
+        self.value = self._portfolio_value(close)
+        self.peak_value = max(self.peak_value, self.value)
+        drawdown = 100.0 * (self.peak_value - self.value) / self.peak_value
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+
+        signals = []
+        signal = self._next(dt, date, close, percentile)
+        if signal:
+            signals.append(signal)
+        return {'signals': signals, 'orders': orders}
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        当前账户状态
+        """
+        return {
+            'bars': self.bars,
+            'initial_value': self.initial_cash,
+            'final_value': self.value,
+            'total_return': (self.value - self.initial_cash) / self.initial_cash,
+            'max_drawdown': self.max_drawdown / 100,
+            'cash': self.cash,
+            'position_size': self.position_size,
+            'position_price': self.position_price,
+            'trades': list(self.trades),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        可 JSON 序列化的状态，日期时间保存为 ISO 字符串
+        """
+        return {
+            'format': STATE_FORMAT,
+            'version': STATE_VERSION,
+            'params': {k: _encode(v) for k, v in self.params.items() if k != 'percentile_line'},
+            'commission': self.commission,
+            'slippage': self.slippage,
+            'window': [list(bar) for bar in self.window],
+            'first_date': self.first_date,
+            'last_bar': list(self.last_bar) if self.last_bar is not None else None,
+            'initial_cash': self.initial_cash,
+            'cash': self.cash,
+            'position_size': self.position_size,
+            'position_price': self.position_price,
+            'pending': self.pending,
+            'cooling_until': self.cooling_until,
+            'bars': self.bars,
+            'value': self.value,
+            'peak_value': self.peak_value if self.bars else None,
+            'max_drawdown': self.max_drawdown,
+            'trades': [dict(trade, datetime=trade['datetime'].isoformat()) for trade in self.trades],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'IncrementalPercentileState':
+        """
+        由 to_dict 的结果恢复状态
+        """
+        if state.get('format') != STATE_FORMAT or state.get('version') != STATE_VERSION:
+            raise ValueError(f"不支持的增量状态格式: {state.get('format')} v{state.get('version')}")
+        params = {k: _decode(k, v) for k, v in state['params'].items()}
+        self = cls(params, state['initial_cash'], state['commission'], state['slippage'])
+        self.window = deque(tuple(bar) for bar in state['window'])
+        self.sorted_closes = sorted(value for _, value in self.window if value == value)
+        self.first_date = state['first_date']
+        self.last_bar = tuple(state['last_bar']) if state['last_bar'] is not None else None
+        self.cash = state['cash']
+        self.position_size = state['position_size']
+        self.position_price = state['position_price']
+        self.pending = state['pending']
+        self.cooling_until = state['cooling_until']
+        self.bars = state['bars']
+        self.value = state['value']
+        self.peak_value = state['peak_value'] if state['peak_value'] is not None else float('-inf')
+        self.max_drawdown = state['max_drawdown']
+        self.trades = [dict(trade, datetime=datetime.fromisoformat(trade['datetime'])) for trade in state['trades']]
+        return self
+
+    def save(self, path: str):
+        """
+        把状态保存到磁盘（JSON，先写临时文件再原子替换）
+        """
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'IncrementalPercentileState':
+        """
+        从磁盘恢复状态
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (UnicodeDecodeError, ValueError):
+            raise ValueError(f"不是有效的增量状态文件: {path}") from None
+        if not isinstance(state, dict):
+            raise ValueError(f"不是有效的增量状态文件: {path}")
+        return cls.from_dict(state)
+
+    def _update_percentile(self, date: float, close: float) -> float:
+        if self.first_date is None:
+            self.first_date = date
+        # 上一根 bar 进入窗口，移出早于目标起始日的 bar
+        if self.last_bar is not None:
+            self.window.append(self.last_bar)
+            if self.last_bar[1] == self.last_bar[1]:
+                insort(self.sorted_closes, self.last_bar[1])
+        start_date = date - self.params['lookback_days']
+        while self.window and self.window[0][0] < start_date:
+            _, value = self.window.popleft()
+            if value == value:
+                del self.sorted_closes[bisect_left(self.sorted_closes, value)]
+
+        if self.first_date > start_date or not self.window:
+            return float('nan')
+        if close != close:
+            return 0.0
+        return bisect_right(self.sorted_closes, close) / len(self.window)
+
+    def _portfolio_value(self, close: float) -> float:
+        if not self.position_size:
+            return self.cash + 0.0
+        return self.cash + position_value(self.position_size, self.position_price, close)
+
+    def _execute(self, dt: datetime, high: float, low: float) -> Dict[str, Any]:
+        order = self.pending
+        self.pending = None
+        price, size = order['price'], order['size']
+        record = {'datetime': bt.num2date(order['date']), 'side': order['side'], 'size': size}
+
+        if order['side'] == 'buy':
+            fill = float(buy_fill(price, high, self.slippage))
+            comm = abs(size) * self.commission * fill
+            if not affordable(self.cash, size, price, fill, self.commission):
+                record['status'] = 'margin'
+                return record
+            self.cash -= size * fill
+            self.cash -= comm
+            self.position_size = size
+            self.position_price = fill
+        else:
+            fill = float(sell_fill(price, low, self.slippage))
+            self.cash += sell_proceeds(-size, self.position_price, fill)
+            comm = abs(size) * self.commission * fill
+            self.cash -= comm
+            self.position_size = 0
+            self.position_price = 0.0
+            self.cooling_until = cooling_end(pd.Timestamp(dt).value, self.params['cooling_days'])
+
+        trade = dict(record, price=float(size * fill / size), comm=float(comm))
+        self.trades.append(trade)
+        return dict(trade, status='completed')
+
+    def _next(self, dt: datetime, date: float, close: float, percentile: float) -> Optional[Dict[str, Any]]:
+        # 预热期内不交易
+        if self.params.get('trade_start') is not None and dt < self.params['trade_start']:
+            return None
+        if not self.position_size:
+            # 冷静期内不买入
+            if self.cooling_until is not None:
+                if pd.Timestamp(dt).value < self.cooling_until:
+                    return None
+                self.cooling_until = None
+            if percentile < self.params['percentile_threshold']:
+                shares = order_size(self.cash, close, self.commission, self.slippage)
+                if not shares:
+                    return None
+                self.pending = {'side': 'buy', 'size': shares, 'price': close, 'date': date}
+                return {'datetime': dt, 'side': 'buy', 'size': shares, 'price': close, 'percentile': percentile}
+            return None
+
+        if exit_hit(close, self.position_price, self.params['profit_threshold'], self.params['max_loss_threshold']):
+            profit_ratio = (close - self.position_price) / self.position_price
+            self.pending = {'side': 'sell', 'size': -self.position_size, 'price': close, 'date': date}
+            return {'datetime': dt, 'side': 'sell', 'size': -self.position_size, 'price': close,
+                    'profit': profit_ratio}
+        return None
+
+
+def _encode(value):
+    # 策略参数中的时间（如 trade_start）保存为 ISO 字符串
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode(name: str, value):
+    if name == 'trade_start' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
@@ -0,0 +1,265 @@
+import os
+import random
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Iterable, Iterator, Tuple
+import numpy as np
+import pandas as pd
+from config.backtest_config import BACKTEST_PARAMS
+
+
+def grid_params(param_grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    网格搜索：生成所有参数组合
+    :param param_grid: {参数名: 候选值列表}
+    :return: 参数组合列表
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+
+
+def random_params(param_space: Dict[str, Any], n_iter: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    随机搜索：按参数空间采样
+    候选值列表表示随机选取其中一个，(最小值, 最大值) 元组表示在区间内均匀采样（两端均为整数时采样整数）
+    :param param_space: {参数名: 候选值列表 或 (最小值, 最大值)}
+    :param n_iter: 采样次数
+    :param seed: 随机种子
+    :return: 参数组合列表
+    """
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n_iter):
+        params = {}
+        for name, space in param_space.items():
+            if isinstance(space, tuple):
+                low, high = space
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(space))
+        samples.append(params)
+    return samples
+
+
+class SharedFrame:
+    """
+    把 OHLCV DataFrame 放入共享内存，子进程按名称挂载，避免每次运行都 pickle 整份数据
+    布局为一行 int64 纳秒时间戳索引，后接各列的 float64 数据
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.index_name = df.index.name
+        self.columns = list(df.columns)
+        self.length = len(df)
+        size = (len(self.columns) + 1) * self.length * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        stamps = np.ndarray(self.length, dtype=np.int64, buffer=self.shm.buf)
+        stamps[:] = df.index.values.astype('datetime64[ns]').view(np.int64)
+        block = np.ndarray((len(self.columns), self.length), dtype=np.float64,
+                           buffer=self.shm.buf, offset=self.length * 8)
+        for i, column in enumerate(self.columns):
+            block[i] = df[column].to_numpy(dtype=np.float64)
+
+    @property
+    def descriptor(self) -> Tuple[str, Any, List[str], int]:
+        """
+        子进程挂载所需的信息
+        """
+        return self.shm.name, self.index_name, self.columns, self.length
+
+    @staticmethod
+    def attach(descriptor: Tuple[str, Any, List[str], int]) -> Tuple[shared_memory.SharedMemory, pd.DataFrame]:
+        """
+        在子进程中挂载共享内存并还原 DataFrame
+        :param descriptor: SharedFrame.descriptor
+        :return: (共享内存句柄, DataFrame)
+        """
+        name, index_name, columns, length = descriptor
+        shm = shared_memory.SharedMemory(name=name)
+        stamps = np.ndarray(length, dtype=np.int64, buffer=shm.buf)
+        block = np.ndarray((len(columns), length), dtype=np.float64, buffer=shm.buf, offset=length * 8)
+        index = pd.DatetimeIndex(stamps.view('datetime64[ns]'), name=index_name)
+        df = pd.DataFrame({column: block[i] for i, column in enumerate(columns)}, index=index, copy=False)
+        return shm, df
+
+    def close(self):
+        """
+        释放共享内存
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+
+# 子进程内的运行上下文，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(descriptor, strategy_class, base_params, start_date, end_date, initial_cash, commission, slippage,
+                 mode, quiet, indicator_dir=None):
+    if quiet:
+        # 子进程不返回订单事件，不记录
+        from strategy.trade_log import quiet_params
+        base_params = quiet_params(strategy_class, base_params)
+    shm, df = SharedFrame.attach(descriptor)
+    _worker.update(
+        shm=shm,
+        data=df,
+        strategy_class=strategy_class,
+        base_params=base_params,
+        start_date=start_date,
+        end_date=end_date,
+        initial_cash=initial_cash,
+        commission=commission,
+        slippage=slippage,
+        mode=mode,
+        indicator_dir=indicator_dir,
+    )
+
+
+def _run_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    from engine.analytics import SUMMARY_METRICS
+    from engine.session import BacktestSession
+
+    # 每个子进程只转换、预加载一次数据，之后的参数组复用同一个会话
+    session = _worker.get('session')
+    if session is None:
+        from indicator.store import IndicatorStore
+
+        indicator_dir = _worker['indicator_dir']
+        session = _worker['session'] = BacktestSession(
+            _worker['data'], mode=_worker['mode'],
+            strategy_class=_worker['strategy_class'],
+            strategy_params=_worker['base_params'],
+            initial_cash=_worker['initial_cash'],
+            commission=_worker['commission'],
+            slippage=_worker['slippage'],
+            indicator_store=IndicatorStore(indicator_dir) if indicator_dir else None,
+        )
+    try:
+        results = session.run(_worker['start_date'], _worker['end_date'], strategy_params=params)
+    except Exception as e:
+        return {'params': params, 'error': f'{type(e).__name__}: {e}'}
+    return {'params': params, **{name: results[name] for name in SUMMARY_METRICS}}
+
+
+class ParameterOptimizer:
+    """
+    多进程参数寻优
+    数据通过共享内存传给子进程，参数组按 chunksize 分批分发，结果按完成顺序流式返回
+    """
+
+    def __init__(self, strategy_class, data: pd.DataFrame, start_date: datetime, end_date: datetime,
+                 base_params: Optional[Dict[str, Any]] = None,
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 commission: float = BACKTEST_PARAMS['commission'],
+                 slippage: float = BACKTEST_PARAMS['slippage'],
+                 workers: Optional[int] = None,
+                 chunksize: int = 1,
+                 mode: str = 'cerebro',
+                 quiet: bool = True,
+                 indicator_dir: Optional[str] = None):
+        """
+        初始化参数寻优器
+        :param strategy_class: 策略类
+        :param data: 数据DataFrame
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param base_params: 基础策略参数，寻优参数会覆盖其中的同名项
+        :param initial_cash: 初始资金
+        :param commission: 手续费率
+        :param slippage: 滑点
+        :param workers: 进程数，默认使用全部 CPU
+        :param chunksize: 每次分发给单个进程的参数组数
+        :param mode: 回测模式，见 BacktestEngine
+        :param quiet: 子进程中是否关闭策略的订单事件记录（log_level=OFF，策略参数中显式设置时不覆盖）
+        :param indicator_dir: 指标线存储（IndicatorStore）的目录；设置时 PercentileStrategy 的百分位在主进程中
+                              按全部 lookback_days 一次批量计算，各子进程以内存映射方式共享读取
+        """
+        self.strategy_class = strategy_class
+        self.data = data
+        self.start_date = start_date
+        self.end_date = end_date
+        self.base_params = dict(base_params or {})
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.slippage = slippage
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.mode = mode
+        self.quiet = quiet
+        self.indicator_dir = indicator_dir
+
+    def precompute(self, params: List[Dict[str, Any]], data: Optional[pd.DataFrame] = None):
+        """
+        把参数组用到的全部 lookback_days 的百分位一次写入指标线存储，子进程只读取
+        :param params: 参数组合
+        :param data: 子进程看到的数据（共享内存中的 float64 副本，指纹与原数据不同），默认使用原数据
+        """
+        from engine.result_cache import data_fingerprint
+        from indicator.store import IndicatorStore
+        from strategy.percentile_strategy import PercentileStrategy
+
+        if not self.indicator_dir or not issubclass(self.strategy_class, PercentileStrategy):
+            return
+        data = self.data if data is None else data
+        default = self.base_params.get('lookback_days', PercentileStrategy.params.lookback_days)
+        lookbacks = [p.get('lookback_days', default) for p in params]
+        IndicatorStore(self.indicator_dir).percentile(data, lookbacks, data_hash=data_fingerprint(data))
+
+    def iter_results(self, params: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        逐个返回参数组的回测结果（按完成顺序）
+        :param params: 参数组合
+        :return: 结果迭代器
+        """
+        frame = SharedFrame(self.data)
+        try:
+            if self.indicator_dir:
+                params = list(params)
+                shm, shared = SharedFrame.attach(frame.descriptor)
+                self.precompute(params, shared)
+                del shared
+                shm.close()
+            initargs = (frame.descriptor, self.strategy_class, self.base_params,
+                        self.start_date, self.end_date, self.initial_cash, self.commission, self.slippage,
+                        self.mode, self.quiet, self.indicator_dir)
+            with mp.Pool(self.workers, initializer=_init_worker, initargs=initargs) as pool:
+                yield from pool.imap_unordered(_run_params, params, chunksize=self.chunksize)
+        finally:
+            frame.close()
+
+    def run(self, params: Iterable[Dict[str, Any]], sort_by: str = 'total_return',
+            callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> pd.DataFrame:
+        """
+        运行全部参数组并返回排名表
+        :param params: 参数组合
+        :param sort_by: 排名所依据的指标（降序；max_drawdown 为升序）
+        :param callback: 每得到一组结果时调用
+        :return: 结果表，每行一组参数
+        """
+        rows = []
+        for result in self.iter_results(params):
+            if callback:
+                callback(result)
+            rows.append({**result['params'], **{k: v for k, v in result.items() if k != 'params'}})
+        return rank_results(rows, sort_by)
+
+
+def rank_results(rows: List[Dict[str, Any]], sort_by: str = 'total_return') -> pd.DataFrame:
+    """
+    把结果整理为排名表
+    :param rows: 结果行
+    :param sort_by: 排名所依据的指标（降序；max_drawdown 为升序）
+    :return: 排名表
+    """
+    table = pd.DataFrame(rows)
+    if table.empty or sort_by not in table.columns:
+        return table
+    table = table.sort_values(sort_by, ascending=(sort_by == 'max_drawdown'), na_position='last')
+    table.index = pd.RangeIndex(1, len(table) + 1, name='rank')
+    return table
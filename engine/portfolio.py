@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Union
+from config.backtest_config import BACKTEST_PARAMS
+from data.compact import CompactBars
+from data.dates import date2num_array
+from engine.analytics import compute_metrics
+from indicator.percentile_indicator import percentile_rank
+from strategy.percentile_strategy import PercentileStrategy
+from strategy.percentile_rules import order_size, exit_hit, cooling_end, buy_fill, sell_fill, sell_proceeds
+
+# 仓位分配方式：'equal' 每个持仓按账户总价值的固定比例；'cash' 可用资金平均分给剩余的持仓名额
+SIZING_MODES = ('equal', 'cash')
+
+
+def align_symbols(data: Dict[str, Union[pd.DataFrame, CompactBars]], lookback_days: float,
+                  start_date: datetime, end_date: datetime, warmup: pd.Timedelta) -> Dict[str, Any]:
+    """
+    把各标的的回测区间（含预热期）对齐到统一的时间轴
+    各标的的百分位在自己的 bar 上计算后再对齐，某一时刻没有 bar 的标的在矩阵中为 NaN
+    :param data: {标的: DataFrame 或 CompactBars}
+    :param lookback_days: 百分位的回看天数
+    :param start_date: 开始日期
+    :param end_date: 结束日期
+    :param warmup: 预热时长
+    :return: {'index': 统一时间轴, 'symbols', 'close' / 'high' / 'low' / 'percentile': (时刻数, 标的数) 矩阵}
+    """
+    symbols = list(data)
+    warm_start = pd.Timestamp(start_date) - warmup
+    slices = []
+    for symbol in symbols:
+        frame = data[symbol]
+        if not frame.index.is_monotonic_increasing:
+            frame = frame.sort_index()
+        index = frame.index
+        # 与 BacktestEngine.date_range 相同：多留一根 bar 以防浮点日期的舍入
+        begin = max(int(index.searchsorted(warm_start, side='right')) - 2, 0)
+        stop = int(index.searchsorted(pd.Timestamp(end_date), side='right'))
+        slices.append((frame, begin, stop))
+
+    stamps = [pd.DatetimeIndex(frame.index[begin:stop]).as_unit('ns').asi8 for frame, begin, stop in slices]
+    timeline = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+    shape = (len(timeline), len(symbols))
+    index = pd.DatetimeIndex(timeline.view('datetime64[ns]'))
+    # 浮点日期在统一时间轴上只转换一次
+    dates = date2num_array(index)
+    matrices = {name: np.full(shape, np.nan) for name in ('close', 'high', 'low', 'percentile')}
+    for j, ((frame, begin, stop), own) in enumerate(zip(slices, stamps)):
+        rows = np.searchsorted(timeline, own)
+        close = frame['close'].to_numpy(dtype=np.float64)[begin:stop]
+        matrices['close'][rows, j] = close
+        matrices['high'][rows, j] = frame['high'].to_numpy(dtype=np.float64)[begin:stop]
+        matrices['low'][rows, j] = frame['low'].to_numpy(dtype=np.float64)[begin:stop]
+        matrices['percentile'][rows, j] = percentile_rank(dates[rows], close, lookback_days)
+    return {'index': index, 'symbols': symbols, **matrices}
+
+
+class PortfolioEngine:
+    """
+    共享资金的多标的 PercentileStrategy 组合回测
+    全部标的在同一时间轴上逐时刻推进，只有一个现金账户；百分位、持仓、成本价、挂单和冷静期都保存在按标的排列的数组中，
+    每个时刻的信号判断、成交和估值都是跨标的的向量运算，不为每个标的创建策略实例。
+    单个标的的交易规则与 run_percentile_vectorized 一致（bar 收盘下单、下一根 bar 按下单价加滑点成交）；
+    同一时刻的多个买入信号按百分位从低到高依次分配资金，成交时资金不足的订单失效
+    """
+
+    def __init__(self, strategy_params: Optional[Dict[str, Any]] = None,
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 commission: float = BACKTEST_PARAMS['commission'],
+                 slippage: float = BACKTEST_PARAMS['slippage'],
+                 max_positions: int = 10,
+                 sizing: str = 'equal',
+                 position_size: Optional[float] = None):
+        """
+        初始化组合回测
+        :param strategy_params: 策略参数，缺省项使用 PercentileStrategy 的默认值
+        :param initial_cash: 初始资金
+        :param commission: 手续费率
+        :param slippage: 滑点
+        :param max_positions: 最多同时持有的标的数
+        :param sizing: 仓位分配方式，见 SIZING_MODES
+        :param position_size: 'equal' 方式下每个持仓占账户总价值的比例，默认 1 / max_positions
+        """
+        if sizing not in SIZING_MODES:
+            raise ValueError(f"不支持的仓位分配方式: {sizing}")
+        if max_positions < 1:
+            raise ValueError("max_positions must be positive")
+        if position_size is not None and not 0 < position_size <= 1:
+            raise ValueError("position_size must be in (0, 1]")
+        self.params = dict(PercentileStrategy.params._getitems())
+        self.params.update(strategy_params or {})
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.slippage = slippage
+        self.max_positions = max_positions
+        self.sizing = sizing
+        self.position_size = position_size if position_size is not None else 1.0 / max_positions
+        self.data = {}
+
+    def set_data(self, data: Dict[str, Union[pd.DataFrame, CompactBars]]):
+        """
+        设置回测数据
+        :param data: {标的: DataFrame 或 CompactBars}，需包含 high / low / close 列和日期索引
+        """
+        if not data:
+            raise ValueError("At least one symbol is required")
+        self.data = dict(data)
+
+    def run(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """
+        运行组合回测
+        :param start_date: 开始日期，之前的 bar 只用于指标预热
+        :param end_date: 结束日期
+        :return: 回测结果，含 analytics.SUMMARY_METRICS 中的各项指标；equity 为逐时刻账户价值，
+                 trades 为成交记录（含 symbol），positions 为期末持仓 {标的: 股数}
+        """
+        if not self.data:
+            raise ValueError("Data must be set before running backtest")
+        params = self.params
+        aligned = align_symbols(self.data, params['lookback_days'], start_date, end_date,
+                                PercentileStrategy.warmup(params))
+        index, symbols = aligned['index'], aligned['symbols']
+        close, high, low, percentile = aligned['close'], aligned['high'], aligned['low'], aligned['percentile']
+        stamps = index.asi8
+        n_bars, n_symbols = close.shape
+
+        # 估值用最近一次的收盘价
+        mark = pd.DataFrame(close).ffill().fillna(0.0).to_numpy()
+        valid = ~np.isnan(close)
+        with np.errstate(invalid='ignore'):
+            signal = valid & (percentile < params['percentile_threshold'])
+        first_trade = int(np.searchsorted(stamps, pd.Timestamp(start_date).as_unit('ns').value, side='left'))
+
+        commission, slippage = self.commission, self.slippage
+        profit, loss = params['profit_threshold'], params['max_loss_threshold']
+        cash = float(self.initial_cash)
+        shares = np.zeros(n_symbols, dtype=np.int64)
+        cost = np.zeros(n_symbols)
+        # 挂单：1 买入，-1 卖出；下单价和下单时刻（成交记录的时间与 cerebro 模式一致，为下单 bar）
+        pending = np.zeros(n_symbols, dtype=np.int8)
+        order_shares = np.zeros(n_symbols, dtype=np.int64)
+        order_price = np.zeros(n_symbols)
+        order_bar = np.zeros(n_symbols, dtype=np.int64)
+        order_rank = np.zeros(n_symbols)
+        resume = np.full(n_symbols, np.iinfo(np.int64).min)
+        values = np.empty(n_bars)
+        fills = []
+
+        for t in range(n_bars):
+            # 成交上一根 bar 的挂单：先卖后买，卖出回笼的资金可用于同一时刻的买入
+            if pending.any():
+                ready = np.flatnonzero((pending != 0) & valid[t])
+                sells = ready[pending[ready] < 0]
+                if len(sells):
+                    fill = sell_fill(order_price[sells], low[t, sells], slippage)
+                    size = shares[sells]
+                    comm = size * commission * fill
+                    cash += float(np.sum(sell_proceeds(size, cost[sells], fill) - comm))
+                    fills.append((sells, order_bar[sells], -size, fill, comm))
+                    shares[sells] = 0
+                    resume[sells] = cooling_end(stamps[t], params['cooling_days'])
+                buys = ready[pending[ready] > 0]
+                if len(buys):
+                    buys = buys[np.argsort(order_rank[buys], kind='stable')]
+                    size = order_shares[buys]
+                    fill = buy_fill(order_price[buys], high[t, buys], slippage)
+                    comm = size * commission * fill
+                    need = size * fill + comm
+                    # 按优先级累计，资金不足的订单及其后的订单失效
+                    accepted = np.cumsum(need) <= cash
+                    if accepted.any():
+                        filled = buys[accepted]
+                        cash -= float(np.sum(need[accepted]))
+                        shares[filled] = size[accepted]
+                        cost[filled] = fill[accepted]
+                        fills.append((filled, order_bar[filled], size[accepted], fill[accepted], comm[accepted]))
+                pending[ready] = 0
+
+            values[t] = cash + float(shares @ mark[t])
+            if t < first_trade:
+                continue
+
+            # 止盈 / 止损
+            held = (shares > 0) & valid[t] & (pending == 0)
+            if held.any():
+                exits = np.flatnonzero(held)
+                exits = exits[exit_hit(close[t, exits], cost[exits], profit, loss)]
+                pending[exits] = -1
+                order_price[exits] = close[t, exits]
+                order_bar[exits] = t
+
+            # 开仓：百分位低于阈值、空仓、无挂单且不在冷静期内
+            slots = self.max_positions - int(np.count_nonzero((shares > 0) | (pending > 0)))
+            if slots <= 0:
+                continue
+            candidates = np.flatnonzero(signal[t] & (shares == 0) & (pending == 0) & (resume <= stamps[t]))
+            if not len(candidates):
+                continue
+            candidates = candidates[np.argsort(percentile[t, candidates], kind='stable')][:slots]
+            reserved = pending > 0
+            available = cash - float(np.sum(order_shares[reserved] * order_price[reserved]
+                                            * (1 + commission + slippage)))
+            if self.sizing == 'cash':
+                budget = np.full(len(candidates), available / slots)
+            else:
+                target = values[t] * self.position_size
+                allotted = np.arange(len(candidates)) * target
+                budget = np.clip(available - allotted, 0.0, target)
+            price = close[t, candidates]
+            size = order_size(budget, price, commission, slippage)
+            ordered = size > 0
+            candidates = candidates[ordered]
+            pending[candidates] = 1
+            order_shares[candidates] = size[ordered]
+            order_price[candidates] = price[ordered]
+            order_bar[candidates] = t
+            order_rank[candidates] = percentile[t, candidates]
+
+        trades = self._trades(fills, index, symbols)
+        metrics = compute_metrics(values, index, trades, self.initial_cash, start_date, end_date)
+        return {
+            'initial_value': self.initial_cash,
+            **metrics,
+            'equity': pd.Series(values, index=index, name='equity'),
+            'trades': trades,
+            'positions': {symbols[j]: int(shares[j]) for j in np.flatnonzero(shares)},
+            'symbols': symbols,
+            'strategy': PercentileStrategy.__name__,
+            'start_date': start_date,
+            'end_date': end_date,
+        }
+
+    @staticmethod
+    def _trades(fills: List[tuple], index: pd.DatetimeIndex, symbols: List[str]) -> List[Dict[str, Any]]:
+        """
+        把逐时刻按数组记录的成交展开为成交记录，按成交顺序排列
+        """
+        trades = []
+        for columns, bars, sizes, prices, comms in fills:
+            dates = index[bars].to_pydatetime()
+            for j, dt, size, price, comm in zip(columns.tolist(), dates, sizes.tolist(), prices.tolist(),
+                                                comms.tolist()):
+                trades.append({
+                    'symbol': symbols[j],
+                    'datetime': dt,
+                    'side': 'buy' if size > 0 else 'sell',
+                    'size': size,
+                    # 与 OrderData 按成交明细求均价的结果保持一致
+                    'price': size * price / size,
+                    'comm': comm,
+                })
+        return trades
@@ -0,0 +1,279 @@
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any, List, Optional, Iterable
+import backtrader as bt
+
+# 各类对象需要计时的回调
+STRATEGY_CALLBACKS = ('start', 'prenext', 'nextstart', 'next', 'notify_order', 'notify_trade',
+                      'notify_cashvalue', 'stop', 'log')
+INDICATOR_CALLBACKS = ('next', 'once')
+ANALYZER_CALLBACKS = ('start', 'next', 'notify_cashvalue', 'notify_order', 'notify_trade', 'stop')
+OBSERVER_CALLBACKS = ('next',)
+WRITER_CALLBACKS = ('start', 'next', 'stop')
+
+
+class StackSampler:
+    """
+    采样式性能分析：后台线程定期抓取目标线程的调用栈，按折叠栈（flamegraph 格式）计数
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        """
+        :param interval: 采样间隔（秒）
+        :param thread_id: 被采样的线程，默认为创建采样器的线程
+        """
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """
+        折叠栈文本，可直接交给 flamegraph.pl / speedscope
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RunProfiler:
+    """
+    回测运行的性能剖析器
+    记录各阶段的墙钟时间和 CPU 时间，以及策略、指标、分析器、writer 各回调的调用次数和累计耗时（含嵌套调用），
+    可选开启 cProfile 和调用栈采样。只在 profile=True 时创建，关闭时对回测没有任何额外开销
+    """
+
+    def __init__(self, cprofile: bool = False, sample_interval: Optional[float] = None, top: int = 30):
+        """
+        :param cprofile: 是否开启 cProfile
+        :param sample_interval: 调用栈采样间隔（秒），None 表示不采样
+        :param top: cProfile 结果保留的函数个数（按累计耗时）
+        """
+        self.phases = {}
+        self.callbacks = defaultdict(lambda: [0, 0.0])
+        self.top = top
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.sampler = StackSampler(sample_interval) if sample_interval else None
+        self._patches = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        统计一个阶段的墙钟时间和 CPU 时间，同名阶段累加
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add_phase(self, name: str, wall: float, cpu: float):
+        phase = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        phase['wall'] += wall
+        phase['cpu'] += cpu
+        phase['calls'] += 1
+
+    @contextmanager
+    def sampling(self):
+        """
+        在此上下文中开启 cProfile 和调用栈采样
+        """
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        if self.sampler is not None:
+            self.sampler.start()
+        try:
+            yield
+        finally:
+            if self.sampler is not None:
+                self.sampler.stop()
+            if self.cprofile is not None:
+                self.cprofile.disable()
+
+    def _timed(self, func, key):
+        stats = self.callbacks[key]
+        clock = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += clock() - start
+        return wrapper
+
+    def _patch(self, target: Any, name: str, wrapper):
+        # 记录原属性（类或实例自身的 __dict__ 中是否存在），restore() 时恢复
+        own = name in vars(target)
+        self._patches.append((target, name, vars(target).get(name), own))
+        setattr(target, name, wrapper)
+
+    def _phased(self, func, name: str):
+        profiler = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def instrument_class(self, cls: type, names: Iterable[str], kind: str):
+        """
+        替换类上的回调为计时版本，restore() 时恢复
+        """
+        for name in names:
+            func = getattr(cls, name, None)
+            if func is not None:
+                self._patch(cls, name, self._timed(func, (kind, f'{cls.__name__}.{name}')))
+
+    def instrument_cerebro(self, cerebro: bt.Cerebro, strategy_class: type):
+        """
+        在 cerebro.run() 之前安装全部计时钩子：
+        数据预加载、策略初始化（含指标构建）、策略启动、主循环、策略结束分阶段计时，
+        策略、writer 的回调计时，策略启动后再为其指标、分析器、观察器计时
+        """
+        profiler = self
+        for data in cerebro.datas:
+            self._patch(data, 'preload', self._phased(data.preload, 'preload'))
+        for writer_class, _, _ in cerebro.writers:
+            self.instrument_class(writer_class, WRITER_CALLBACKS, 'writer')
+        self.instrument_class(strategy_class, STRATEGY_CALLBACKS, 'strategy')
+        self._patch(strategy_class, '__init__', self._phased(strategy_class.__init__, 'strategy_init'))
+
+        strategy_start = strategy_class._start
+        strategy_stop = strategy_class._stop
+        loop = {}
+
+        def _start(strategy):
+            with profiler.phase('strategy_start'):
+                strategy_start(strategy)
+            profiler.instrument_strategy(strategy)
+            loop['start'] = time.perf_counter(), time.process_time()
+
+        def _stop(strategy):
+            wall, cpu = loop.pop('start')
+            profiler.add_phase('loop', time.perf_counter() - wall, time.process_time() - cpu)
+            with profiler.phase('strategy_stop'):
+                strategy_stop(strategy)
+
+        self._patch(strategy_class, '_start', _start)
+        self._patch(strategy_class, '_stop', _stop)
+
+    def instrument(self, obj: Any, names: Iterable[str], kind: str):
+        """
+        替换单个对象上的回调为计时版本，同类对象的统计合并
+        """
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is None:
+                continue
+            setattr(obj, name, self._timed(method, (kind, f'{type(obj).__name__}.{name}')))
+
+    def instrument_strategy(self, strategy: bt.Strategy):
+        """
+        为策略下的指标（递归）、分析器和观察器计时，须在 strategy._start() 之后、主循环之前调用
+        """
+        pending = list(strategy._lineiterators[bt.LineIterator.IndType])
+        while pending:
+            indicator = pending.pop()
+            self.instrument(indicator, INDICATOR_CALLBACKS, 'indicator')
+            pending.extend(indicator._lineiterators[bt.LineIterator.IndType])
+        for analyzer in strategy.analyzers:
+            self.instrument(analyzer, ANALYZER_CALLBACKS, 'analyzer')
+        for observer in strategy.observers:
+            self.instrument(observer, OBSERVER_CALLBACKS, 'observer')
+
+    def restore(self):
+        """
+        撤销 instrument_class / instrument_cerebro 安装的钩子
+        """
+        while self._patches:
+            target, name, original, own = self._patches.pop()
+            if own:
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+
+    def report(self, **extra) -> Dict[str, Any]:
+        """
+        汇总剖析结果
+        :param extra: 附加到结果中的字段（如模式、bar 数）
+        :return: {'phases', 'callbacks', 'cprofile', 'samples', 'stacks', ...}
+        """
+        callbacks = [{
+            'kind': kind,
+            'name': name,
+            'calls': calls,
+            'wall': wall,
+            'per_call': wall / calls if calls else 0.0,
+        } for (kind, name), (calls, wall) in self.callbacks.items() if calls]
+        callbacks.sort(key=lambda c: c['wall'], reverse=True)
+
+        report = dict(extra)
+        report['phases'] = self.phases
+        report['callbacks'] = callbacks
+        if self.cprofile is not None:
+            report['cprofile'] = self._cprofile_rows()
+        if self.sampler is not None:
+            report['samples'] = self.sampler.samples
+            report['stacks'] = dict(self.sampler.stacks.most_common())
+        return report
+
+    def _cprofile_rows(self) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self.cprofile)
+        rows = []
+        for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                'function': f'{name} ({filename}:{line})',
+                'calls': nc,
+                'primitive_calls': cc,
+                'tottime': tt,
+                'cumtime': ct,
+            })
+        rows.sort(key=lambda r: r['cumtime'], reverse=True)
+        return rows[:self.top]
+
+    def save(self, path: str, report: Dict[str, Any]):
+        """
+        保存剖析结果：path 为 JSON；开启采样时另存 <path>.folded 折叠栈，开启 cProfile 时另存 <path>.prof
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        if self.sampler is not None:
+            with open(f'{path}.folded', 'w', encoding='utf-8') as f:
+                f.write(self.sampler.folded())
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(f'{path}.prof')
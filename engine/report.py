@@ -0,0 +1,483 @@
+import os
+import html
+import math
+import warnings
+import multiprocessing as mp
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+import numpy as np
+import pandas as pd
+from engine.analytics import SUMMARY_METRICS
+
+# 降采样方式：LTTB（保留折线形状）/ 每个桶保留最小值和最大值（保留极值）
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+REPORT_FORMATS = ('html', 'png')
+
+# 各图的标题和颜色
+PANELS = (
+    ('price', '价格', '#1f77b4'),
+    ('percentile', '百分位', '#9467bd'),
+    ('equity', '账户价值', '#2ca02c'),
+    ('drawdown', '回撤', '#d62728'),
+)
+BUY_COLOR, SELL_COLOR = '#2ca02c', '#d62728'
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样：保留首尾点，其余每个桶选取与前一选中点、下一桶均值构成最大三角形的点
+    每个桶内是 NumPy 向量运算，只按桶数循环，耗时与输出点数成正比、与输入长度线性相关
+    :param x: 横坐标（升序）
+    :param y: 纵坐标，NaN 的点不会被选中（整桶为 NaN 时取桶首）
+    :param n_out: 输出点数
+    :return: 选中点的位置（升序）
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for i in range(n_out - 2):
+            lo, hi = edges[i], edges[i + 1]
+            if i + 2 < len(edges):
+                next_x, next_y = x[hi:edges[i + 2]].mean(), np.nanmean(y[hi:edges[i + 2]])
+            else:
+                next_x, next_y = x[-1], y[-1]
+            if next_y != next_y:
+                next_y = y[a]
+            area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+            area[np.isnan(area)] = -1.0
+            a = lo + int(np.argmax(area)) if hi > lo else lo
+            selected[i + 1] = a
+    return selected
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    最小/最大值降采样：分为 (n_out - 2) / 2 个等长的桶，每个桶保留最小值和最大值所在的点，另加首尾点
+    :param y: 纵坐标，NaN 的点不会被选中
+    :param n_out: 输出点数上限
+    :return: 选中点的位置（升序、去重）
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    # 首尾点各占一个名额
+    buckets = (n_out - 2) // 2
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.argmin(np.where(missing, np.inf, blocks), axis=1)
+    highs = offsets + np.argmax(np.where(missing, -np.inf, blocks), axis=1)
+    keep = np.concatenate([[0, n - 1], lows, highs])
+    keep = keep[keep < n]
+    return np.unique(keep)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int, method: str = 'lttb') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把序列降采样到不超过 max_points 个点
+    :param x: 横坐标
+    :param y: 纵坐标
+    :param max_points: 最大点数
+    :param method: 降采样方式，见 DOWNSAMPLE_METHODS
+    :return: (x, y)
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"不支持的降采样方式: {method}")
+    selected = lttb(x, y, max_points) if method == 'lttb' else minmax(y, max_points)
+    return np.asarray(x)[selected], np.asarray(y)[selected]
+
+
+def thin_markers(x: np.ndarray, y: np.ndarray, max_markers: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    成交标记超过 max_markers 个时按时间等分为 max_markers 个桶，每个桶只保留最早的一个
+    :param x: 纳秒时间戳
+    :param y: 成交价
+    :param max_markers: 最大标记数
+    :return: 按时间排序的 (x, y)
+    """
+    order = np.argsort(x, kind='stable')
+    x, y = np.asarray(x)[order], np.asarray(y)[order]
+    if len(x) <= max_markers:
+        return x, y
+    span = int(x[-1] - x[0]) + 1
+    buckets = ((x - x[0]).astype(np.float64) / span * max_markers).astype(np.int64)
+    # 浮点舍入可能使最后一个点落到第 max_markers 个桶
+    _, first = np.unique(np.minimum(buckets, max_markers - 1), return_index=True)
+    return x[first], y[first]
+
+
+class BacktestReport:
+    """
+    回测报告：价格与成交标记、百分位、账户价值和回撤四张图以及指标表
+    各序列先按 max_points 降采样，成交标记最多 max_markers 个，绘图耗时和文件大小与 bar 数和成交笔数无关；
+    HTML 为内嵌 SVG 的单文件，不依赖外部脚本；PNG 需要 matplotlib
+    """
+
+    def __init__(self, result: Dict[str, Any], data: Optional[pd.DataFrame] = None,
+                 percentile: Optional[np.ndarray] = None,
+                 threshold: Optional[float] = None,
+                 max_points: int = 2000,
+                 method: str = 'lttb',
+                 title: Optional[str] = None,
+                 symbol: Optional[str] = None,
+                 max_markers: int = 500):
+        """
+        :param result: BacktestEngine.run（或 PortfolioEngine.run）的结果，需含 equity / trades / start_date / end_date
+        :param data: 行情数据（含 close 列），None 时不绘制价格图；组合回测时为 symbol 的行情
+        :param percentile: 与 data 对齐的百分位线，None 时不绘制百分位图
+        :param threshold: 百分位图上标出的买入阈值
+        :param max_points: 每条序列的最大点数
+        :param method: 降采样方式，见 DOWNSAMPLE_METHODS；回撤始终按 minmax 降采样以保留最大回撤
+        :param title: 报告标题，默认为策略名
+        :param symbol: 组合回测结果中价格图对应的标的，只标出该标的的成交；
+                       为 None 且成交记录含多个标的时不绘制成交标记（不同标的的价格不在同一坐标轴上）
+        :param max_markers: 买入、卖出标记各自的最大数量，见 thin_markers
+        """
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"不支持的降采样方式: {method}")
+        if max_points < 4:
+            raise ValueError("max_points must be at least 4")
+        if max_markers < 1:
+            raise ValueError("max_markers must be positive")
+        if percentile is not None and (data is None or len(percentile) != len(data)):
+            raise ValueError("percentile must be aligned with data")
+        self.result = result
+        self.data = data
+        self.percentile = percentile
+        self.threshold = threshold
+        self.max_points = max_points
+        self.method = method
+        self.title = title or result.get('strategy', '回测报告')
+        self.symbol = symbol
+        self.max_markers = max_markers
+        self._series = None
+
+    def series(self) -> Dict[str, Any]:
+        """
+        降采样后的各序列：{面板名: (纳秒时间戳, 值)}，以及 buys / sells 成交标记 (纳秒时间戳, 价格)
+        只保留 start_date 至 end_date 的数据，预热期不绘制；成交标记只含价格图对应标的的成交，按 max_markers 抽稀
+        """
+        if self._series is not None:
+            return self._series
+        start = pd.Timestamp(self.result['start_date'])
+        end = pd.Timestamp(self.result['end_date']) + pd.Timedelta(days=1)
+        series = {}
+
+        equity = self.result['equity']
+        equity = equity[(equity.index >= start) & (equity.index < end)]
+        stamps = pd.DatetimeIndex(equity.index).as_unit('ns').asi8
+        values = equity.to_numpy(dtype=np.float64)
+        if len(values):
+            series['equity'] = downsample(stamps, values, self.max_points, self.method)
+            peak = np.maximum.accumulate(values)
+            series['drawdown'] = downsample(stamps, -(peak - values) / peak, self.max_points, 'minmax')
+
+        if self.data is not None:
+            index = pd.DatetimeIndex(self.data.index)
+            window = (index >= start) & (index < end)
+            stamps = index[window].as_unit('ns').asi8
+            close = np.asarray(self.data['close'].to_numpy(), dtype=np.float64)[window]
+            if len(close):
+                series['price'] = downsample(stamps, close, self.max_points, self.method)
+                if self.percentile is not None:
+                    values = np.asarray(self.percentile, dtype=np.float64)[window]
+                    series['percentile'] = downsample(stamps, values, self.max_points, 'minmax')
+
+        trades = self.trades()
+        for side in ('buy', 'sell'):
+            marked = [trade for trade in trades if trade['side'] == side]
+            stamps = pd.DatetimeIndex([trade['datetime'] for trade in marked]).as_unit('ns').asi8
+            prices = np.array([trade['price'] for trade in marked], dtype=np.float64)
+            series[f'{side}s'] = thin_markers(stamps, prices, self.max_markers)
+        self._series = series
+        return series
+
+    def trades(self) -> List[Dict[str, Any]]:
+        """
+        价格图上标出的成交：组合回测结果按 symbol 过滤，含多个标的但未指定 symbol 时为空
+        """
+        trades = self.result['trades']
+        if self.symbol is not None:
+            return [trade for trade in trades if trade.get('symbol', self.symbol) == self.symbol]
+        if len({trade.get('symbol') for trade in trades}) > 1:
+            return []
+        return trades
+
+    def metrics(self) -> List[Tuple[str, str]]:
+        """
+        指标表的 (名称, 格式化后的值)
+        """
+        rows = [('initial_value', f"{self.result['initial_value']:,.2f}")]
+        for name in SUMMARY_METRICS:
+            value = self.result.get(name)
+            if value is None:
+                continue
+            if name in ('total_return', 'annual_return', 'max_drawdown', 'volatility', 'win_rate'):
+                text = f'{value * 100:.2f}%' if value == value else '-'
+            elif isinstance(value, (int, np.integer)):
+                text = f'{value:,}'
+            else:
+                text = f'{value:,.2f}' if value == value else '-'
+            rows.append((name, text))
+        return rows
+
+    def save(self, path: str) -> str:
+        """
+        按扩展名（.html / .png）保存报告
+        :return: 文件路径
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.html':
+            return self.to_html(path)
+        if ext == '.png':
+            return self.to_png(path)
+        raise ValueError(f"不支持的报告格式: {ext}")
+
+    def to_html(self, path: str, width: int = 1000, height: int = 220) -> str:
+        """
+        生成内嵌 SVG 的单文件 HTML 报告
+        :param path: 文件路径
+        :param width: 每张图的宽度（像素）
+        :param height: 每张图的高度（像素），价格图为其 1.5 倍
+        :return: 文件路径
+        """
+        series = self.series()
+        xs = [s[0] for name, s in series.items() if name not in ('buys', 'sells') and len(s[0])]
+        x_range = (min(x[0] for x in xs), max(x[-1] for x in xs)) if xs else (0, 1)
+        panels = []
+        for name, label, color in PANELS:
+            if name not in series:
+                continue
+            markers, guides = [], []
+            if name == 'price':
+                markers = [(series['buys'], BUY_COLOR, 'up'), (series['sells'], SELL_COLOR, 'down')]
+            if name == 'percentile' and self.threshold is not None:
+                guides = [self.threshold]
+            panel_height = int(height * 1.5) if name == 'price' else height
+            panels.append(f'<h2>{label}</h2>' + _svg_panel(series[name], x_range, width, panel_height, color,
+                                                             markers=markers, guides=guides,
+                                                             fill=name == 'drawdown',
+                                                             percent=name == 'drawdown'))
+
+        rows = ''.join(f'<tr><th>{html.escape(name)}</th><td>{html.escape(text)}</td></tr>'
+                       for name, text in self.metrics())
+        period = (f"{pd.Timestamp(self.result['start_date']):%Y-%m-%d} 至 "
+                  f"{pd.Timestamp(self.result['end_date']):%Y-%m-%d}")
+        document = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{html.escape(self.title)}</title>'
+            '<style>body{font-family:sans-serif;margin:24px;color:#222}h1{font-size:20px}'
+            'h2{font-size:15px;margin:18px 0 4px}table{border-collapse:collapse;font-size:13px}'
+            'th,td{border:1px solid #ddd;padding:3px 10px;text-align:right}th{text-align:left;background:#f6f6f6}'
+            'svg{display:block}</style></head><body>'
+            f'<h1>{html.escape(self.title)}</h1><p>{period}，成交 {len(self.result["trades"])} 笔</p>'
+            f'<table>{rows}</table>{"".join(panels)}</body></html>'
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(document)
+        return path
+
+    def to_png(self, path: str, dpi: int = 100) -> str:
+        """
+        用 matplotlib 生成 PNG 报告
+        :param path: 文件路径
+        :param dpi: 分辨率
+        :return: 文件路径
+        """
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        series = self.series()
+        names = [(name, label, color) for name, label, color in PANELS if name in series]
+        fig, axes = plt.subplots(len(names), 1, sharex=True, squeeze=False,
+                                 figsize=(12, 2.4 * len(names) + 1), gridspec_kw={'hspace': 0.25})
+        for ax, (name, label, color) in zip(axes[:, 0], names):
+            x, y = series[name]
+            dates = pd.DatetimeIndex(x)
+            if name == 'drawdown':
+                ax.fill_between(dates, y, 0, color=color, alpha=0.4, linewidth=0)
+            ax.plot(dates, y, color=color, linewidth=1)
+            if name == 'price':
+                for side, color_, marker in (('buys', BUY_COLOR, '^'), ('sells', SELL_COLOR, 'v')):
+                    mx, my = series[side]
+                    ax.scatter(pd.DatetimeIndex(mx), my, color=color_, marker=marker, s=30, zorder=3)
+            if name == 'percentile' and self.threshold is not None:
+                ax.axhline(self.threshold, color='#888', linestyle='--', linewidth=0.8)
+            ax.set_title(label, loc='left', fontsize=10)
+            ax.grid(alpha=0.3)
+        fig.suptitle(self.title)
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+        return path
+
+
+def _ticks(low: float, high: float, count: int = 5) -> np.ndarray:
+    # 按 1 / 2 / 5 x 10^k 取整的刻度
+    if not high > low:
+        return np.array([low])
+    raw = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    return np.arange(math.ceil(low / step) * step, high + step * 1e-9, step)
+
+
+def _svg_panel(points: Tuple[np.ndarray, np.ndarray], x_range: Tuple[int, int], width: int, height: int,
+               color: str, markers=(), guides=(), fill: bool = False, percent: bool = False) -> str:
+    """
+    单张折线图的 SVG
+    """
+    left, right, top, bottom = 70, 10, 8, 22
+    x, y = points
+    values = [y[~np.isnan(y)]] + [m[0][1] for m in markers if len(m[0][1])] + [np.asarray(guides, dtype=np.float64)]
+    values = np.concatenate(values)
+    low, high = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+    if fill:
+        high = max(high, 0.0)
+    if high == low:
+        low, high = low - 1, high + 1
+    pad = (high - low) * 0.05
+    low, high = low - pad, high + pad
+    x0, x1 = x_range
+    span = max(x1 - x0, 1)
+
+    def px(stamps):
+        return left + (np.asarray(stamps, dtype=np.float64) - x0) / span * (width - left - right)
+
+    def py(v):
+        return top + (high - np.asarray(v, dtype=np.float64)) / (high - low) * (height - top - bottom)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}" font-size="11" font-family="sans-serif">']
+    for tick in _ticks(low, high):
+        ty = py(tick)
+        label = f'{tick * 100:.0f}%' if percent else f'{tick:,.6g}'
+        parts.append(f'<line x1="{left}" x2="{width - right}" y1="{ty:.1f}" y2="{ty:.1f}" stroke="#eee"/>'
+                     f'<text x="{left - 6}" y="{ty + 4:.1f}" text-anchor="end" fill="#666">{label}</text>')
+    for stamp in pd.date_range(pd.Timestamp(x0), pd.Timestamp(x1), periods=6):
+        tx = px(stamp.value)
+        parts.append(f'<text x="{tx:.1f}" y="{height - 6}" text-anchor="middle" fill="#666">{stamp:%Y-%m-%d}</text>')
+    for guide in guides:
+        gy = py(guide)
+        parts.append(f'<line x1="{left}" x2="{width - right}" y1="{gy:.1f}" y2="{gy:.1f}" '
+                     f'stroke="#888" stroke-dasharray="4 3"/>')
+
+    # NaN 处断开折线
+    valid = ~np.isnan(y)
+    sx, sy = px(x), py(np.where(valid, y, 0.0))
+    breaks = np.flatnonzero(np.diff(valid.astype(np.int8)) != 0) + 1
+    for segment in np.split(np.arange(len(y)), breaks):
+        if not len(segment) or not valid[segment[0]]:
+            continue
+        coords = ' '.join(f'{a:.1f},{b:.1f}' for a, b in zip(sx[segment], sy[segment]))
+        if fill:
+            base = py(0.0)
+            parts.append(f'<polygon points="{sx[segment[0]]:.1f},{base:.1f} {coords} '
+                         f'{sx[segment[-1]]:.1f},{base:.1f}" fill="{color}" fill-opacity="0.3"/>')
+        parts.append(f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="1"/>')
+
+    for (mx, my), marker_color, direction in markers:
+        for a, b in zip(px(mx), py(my)):
+            tip = 6 if direction == 'up' else -6
+            parts.append(f'<path d="M{a:.1f},{b:.1f} l-4,{tip} h8 z" fill="{marker_color}"/>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+# 子进程内的报告参数，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(directory, formats, report_kwargs):
+    _worker.update(directory=directory, formats=formats, report_kwargs=report_kwargs)
+
+
+def _write_symbol(task: Tuple[str, Dict[str, Any], Optional[pd.DataFrame], Optional[np.ndarray]]) -> Dict[str, Any]:
+    symbol, result, data, percentile = task
+    report = BacktestReport(result, data, percentile, title=symbol, symbol=symbol, **_worker['report_kwargs'])
+    files = {fmt: report.save(os.path.join(_worker['directory'], f'{symbol}.{fmt}')) for fmt in _worker['formats']}
+    return {'symbol': symbol, **{name: result.get(name) for name in SUMMARY_METRICS},
+            'trades': len(result['trades']), **{f'{fmt}_file': os.path.basename(path) for fmt, path in files.items()}}
+
+
+def write_reports(results: Dict[str, Dict[str, Any]], directory: str,
+                  data: Optional[Dict[str, pd.DataFrame]] = None,
+                  percentiles: Optional[Dict[str, np.ndarray]] = None,
+                  formats: Iterable[str] = ('html',),
+                  workers: Optional[int] = 1,
+                  **report_kwargs) -> pd.DataFrame:
+    """
+    批量生成多个标的的报告，并生成汇总各标的指标、链接到各自报告的 index.html
+    :param results: {标的: 回测结果}
+    :param directory: 输出目录
+    :param data: {标的: 行情数据}
+    :param percentiles: {标的: 与行情数据对齐的百分位线}
+    :param formats: 报告格式，见 REPORT_FORMATS
+    :param workers: 进程数，None 表示使用全部 CPU
+    :param report_kwargs: 传给 BacktestReport 的其他参数（threshold / max_points / method）
+    :return: 汇总表，每行一个标的
+    """
+    formats = tuple(formats)
+    for fmt in formats:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"不支持的报告格式: {fmt}")
+    os.makedirs(directory, exist_ok=True)
+    data, percentiles = data or {}, percentiles or {}
+    tasks = [(symbol, result, data.get(symbol), percentiles.get(symbol)) for symbol, result in results.items()]
+    args = (directory, formats, report_kwargs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(*args)
+        rows = list(map(_write_symbol, tasks))
+    else:
+        with mp.Pool(min(workers, len(tasks)), initializer=_init_worker, initargs=args) as pool:
+            rows = pool.map(_write_symbol, tasks)
+
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table = table.sort_values('symbol')
+    write_index(table, os.path.join(directory, 'index.html'))
+    return table
+
+
+def write_index(table: pd.DataFrame, path: str) -> str:
+    """
+    汇总页：每个标的一行指标，标的名链接到其报告（有 HTML 报告时）或 PNG 图片
+    """
+    columns = [name for name in ('symbol',) + SUMMARY_METRICS + ('trades',) if name in table.columns]
+    header = ''.join(f'<th>{html.escape(name)}</th>' for name in columns)
+    body = []
+    for row in table.to_dict('records'):
+        target = row.get('html_file') or row.get('png_file')
+        cells = []
+        for name in columns:
+            value = row[name]
+            if name == 'symbol':
+                text = html.escape(str(value))
+                cells.append(f'<td><a href="{html.escape(target)}">{text}</a></td>' if target else f'<td>{text}</td>')
+            elif isinstance(value, float):
+                cells.append(f'<td>{value:,.4f}</td>' if value == value else '<td>-</td>')
+            else:
+                cells.append(f'<td>{html.escape(str(value))}</td>')
+        body.append(f'<tr>{"".join(cells)}</tr>')
+    document = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>回测报告</title>'
+        '<style>body{font-family:sans-serif;margin:24px}table{border-collapse:collapse;font-size:13px}'
+        'th,td{border:1px solid #ddd;padding:3px 8px;text-align:right}th{background:#f6f6f6}</style></head><body>'
+        f'<h1>回测报告（{len(table)} 个标的）</h1><table><tr>{header}</tr>{"".join(body)}</table></body></html>'
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+    return path
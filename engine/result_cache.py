@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+DEFAULT_PATH = os.path.join('.cache', 'results.sqlite')
+# 项目根目录，只有其中的源码参与源码指纹
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 所有策略共用的源码，改动后全部缓存失效：指标、下单规则、数据转换、两种回测模式的实现和结果字典 / 指标的计算
+SHARED_SOURCES = (
+    'indicator',
+    os.path.join('strategy', 'percentile_rules.py'),
+    os.path.join('strategy', 'trade_log.py'),
+    os.path.join('data', 'compact.py'),
+    os.path.join('data', 'dates.py'),
+    os.path.join('data', 'resample.py'),
+    os.path.join('engine', 'analytics.py'),
+    os.path.join('engine', 'backtest_engine.py'),
+    os.path.join('engine', 'cerebro.py'),
+    os.path.join('engine', 'vectorized.py'),
+)
+# 结果字典的格式版本，源码指纹覆盖不到的变化（如依赖库升级改变了结果）时手动加一，旧缓存全部不再命中
+CACHE_VERSION = 1
+
+
+def data_fingerprint(data) -> str:
+    """
+    数据内容的 SHA-256：日期索引和各列的原始字节
+    :param data: DataFrame 或 CompactBars
+    """
+    digest = hashlib.sha256()
+    index = pd.DatetimeIndex(data.index).as_unit('ns')
+    digest.update(index.asi8.tobytes())
+    for name in data.columns:
+        values = data[name].to_numpy()
+        if values.dtype == object:
+            values = pd.util.hash_array(values)
+        digest.update(str(name).encode())
+        digest.update(values.dtype.str.encode())
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def _source_files(strategy_class) -> List[str]:
+    files = set()
+    for cls in strategy_class.__mro__:
+        module = __import__(cls.__module__, fromlist=['__name__'])
+        path = getattr(module, '__file__', None)
+        if path and os.path.abspath(path).startswith(PROJECT_ROOT + os.sep):
+            files.add(os.path.abspath(path))
+    for name in SHARED_SOURCES:
+        path = os.path.join(PROJECT_ROOT, name)
+        if os.path.isdir(path):
+            files.update(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.py'))
+        elif os.path.exists(path):
+            files.add(path)
+    return sorted(files)
+
+
+def source_fingerprint(strategy_class) -> str:
+    """
+    策略源码的 SHA-256：策略类及其父类所在的项目模块和 SHARED_SOURCES 中的共用源码
+    """
+    digest = hashlib.sha256()
+    for path in _source_files(strategy_class):
+        digest.update(os.path.relpath(path, PROJECT_ROOT).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def result_key(data_hash: str, strategy_class, strategy_params: Dict[str, Any], mode: str,
+               initial_cash: float, commission: float, slippage: float,
+               start_date: datetime, end_date: datetime) -> str:
+    """
+    回测结果的缓存键：缓存版本 + 数据指纹 + 策略 + 参数 + 资金和费率 + 回测区间
+    """
+    config = {
+        'version': CACHE_VERSION,
+        'data': data_hash,
+        'strategy': f'{strategy_class.__module__}.{strategy_class.__qualname__}',
+        'params': strategy_params,
+        'mode': mode,
+        'initial_cash': initial_cash,
+        'commission': commission,
+        'slippage': slippage,
+        'start_date': pd.Timestamp(start_date).isoformat(),
+        'end_date': pd.Timestamp(end_date).isoformat(),
+    }
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    持久化的回测结果缓存（SQLite）
+    以 result_key 为键保存 BacktestEngine.run 的结果字典（含成交记录和订单事件）；
+    每条记录同时保存策略的源码指纹，读取时源码已变化则删除该条并视为未命中；
+    超出 max_entries / max_bytes 时按最近访问时间淘汰
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: Optional[int] = 10000,
+                 max_bytes: Optional[int] = 1 << 30):
+        """
+        初始化缓存
+        :param path: SQLite 文件路径
+        :param max_entries: 最多保留的结果数，None 表示不限
+        :param max_bytes: 结果的最大总字节数，None 表示不限
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evicted': 0}
+        self._sources = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 多个进程可同时读写
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, strategy TEXT, source TEXT, created REAL, accessed REAL, '
+            'size INTEGER, payload BLOB)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+
+    def source(self, strategy_class) -> str:
+        """
+        策略的源码指纹，同一进程内按文件修改时间缓存
+        """
+        files = _source_files(strategy_class)
+        stamp = tuple((path, os.stat(path).st_mtime_ns) for path in files)
+        cached = self._sources.get(strategy_class)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, source_fingerprint(strategy_class))
+            self._sources[strategy_class] = cached
+        return cached[1]
+
+    def get(self, key: str, strategy_class) -> Optional[Dict[str, Any]]:
+        """
+        读取结果
+        :return: 结果字典，未命中或源码已变化时为 None
+        """
+        row = self.conn.execute('SELECT source, payload FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        if row[0] != self.source(strategy_class):
+            self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+            self.stats['stale'] += 1
+            self.stats['misses'] += 1
+            return None
+        self.conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+        self.stats['hits'] += 1
+        return pickle.loads(row[1])
+
+    def put(self, key: str, strategy_class, result: Dict[str, Any]):
+        """
+        保存结果，同一策略源码已变化的旧结果一并删除
+        """
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        strategy = f'{strategy_class.__module__}.{strategy_class.__qualname__}'
+        source = self.source(strategy_class)
+        now = time.time()
+        self.conn.execute('DELETE FROM results WHERE strategy = ? AND source != ?', (strategy, source))
+        self.conn.execute(
+            'INSERT OR REPLACE INTO results (key, strategy, source, created, accessed, size, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, strategy, source, now, now, len(payload), payload),
+        )
+        self.evict()
+
+    def evict(self):
+        """
+        按最近访问时间淘汰超出数量或大小限制的结果
+        """
+        count, total = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        excess = 0
+        if self.max_entries is not None and count > self.max_entries:
+            excess = count - self.max_entries
+        if self.max_bytes is not None and total > self.max_bytes:
+            # 从最久未访问的结果开始累计，直到剩余大小不超过限制
+            freed = 0
+            for i, (size,) in enumerate(self.conn.execute('SELECT size FROM results ORDER BY accessed')):
+                if total - freed <= self.max_bytes:
+                    break
+                freed += size
+                excess = max(excess, i + 1)
+        if excess:
+            self.conn.execute('DELETE FROM results WHERE key IN '
+                              '(SELECT key FROM results ORDER BY accessed LIMIT ?)', (excess,))
+            self.stats['evicted'] += excess
+
+    def info(self) -> Dict[str, Any]:
+        """
+        缓存的结果数和总字节数
+        """
+        count, total = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'path': self.path, 'entries': count, 'bytes': total, **self.stats}
+
+    def clear(self):
+        """
+        删除全部结果
+        """
+        self.conn.execute('DELETE FROM results')
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='回测结果缓存')
+    parser.add_argument('command', choices=['info', 'clear'])
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    cache = ResultCache(args.path)
+    if args.command == 'info':
+        info = cache.info()
+        print(f"{info['path']}: {info['entries']} 条结果, {info['bytes']:,} 字节")
+    else:
+        cache.clear()
+    cache.close()
@@ -0,0 +1,237 @@
+import os
+import multiprocessing as mp
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from engine.analytics import max_drawdown, periods_per_year, round_trips
+
+# 重抽样方式：逐日收益独立重抽样 / 循环块重抽样 / 交易顺序打乱 / 交易有放回重抽样
+METHODS = ('bootstrap', 'block', 'trade_shuffle', 'trade_bootstrap')
+# 每条路径统计的指标
+PATH_METRICS = ('total_return', 'annual_return', 'max_drawdown')
+
+# 子进程内的收益序列，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(returns, trade_returns, block_size, batch_bytes):
+    _worker.update(
+        returns=returns,
+        trade_returns=trade_returns,
+        block_size=block_size,
+        batch_bytes=batch_bytes,
+    )
+
+
+def _sample_returns(rng: np.random.Generator, method: str, returns: np.ndarray, count: int,
+                    block_size: int) -> np.ndarray:
+    """
+    生成 count 条重抽样的收益序列，每行一条，长度与原序列相同
+    """
+    n = len(returns)
+    if method in ('bootstrap', 'trade_bootstrap'):
+        return returns[rng.integers(0, n, size=(count, n))]
+    if method == 'trade_shuffle':
+        return rng.permuted(np.broadcast_to(returns, (count, n)), axis=1)
+    # 循环块重抽样：随机起点的连续 block_size 个收益首尾拼接，保留收益的短期自相关
+    blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(count, blocks, 1))
+    index = (starts + np.arange(block_size)) % n
+    return returns[index.reshape(count, blocks * block_size)[:, :n]]
+
+
+def path_metrics(returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按行计算收益序列对应的净值路径的总收益率、最大回撤和最低净值（初始净值为 1）
+    :param returns: (路径数, 长度) 的收益率
+    :return: (total_return, max_drawdown, min_value)
+    """
+    paths = np.cumprod(1.0 + returns, axis=1)
+    # 峰值包含初始净值 1，开局即亏损也计入回撤
+    peak = np.maximum(np.maximum.accumulate(paths, axis=1), 1.0)
+    drawdown = np.max(1.0 - paths / peak, axis=1)
+    return paths[:, -1] - 1.0, drawdown, np.minimum(paths.min(axis=1), 1.0)
+
+
+def _resample(task: Tuple[str, int, np.random.SeedSequence]) -> Dict[str, np.ndarray]:
+    """
+    子进程任务：按 method 生成 count 条路径并计算指标，按 batch_bytes 分批以限制内存
+    """
+    method, count, seed = task
+    returns = _worker['trade_returns'] if method.startswith('trade') else _worker['returns']
+    rng = np.random.default_rng(seed)
+    batch = max(1, _worker['batch_bytes'] // (8 * max(len(returns), 1)))
+    totals, drawdowns, lows = [], [], []
+    for begin in range(0, count, batch):
+        sampled = _sample_returns(rng, method, returns, min(batch, count - begin), _worker['block_size'])
+        total, drawdown, low = path_metrics(sampled)
+        totals.append(total)
+        drawdowns.append(drawdown)
+        lows.append(low)
+    return {
+        'total_return': np.concatenate(totals),
+        'max_drawdown': np.concatenate(drawdowns),
+        'min_value': np.concatenate(lows),
+    }
+
+
+class MonteCarlo:
+    """
+    回测结果的 Monte Carlo / bootstrap 稳健性分析
+    对逐日收益（bootstrap / block）或逐笔交易收益（trade_shuffle / trade_bootstrap）重抽样生成大量净值路径，
+    统计总收益率、年化收益率和最大回撤的置信区间以及破产概率；
+    路径按批以 NumPy 矩阵运算，样本按固定大小分块并行，各块的随机种子由 SeedSequence 派生，结果与进程数无关
+    """
+
+    def __init__(self, returns: np.ndarray, trade_returns: Optional[np.ndarray] = None,
+                 periods: Optional[float] = None,
+                 block_size: int = 20,
+                 ruin_level: float = 0.5,
+                 workers: Optional[int] = None,
+                 chunk: int = 10000,
+                 batch_bytes: int = 32 << 20):
+        """
+        初始化分析
+        :param returns: 逐 bar 收益率
+        :param trade_returns: 逐笔交易收益率，交易类重抽样使用
+        :param periods: 每年的 bar 数，与 returns 的长度一起确定回测年数，用于换算年化收益率；None 时不计算
+        :param block_size: 块重抽样的块长度（bar 数）
+        :param ruin_level: 破产线，净值（初始为 1）曾跌至该值及以下的路径计为破产
+        :param workers: 进程数，默认使用全部 CPU
+        :param chunk: 每个并行任务的样本数
+        :param batch_bytes: 单批收益矩阵的最大字节数
+        """
+        self.returns = np.ascontiguousarray(returns, dtype=np.float64)
+        self.trade_returns = np.ascontiguousarray(trade_returns if trade_returns is not None else [],
+                                                  dtype=np.float64)
+        if np.isnan(self.returns).any() or np.isnan(self.trade_returns).any():
+            raise ValueError("returns must not contain NaN")
+        if block_size < 1:
+            raise ValueError("block_size must be positive")
+        if not 0 < ruin_level < 1:
+            raise ValueError("ruin_level must be between 0 and 1")
+        self.periods = periods
+        self.block_size = block_size
+        self.ruin_level = ruin_level
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self.batch_bytes = batch_bytes
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], **kwargs) -> 'MonteCarlo':
+        """
+        由 BacktestEngine.run 的结果构造：start_date 起的逐 bar 收益率和已平仓交易的收益率
+        :param result: 回测结果（含 equity、trades 和 start_date）
+        :param kwargs: 传给构造函数的其他参数
+        """
+        equity = result['equity']
+        # 从开始日期前一根 bar 起算，使首日收益计入
+        begin = max(int(equity.index.searchsorted(pd.Timestamp(result['start_date']))) - 1, 0)
+        equity = equity.iloc[begin:]
+        values = equity.to_numpy(dtype=np.float64)
+        returns = values[1:] / values[:-1] - 1.0
+        trade_returns = [trip['return'] for trip in round_trips(result['trades'])]
+        kwargs.setdefault('periods', periods_per_year(equity.index))
+        return cls(returns, trade_returns, **kwargs)
+
+    def series(self, method: str) -> np.ndarray:
+        """
+        重抽样方式对应的原始收益序列
+        """
+        if method not in METHODS:
+            raise ValueError(f"不支持的重抽样方式: {method}")
+        return self.trade_returns if method.startswith('trade') else self.returns
+
+    def _annualize(self, total_return: np.ndarray) -> np.ndarray:
+        # 交易类重抽样的路径同样覆盖整个回测区间，统一按逐 bar 收益的年数换算
+        if not self.periods or self.periods != self.periods or not len(self.returns):
+            return np.full(np.shape(total_return), np.nan)
+        return np.power(1.0 + np.asarray(total_return), self.periods / len(self.returns)) - 1.0
+
+    def observed(self, method: str) -> Dict[str, float]:
+        """
+        原始收益序列的各项指标
+        """
+        returns = self.series(method)
+        if not len(returns):
+            return {'total_return': 0.0, 'annual_return': float('nan'), 'max_drawdown': 0.0}
+        values = np.cumprod(np.concatenate([[1.0], 1.0 + returns]))
+        total = float(values[-1] - 1.0)
+        return {
+            'total_return': total,
+            'annual_return': float(self._annualize(total)),
+            'max_drawdown': max_drawdown(values),
+        }
+
+    def samples(self, method: str = 'bootstrap', n: int = 10000, seed: Optional[int] = None) -> pd.DataFrame:
+        """
+        生成重抽样路径的指标
+        :param method: 重抽样方式，见 METHODS
+        :param n: 路径数
+        :param seed: 随机种子
+        :return: 每条路径一行（total_return / annual_return / max_drawdown / min_value）
+        """
+        returns = self.series(method)
+        if not len(returns):
+            raise ValueError(f"{method} 没有可重抽样的收益数据")
+        if n < 1:
+            raise ValueError("n must be positive")
+        counts = [min(self.chunk, n - begin) for begin in range(0, n, self.chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(counts))
+        tasks = [(method, count, child) for count, child in zip(counts, seeds)]
+        args = (self.returns, self.trade_returns, self.block_size, self.batch_bytes)
+
+        if self.workers == 1 or len(tasks) == 1:
+            _init_worker(*args)
+            parts = list(map(_resample, tasks))
+        else:
+            with mp.Pool(min(self.workers, len(tasks)), initializer=_init_worker, initargs=args) as pool:
+                parts = pool.map(_resample, tasks)
+
+        total = np.concatenate([part['total_return'] for part in parts])
+        return pd.DataFrame({
+            'total_return': total,
+            'annual_return': self._annualize(total),
+            'max_drawdown': np.concatenate([part['max_drawdown'] for part in parts]),
+            'min_value': np.concatenate([part['min_value'] for part in parts]),
+        })
+
+    def run(self, method: str = 'bootstrap', n: int = 10000, seed: Optional[int] = None,
+            confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        运行分析
+        :param method: 重抽样方式，见 METHODS
+        :param n: 路径数
+        :param seed: 随机种子
+        :param confidence: 置信水平
+        :return: {'method', 'n', 'summary': 各指标的原始值 / 均值 / 标准差 / 置信区间 / 中位数 / 原始值所处分位,
+                  'prob_loss': 亏损路径占比, 'risk_of_ruin': 破产路径占比, 'samples': 各路径指标}
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        samples = self.samples(method, n, seed)
+        observed = self.observed(method)
+        tail = (1 - confidence) / 2
+        rows = []
+        for name in PATH_METRICS:
+            values = samples[name].to_numpy()
+            low, median, high = np.quantile(values, [tail, 0.5, 1 - tail]) if values.size else (np.nan,) * 3
+            rows.append({
+                'metric': name,
+                'observed': observed[name],
+                'mean': values.mean(),
+                'std': values.std(ddof=1),
+                'lower': low,
+                'median': median,
+                'upper': high,
+                'observed_percentile': float(np.mean(values <= observed[name])),
+            })
+        return {
+            'method': method,
+            'n': n,
+            'confidence': confidence,
+            'summary': pd.DataFrame(rows).set_index('metric'),
+            'prob_loss': float(np.mean(samples['total_return'].to_numpy() < 0)),
+            'risk_of_ruin': float(np.mean(samples['min_value'].to_numpy() <= self.ruin_level)),
+            'samples': samples,
+        }
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable, Iterator
+import pandas as pd
+from config.backtest_config import BACKTEST_PARAMS
+from engine.backtest_engine import BacktestEngine
+from indicator.store import IndicatorStore
+
+
+class BacktestSession:
+    """
+    同一份数据上的多次回测
+    数据只转换、预加载一次（cerebro 模式下保留 PandasData 的行缓冲），
+    每次运行只替换策略、参数、资金和费率；broker 与策略状态在每次运行开始时重置，
+    运行结束后不保留策略对象，内存不随运行次数增长
+    """
+
+    def __init__(self, data: pd.DataFrame, mode: str = 'cerebro',
+                 strategy_class=None,
+                 strategy_params: Optional[Dict[str, Any]] = None,
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 commission: float = BACKTEST_PARAMS['commission'],
+                 slippage: float = BACKTEST_PARAMS['slippage'],
+                 indicator_store: Optional[IndicatorStore] = None):
+        """
+        初始化会话
+        :param data: 数据DataFrame
+        :param mode: 回测模式，见 BacktestEngine
+        :param strategy_class: 默认策略类
+        :param strategy_params: 默认策略参数
+        :param initial_cash: 默认初始资金
+        :param commission: 默认手续费率
+        :param slippage: 默认滑点
+        :param indicator_store: 预先计算的指标线存储，见 BacktestEngine.set_indicator_store
+        """
+        self.engine = BacktestEngine(mode=mode)
+        self.engine.set_data(data)
+        self.engine.set_indicator_store(indicator_store)
+        self.strategy_class = strategy_class
+        self.strategy_params = dict(strategy_params or {})
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.slippage = slippage
+        self.runs = 0
+
+    def run(self, start_date: datetime, end_date: datetime,
+            strategy_class=None,
+            strategy_params: Optional[Dict[str, Any]] = None,
+            initial_cash: Optional[float] = None,
+            commission: Optional[float] = None,
+            slippage: Optional[float] = None,
+            **run_kwargs) -> Dict[str, Any]:
+        """
+        运行一次回测，未指定的项使用会话的默认值
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param strategy_class: 策略类
+        :param strategy_params: 策略参数，覆盖会话默认参数中的同名项
+        :param initial_cash: 初始资金
+        :param commission: 手续费率
+        :param slippage: 滑点
+        :param run_kwargs: 传给 BacktestEngine.run 的其他参数（如 profile）
+        :return: 回测结果，同 BacktestEngine.run
+        """
+        strategy_class = strategy_class or self.strategy_class
+        if strategy_class is None:
+            raise ValueError("Strategy must be set before running backtest")
+
+        engine = self.engine
+        engine.set_strategy(strategy_class, {**self.strategy_params, **(strategy_params or {})})
+        engine.set_initial_cash(self.initial_cash if initial_cash is None else initial_cash)
+        engine.set_commission(self.commission if commission is None else commission)
+        engine.set_slippage(self.slippage if slippage is None else slippage)
+        results = engine.run(start_date, end_date, **run_kwargs)
+        self.runs += 1
+        return results
+
+    def iter_runs(self, start_date: datetime, end_date: datetime,
+                  configs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        依次运行多组配置
+        :param configs: 每组为 run 的关键字参数（strategy_class / strategy_params / initial_cash / commission / slippage）
+        :return: 结果迭代器
+        """
+        for config in configs:
+            yield self.run(start_date, end_date, **config)
+
+    def close(self):
+        """
+        释放预加载的数据
+        """
+        if self.engine.cerebro is not None:
+            self.engine.cerebro.release()
+
+    def __enter__(self) -> 'BacktestSession':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,430 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import importlib
+import threading
+import multiprocessing as mp
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+import pandas as pd
+from config.backtest_config import BACKTEST_PARAMS
+
+# 工作单元的状态
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+STATUSES = (PENDING, RUNNING, DONE, FAILED)
+
+
+def unit_id(symbol: str, params: Dict[str, Any]) -> str:
+    """
+    工作单元的标识：标的 + 参数，重复提交同一单元时不会重复运行
+    """
+    text = json.dumps({'symbol': symbol, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class SweepQueue:
+    """
+    基于 SQLite 的参数扫描任务队列
+    协调者把 (标的, 参数) 工作单元写入队列文件，任意台机器上的任意个工作进程以租约方式领取：
+    领取时单元标记为 running 并记录租约到期时间，进程运行中由后台线程定期续约（见 LeaseRenewer）；
+    进程崩溃后租约过期，单元可被其他进程重新领取。
+    结果按单元标识写回，已完成的单元不会被覆盖，重复写入无副作用；重新启动工作进程即可从中断处继续。
+    使用回滚日志（journal_mode=DELETE）和文件锁协调并发写入，不使用 WAL（WAL 依赖共享内存，只能在单机上使用）；
+    多台机器共用时队列文件需放在正确实现 POSIX 文件锁的共享存储上（如 NFSv4，不支持锁或锁不可靠的挂载方式会损坏队列）
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        """
+        打开或创建队列
+        :param path: SQLite 文件路径
+        :param lease_seconds: 租约时长（秒），超过该时间未续约的单元视为领取者已退出
+        :param max_attempts: 每个单元最多领取的次数，超过后标记为 failed
+        """
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be positive")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be positive")
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 显式管理事务，领取时用 BEGIN IMMEDIATE 保证同一单元只被一个进程领取
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        # 回滚日志只依赖文件锁，可以跨主机共享；旧版本创建的 WAL 队列文件在此转换
+        self.conn.execute('PRAGMA journal_mode=DELETE')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS units ('
+            'id TEXT PRIMARY KEY, seq INTEGER, symbol TEXT, file TEXT, params TEXT, status TEXT, '
+            'worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, error TEXT, result TEXT, '
+            'created REAL, finished REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS units_status ON units (status, symbol, seq)')
+
+    def configure(self, config: Dict[str, Any]):
+        """
+        写入扫描配置（数据目录、策略、基础参数、回测区间等），同一队列只能对应一份配置
+        :param config: 可 JSON 序列化的配置
+        """
+        text = json.dumps(config, sort_keys=True, default=str)
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+            if row is not None and row[0] != text:
+                raise ValueError(f"队列 {self.path} 已有不同的扫描配置")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('config', ?)", (text,))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def config(self) -> Dict[str, Any]:
+        """
+        扫描配置
+        """
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row is None:
+            raise ValueError(f"队列 {self.path} 尚未写入扫描配置")
+        return json.loads(row[0])
+
+    def submit(self, units: Iterable[Tuple[str, Optional[str], Dict[str, Any]]]) -> int:
+        """
+        提交工作单元，已存在的单元（含已完成的）保持不变
+        :param units: [(标的代码, 文件名, 参数)]
+        :return: 新增的单元数
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            first = self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM units').fetchone()[0] + 1
+            rows = ((unit_id(symbol, params), seq, symbol, file_name, json.dumps(params, sort_keys=True), PENDING, now)
+                    for seq, (symbol, file_name, params) in enumerate(units, first))
+            added = self.conn.executemany(
+                'INSERT OR IGNORE INTO units (id, seq, symbol, file, params, status, created) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows,
+            ).rowcount
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        领取待运行的单元：pending，或租约已过期的 running；同一标的的单元优先连续领取，以复用已加载的数据
+        :param worker: 工作进程标识
+        :param limit: 最多领取的单元数
+        :return: 单元列表（id / symbol / file / params）
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 领取次数已用完且租约过期的单元不再重试
+            self.conn.execute(
+                'UPDATE units SET status = ?, error = ?, finished = ? '
+                'WHERE status = ? AND lease_until < ? AND attempts >= ?',
+                (FAILED, 'lease expired', now, RUNNING, now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                'SELECT id, symbol, file, params FROM units '
+                'WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY symbol, seq LIMIT ?',
+                (PENDING, RUNNING, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                'UPDATE units SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?',
+                [(RUNNING, worker, now + self.lease_seconds, row[0]) for row in rows],
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return [{'id': row[0], 'symbol': row[1], 'file': row[2], 'params': json.loads(row[3])} for row in rows]
+
+    def heartbeat(self, worker: str):
+        """
+        为该进程领取中的全部单元续约
+        """
+        self.conn.execute('UPDATE units SET lease_until = ? WHERE status = ? AND worker = ?',
+                          (time.time() + self.lease_seconds, RUNNING, worker))
+
+    def complete(self, unit: str, worker: str, result: Dict[str, Any]) -> bool:
+        """
+        写回结果；单元已完成时（如租约过期后被其他进程重复运行）保留先写入的结果
+        :param unit: 单元标识
+        :param worker: 工作进程标识
+        :param result: 可 JSON 序列化的结果
+        :return: 是否为首次写入
+        """
+        cursor = self.conn.execute(
+            'UPDATE units SET status = ?, worker = ?, result = ?, error = NULL, lease_until = NULL, finished = ? '
+            'WHERE id = ? AND status != ?',
+            (DONE, worker, json.dumps(result, default=str), time.time(), unit, DONE),
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, unit: str, worker: str, error: str):
+        """
+        记录运行失败：未超过最大领取次数时放回队列，否则标记为 failed
+        """
+        self.conn.execute(
+            'UPDATE units SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_until = NULL, '
+            'finished = CASE WHEN attempts >= ? THEN ? ELSE NULL END '
+            'WHERE id = ? AND status = ? AND worker = ?',
+            (self.max_attempts, FAILED, PENDING, error, self.max_attempts, time.time(), unit, RUNNING, worker),
+        )
+
+    def release(self, worker: str):
+        """
+        进程正常退出时放回其领取中的单元，不计入领取次数
+        """
+        self.conn.execute(
+            'UPDATE units SET status = ?, lease_until = NULL, attempts = MAX(attempts - 1, 0) '
+            'WHERE status = ? AND worker = ?',
+            (PENDING, RUNNING, worker),
+        )
+
+    def retry_failed(self) -> int:
+        """
+        把 failed 的单元放回队列并清零领取次数
+        :return: 放回的单元数
+        """
+        cursor = self.conn.execute(
+            'UPDATE units SET status = ?, attempts = 0, error = NULL, finished = NULL WHERE status = ?',
+            (PENDING, FAILED),
+        )
+        return cursor.rowcount
+
+    def progress(self) -> Dict[str, int]:
+        """
+        各状态的单元数
+        """
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.conn.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall())
+        counts['total'] = sum(counts[status] for status in STATUSES)
+        return counts
+
+    def unfinished(self) -> int:
+        """
+        尚未完成也未失败的单元数（含其他进程领取中的单元）
+        """
+        return self.conn.execute('SELECT COUNT(*) FROM units WHERE status IN (?, ?)',
+                                 (PENDING, RUNNING)).fetchone()[0]
+
+    def results(self) -> pd.DataFrame:
+        """
+        已完成和失败单元的结果表，每行一个单元（symbol / 参数 / 指标 / error / worker / attempts）
+        """
+        rows = []
+        query = ('SELECT symbol, params, result, error, status, worker, attempts FROM units '
+                 'WHERE status IN (?, ?) ORDER BY seq')
+        for symbol, params, result, error, status, worker, attempts in self.conn.execute(query, (DONE, FAILED)):
+            row = {'symbol': symbol, **json.loads(params)}
+            if result:
+                row.update(json.loads(result))
+            row.update(status=status, error=error, worker=worker, attempts=attempts)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseRenewer:
+    """
+    后台线程：按固定间隔为工作进程领取中的全部单元续约，单个单元的运行时间超过租约时长时也不会被其他进程重新领取
+    SQLite 连接不能跨线程使用，续约线程使用独立的连接
+    """
+
+    def __init__(self, path: str, worker: str, lease_seconds: float, interval: Optional[float] = None):
+        """
+        :param path: 队列文件路径
+        :param worker: 工作进程标识
+        :param lease_seconds: 租约时长（秒）
+        :param interval: 续约间隔（秒），默认为租约时长的三分之一
+        """
+        self.path = path
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.interval = interval or lease_seconds / 3
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sweep-lease', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        queue = SweepQueue(self.path, lease_seconds=self.lease_seconds)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    queue.heartbeat(self.worker)
+                except sqlite3.OperationalError:
+                    # 队列文件被长时间锁定时在下一个间隔重试
+                    continue
+        finally:
+            queue.close()
+
+
+def submit_sweep(path: str, data_dir: str, strategy_class, params: Iterable[Dict[str, Any]],
+                 start_date: datetime, end_date: datetime,
+                 base_params: Optional[Dict[str, Any]] = None,
+                 symbols: Optional[Iterable[str]] = None,
+                 patterns: Optional[Iterable[str]] = None,
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 mode: str = 'cerebro') -> Dict[str, int]:
+    """
+    协调者：写入扫描配置，并提交 标的 x 参数组 的全部工作单元（可重复调用，已提交的单元不会重复）
+    :param path: 队列文件路径
+    :param data_dir: 数据目录（工作进程可用自己的路径覆盖）
+    :param strategy_class: 策略类，工作进程按模块路径导入
+    :param params: 参数组合
+    :param start_date: 开始日期
+    :param end_date: 结束日期
+    :param base_params: 基础策略参数，参数组会覆盖其中的同名项
+    :param symbols: 标的代码列表，默认使用数据目录下的全部文件
+    :param patterns: 文件匹配模式
+    :param initial_cash: 初始资金
+    :param mode: 回测模式，见 BacktestEngine
+    :return: 队列的进度（各状态的单元数）及本次新增的单元数
+    """
+    from engine.batch import find_data_files, resolve_symbols
+
+    files = resolve_symbols(data_dir, symbols) if symbols is not None else find_data_files(data_dir, patterns)
+    missing = [symbol for symbol, file_name in files if file_name is None]
+    if missing:
+        raise FileNotFoundError(f"找不到数据文件: {', '.join(missing)}")
+    params = list(params)
+    queue = SweepQueue(path)
+    try:
+        queue.configure({
+            'data_dir': data_dir,
+            'strategy': f'{strategy_class.__module__}:{strategy_class.__qualname__}',
+            'base_params': dict(base_params or {}),
+            'start_date': pd.Timestamp(start_date).isoformat(),
+            'end_date': pd.Timestamp(end_date).isoformat(),
+            'initial_cash': initial_cash,
+            'mode': mode,
+        })
+        added = queue.submit((symbol, file_name, p) for symbol, file_name in files for p in params)
+        return {**queue.progress(), 'added': added}
+    finally:
+        queue.close()
+
+
+def _load_strategy(name: str):
+    module, _, qualname = name.partition(':')
+    target = importlib.import_module(module)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    return target
+
+
+def run_worker(path: str, worker: Optional[str] = None, data_dir: Optional[str] = None, batch: int = 1,
+               lease_seconds: float = 300.0, max_attempts: int = 3, poll_interval: float = 1.0,
+               wait: bool = True, indicator_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    工作进程：循环领取单元、回测并写回结果，直到没有可领取的单元
+    同一标的的连续单元复用同一个 BacktestSession，数据只加载一次
+    :param path: 队列文件路径
+    :param worker: 工作进程标识，默认 主机名:进程号
+    :param data_dir: 本机的数据目录，默认使用扫描配置中的目录
+    :param batch: 每次领取的单元数
+    :param lease_seconds: 租约时长（秒），运行中由后台线程每隔三分之一租约续约一次
+    :param max_attempts: 每个单元最多领取的次数
+    :param poll_interval: 等待其他进程的单元时的轮询间隔（秒）
+    :param wait: 没有可领取的单元但仍有其他进程领取中的单元时是否继续等待（以便接手崩溃进程的单元）
+    :param indicator_dir: 本机的指标线存储目录，同一台机器上的工作进程共享读取预先计算的百分位
+    :return: {'done': 完成数, 'failed': 失败数, 'duplicate': 已被其他进程完成的单元数}
+    """
+    from engine.analytics import SUMMARY_METRICS
+    from engine.session import BacktestSession
+    from data.file_loader import FileDataLoader
+    from indicator.store import IndicatorStore
+
+    worker = worker or default_worker_id()
+    queue = SweepQueue(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    config = queue.config()
+    strategy_class = _load_strategy(config['strategy'])
+    start_date = pd.Timestamp(config['start_date']).to_pydatetime()
+    end_date = pd.Timestamp(config['end_date']).to_pydatetime()
+    loader = FileDataLoader(data_dir or config['data_dir'])
+    store = IndicatorStore(indicator_dir) if indicator_dir else None
+    session, session_symbol = None, None
+    stats = {'done': 0, 'failed': 0, 'duplicate': 0}
+    renewer = LeaseRenewer(path, worker, lease_seconds)
+    renewer.start()
+
+    try:
+        while True:
+            units = queue.claim(worker, batch)
+            if not units:
+                if wait and queue.unfinished():
+                    time.sleep(poll_interval)
+                    continue
+                break
+            for unit in units:
+                try:
+                    if unit['symbol'] != session_symbol:
+                        session, session_symbol = None, None
+                        file_name = unit['file']
+                        if file_name.endswith('.xlsx'):
+                            data = loader.load_excel(file_name)
+                        elif file_name.endswith('.csv'):
+                            data = loader.load_csv(file_name)
+                        else:
+                            raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+                        session = BacktestSession(data, mode=config['mode'], strategy_class=strategy_class,
+                                                  strategy_params=config['base_params'],
+                                                  initial_cash=config['initial_cash'],
+                                                  indicator_store=store)
+                        session_symbol = unit['symbol']
+                    results = session.run(start_date, end_date, strategy_params=unit['params'])
+                except Exception as e:
+                    queue.fail(unit['id'], worker, f'{type(e).__name__}: {e}')
+                    stats['failed'] += 1
+                    continue
+                result = {name: results[name] for name in SUMMARY_METRICS}
+                result['trades'] = len(results['trades'])
+                if queue.complete(unit['id'], worker, result):
+                    stats['done'] += 1
+                else:
+                    stats['duplicate'] += 1
+    finally:
+        renewer.stop()
+        queue.release(worker)
+        queue.close()
+    return stats
+
+
+def _local_worker(path: str, index: int, kwargs: Dict[str, Any]):
+    run_worker(path, worker=f'{default_worker_id()}:{index}', **kwargs)
+
+
+def run_local(path: str, processes: Optional[int] = None, **kwargs):
+    """
+    在本机启动多个工作进程处理队列，等待全部退出
+    :param path: 队列文件路径
+    :param processes: 进程数，默认使用全部 CPU
+    :param kwargs: 传给 run_worker 的其他参数
+    """
+    processes = processes or os.cpu_count() or 1
+    children = [mp.Process(target=_local_worker, args=(path, i, kwargs)) for i in range(processes)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
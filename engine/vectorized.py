@@ -0,0 +1,133 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from config.backtest_config import BACKTEST_PARAMS
+from indicator.percentile_indicator import percentile_rank
+from strategy.percentile_strategy import PercentileStrategy
+from data.dates import date2num_array
+from strategy.percentile_rules import (order_size, exit_hit, cooling_end, buy_fill, sell_fill, affordable,
+                                       position_value, sell_proceeds)
+
+def _first_exit(close: np.ndarray, start: int, cost: float, profit: float, loss: float) -> int:
+    """
+    从 start 开始查找第一根触发止盈/止损的 bar，按倍增的块扫描，避免每笔交易都扫描剩余全部数据
+    """
+    n = len(close)
+    block = 256
+    while start < n:
+        stop = min(start + block, n)
+        hit = np.flatnonzero(exit_hit(close[start:stop], cost, profit, loss))
+        if len(hit):
+            return start + int(hit[0])
+        start = stop
+        block *= 2
+    return n
+
+
+def run_percentile_vectorized(data: pd.DataFrame, strategy_params: Dict[str, Any], initial_cash: float,
+                              commission: float = BACKTEST_PARAMS['commission'],
+                              slippage: float = BACKTEST_PARAMS['slippage'],
+                              percentile: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    不经过 cerebro 事件循环，直接在 NumPy 数组上运行 PercentileStrategy 的状态机
+    成交规则与 BacktestEngine 的 broker 设置一致：
+    - 在 bar i 下单，于 bar i+1 按 bar i 的收盘价成交（cheat-on-close）
+    - 百分比滑点，买入不高于成交 bar 的最高价，卖出不低于成交 bar 的最低价
+    - 按成交金额收取百分比手续费
+    :param data: 数据DataFrame，需包含 high / low / close 列和日期索引
+    :param strategy_params: 策略参数，缺省项使用 PercentileStrategy 的默认值
+    :param initial_cash: 初始资金
+    :param commission: 手续费率
+    :param slippage: 滑点
+    :param percentile: 与 data 对齐的预先计算的百分位（如在更长的历史上计算后切片），None 时按 data 计算
+    :return: {'final_value', 'values'（逐 bar 账户价值）, 'trades'（成交记录）}
+    """
+    params = dict(PercentileStrategy.params._getitems())
+    params.update(strategy_params or {})
+
+    stamps = pd.DatetimeIndex(data.index).as_unit('ns').asi8
+    dates = date2num_array(data.index)
+    close = data['close'].to_numpy(dtype=np.float64)
+    high = data['high'].to_numpy(dtype=np.float64)
+    low = data['low'].to_numpy(dtype=np.float64)
+    n = len(close)
+
+    if percentile is None:
+        percentile = percentile_rank(dates, close, params['lookback_days'])
+    with np.errstate(invalid='ignore'):
+        entries = np.flatnonzero(percentile < params['percentile_threshold'])
+    if params.get('trade_start') is not None:
+        # 预热期内不交易
+        first = np.searchsorted(stamps, pd.Timestamp(params['trade_start']).as_unit('ns').value, side='left')
+        entries = entries[entries >= first]
+
+    values = np.empty(n)
+    trades: List[Dict[str, Any]] = []
+    cash = float(initial_cash)
+    cooling_days = params['cooling_days']
+    # i: 下一根可以开仓的 bar；filled: values 已填充到的位置
+    i = filled = 0
+    while True:
+        # 空仓：查找下一个百分位低于阈值的 bar
+        k = np.searchsorted(entries, i)
+        if k == len(entries):
+            break
+        buy_bar = int(entries[k])
+        price = close[buy_bar]
+        shares = order_size(cash, price, commission, slippage)
+        if not shares:
+            i = buy_bar + 1
+            continue
+        fill_bar = buy_bar + 1
+        if fill_bar >= n:
+            break
+
+        fill = buy_fill(price, high[fill_bar], slippage)
+        comm = abs(shares) * commission * fill
+        if not affordable(cash, shares, price, fill, commission):
+            i = fill_bar
+            continue
+        values[filled:fill_bar] = cash
+        cash -= shares * fill
+        cash -= comm
+        trades.append({
+            'datetime': bt.num2date(dates[buy_bar]),
+            'side': 'buy',
+            'size': shares,
+            # 与 OrderData 按成交明细求均价的结果保持一致
+            'price': float(shares * fill / shares),
+            'comm': float(comm),
+        })
+
+        # 持仓：查找止盈/止损，账户价值按 broker 的计算顺序逐 bar 估值
+        sell_bar = _first_exit(close, fill_bar, fill, params['profit_threshold'], params['max_loss_threshold'])
+        filled = min(sell_bar + 1, n)
+        values[fill_bar:filled] = cash + position_value(shares, fill, close[fill_bar:filled])
+        if filled == n:
+            # 未触发卖出，或卖单在最后一根 bar 上创建，持仓保留到结束
+            break
+
+        exit_bar = sell_bar + 1
+        price = close[sell_bar]
+        exit_fill = sell_fill(price, low[exit_bar], slippage)
+        cash += sell_proceeds(shares, fill, exit_fill)
+        comm = abs(shares) * commission * exit_fill
+        cash -= comm
+        trades.append({
+            'datetime': bt.num2date(dates[sell_bar]),
+            'side': 'sell',
+            'size': -shares,
+            'price': float(-shares * exit_fill / -shares),
+            'comm': float(comm),
+        })
+
+        # 冷静期从卖单成交的 bar 开始按自然日计算
+        i = max(exit_bar, int(np.searchsorted(stamps, cooling_end(stamps[exit_bar], cooling_days), side='left')))
+    values[filled:] = cash
+
+    return {
+        'final_value': float(values[-1]) if n else cash,
+        'values': values,
+        'trades': trades,
+    }
@@ -0,0 +1,288 @@
+import os
+import multiprocessing as mp
+from typing import Dict, Any, Optional, List, Callable, Iterator
+import numpy as np
+import pandas as pd
+from config.backtest_config import BACKTEST_PARAMS
+from engine.analytics import SUMMARY_METRICS, compute_metrics, max_drawdown
+from engine.optimizer import SharedFrame, grid_params, random_params
+from data.dates import date2num_array
+from engine.vectorized import run_percentile_vectorized
+from indicator.percentile_indicator import percentile_ranks
+from strategy.percentile_rules import sell_fill
+from strategy.percentile_strategy import PercentileStrategy
+
+
+def walk_forward_windows(index: pd.DatetimeIndex, train_years: int, test_months: int,
+                         step_months: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    生成滚动的训练/测试窗口：在 train_years 年上寻优，在随后 test_months 个月上检验，每次向前滚动 step_months 个月
+    :param index: 有序的日期索引
+    :param train_years: 训练窗口长度（年）
+    :param test_months: 测试窗口长度（月）
+    :param step_months: 滚动步长（月），默认等于 test_months，使测试窗口首尾相接
+    :return: 窗口列表，含各窗口的起止时间和在 index 中的位置区间 [begin, stop)
+    """
+    if len(index) == 0:
+        return []
+    step = pd.DateOffset(months=step_months or test_months)
+    windows = []
+    train_start = index[0]
+    while True:
+        train_end = train_start + pd.DateOffset(years=train_years)
+        test_end = train_end + pd.DateOffset(months=test_months)
+        test_begin, test_stop = index.searchsorted(train_end), index.searchsorted(test_end)
+        if test_begin >= len(index):
+            break
+        windows.append({
+            'window': len(windows),
+            'train_start': train_start,
+            'train_end': train_end,
+            'test_start': train_end,
+            'test_end': test_end,
+            'train': (int(index.searchsorted(train_start)), int(test_begin)),
+            'test': (int(test_begin), int(test_stop)),
+        })
+        train_start = train_start + step
+    return windows
+
+
+def percentile_column(lookback_days: float) -> str:
+    """
+    指标表中 lookback_days 对应的列名
+    """
+    return f'percentile_{lookback_days}'
+
+
+def window_metrics(outcome: Dict[str, Any], index: pd.DatetimeIndex, initial_cash: float,
+                   start, end) -> Dict[str, float]:
+    """
+    按 BacktestEngine 的口径计算一段回测的指标（见 analytics.compute_metrics）
+    """
+    return compute_metrics(outcome['values'], index, outcome['trades'], initial_cash, start, end)
+
+
+def _better(value: float, best: Optional[float], sort_by: str) -> bool:
+    if value != value:
+        return False
+    if best is None:
+        return True
+    return value < best if sort_by == 'max_drawdown' else value > best
+
+
+# 子进程内的运行上下文，由 _init_worker 设置
+_worker = {}
+
+
+def _init_worker(descriptor, base_params, params, sort_by, initial_cash, commission, slippage):
+    shm, frame = SharedFrame.attach(descriptor)
+    _worker.update(shm=shm)
+    _setup(frame, base_params, params, sort_by, initial_cash, commission, slippage)
+
+
+def _setup(frame, base_params, params, sort_by, initial_cash, commission, slippage):
+    _worker.update(
+        frame=frame,
+        base_params=base_params,
+        params=params,
+        sort_by=sort_by,
+        initial_cash=initial_cash,
+        commission=commission,
+        slippage=slippage,
+    )
+
+
+def _optimize_window(window: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在训练窗口上逐个参数组回测，返回最优参数及其训练指标
+    """
+    frame = _worker['frame']
+    begin, stop = window['train']
+    data = frame.iloc[begin:stop]
+    best_params, best_metrics, best_value = None, None, None
+    for params in _worker['params']:
+        full_params = {**_worker['base_params'], **params}
+        percentile = frame[percentile_column(full_params['lookback_days'])].to_numpy()[begin:stop]
+        outcome = run_percentile_vectorized(data, full_params, _worker['initial_cash'],
+                                            _worker['commission'], _worker['slippage'], percentile=percentile)
+        metrics = window_metrics(outcome, data.index, _worker['initial_cash'],
+                                 window['train_start'], window['train_end'])
+        value = metrics[_worker['sort_by']]
+        if _better(value, best_value, _worker['sort_by']):
+            best_params, best_metrics, best_value = params, metrics, value
+    return dict(window, params=best_params, train_metrics=best_metrics)
+
+
+class WalkForward:
+    """
+    PercentileStrategy 的滚动样本外检验
+    百分位指标在全部历史上对全部 lookback_days 一次批量计算，各训练/测试窗口直接切片复用；
+    各窗口的寻优在多进程中并行，数据和指标通过共享内存传给子进程；
+    测试窗口依次运行，上一窗口期末的账户价值作为下一窗口的初始资金，拼接为样本外资金曲线；
+    期末仍有持仓时按最后一根 bar 的收盘价平仓，扣除滑点和手续费后再结转
+    """
+
+    def __init__(self, data: pd.DataFrame,
+                 param_grid: Optional[Dict[str, List[Any]]] = None,
+                 param_space: Optional[Dict[str, Any]] = None,
+                 n_iter: int = 100,
+                 seed: Optional[int] = None,
+                 base_params: Optional[Dict[str, Any]] = None,
+                 train_years: int = 3,
+                 test_months: int = 6,
+                 step_months: Optional[int] = None,
+                 sort_by: str = 'total_return',
+                 initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                 commission: float = BACKTEST_PARAMS['commission'],
+                 slippage: float = BACKTEST_PARAMS['slippage'],
+                 workers: Optional[int] = None,
+                 symbol: Optional[str] = None):
+        """
+        初始化滚动检验
+        :param data: 数据DataFrame，需包含 high / low / close 列和日期索引
+        :param param_grid: 网格搜索参数，{参数名: 候选值列表}
+        :param param_space: 随机搜索参数，{参数名: 候选值列表 或 (最小值, 最大值)}
+        :param n_iter: 随机搜索的采样次数
+        :param seed: 随机搜索的随机种子
+        :param base_params: 基础策略参数，寻优参数会覆盖其中的同名项
+        :param train_years: 训练窗口长度（年）
+        :param test_months: 测试窗口长度（月）
+        :param step_months: 滚动步长（月），默认等于 test_months，不能小于 test_months
+        :param sort_by: 选择参数所依据的训练指标（max_drawdown 取最小，其余取最大）
+        :param initial_cash: 初始资金
+        :param commission: 手续费率
+        :param slippage: 滑点
+        :param workers: 进程数，默认使用全部 CPU
+        :param symbol: 标的代码，仅用于结果标注
+        """
+        if param_grid is not None:
+            self.params = grid_params(param_grid)
+        elif param_space is not None:
+            self.params = random_params(param_space, n_iter, seed)
+        else:
+            raise ValueError("Either param_grid or param_space must be provided")
+        if sort_by not in SUMMARY_METRICS:
+            raise ValueError(f"不支持的排名指标: {sort_by}")
+        if step_months is not None and step_months < test_months:
+            # 测试窗口重叠时无法拼接资金曲线
+            raise ValueError("step_months must not be smaller than test_months")
+
+        self.data = data if data.index.is_monotonic_increasing else data.sort_index()
+        self.base_params = dict(PercentileStrategy.params._getitems())
+        self.base_params.update(base_params or {})
+        self.sort_by = sort_by
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.slippage = slippage
+        self.workers = workers or os.cpu_count() or 1
+        self.symbol = symbol
+        self.windows = walk_forward_windows(self.data.index, train_years, test_months, step_months)
+        self._indicators = None
+
+    def lookbacks(self) -> List[float]:
+        """
+        参数组中出现的全部 lookback_days
+        """
+        values = {params.get('lookback_days', self.base_params['lookback_days']) for params in self.params}
+        return sorted(values)
+
+    def indicators(self) -> pd.DataFrame:
+        """
+        在全部历史上计算各 lookback_days 的百分位（只计算一次），与 high / low / close 组成指标表
+        """
+        if self._indicators is None:
+            frame = self.data[['high', 'low', 'close']].astype(np.float64)
+            dates = date2num_array(frame.index)
+            closes = frame['close'].to_numpy()
+            lookbacks = self.lookbacks()
+            for lookback_days, values in zip(lookbacks, percentile_ranks(dates, closes, lookbacks)):
+                frame[percentile_column(lookback_days)] = values
+            self._indicators = frame
+        return self._indicators
+
+    def iter_windows(self) -> Iterator[Dict[str, Any]]:
+        """
+        并行寻优各窗口，按窗口顺序返回选出的参数（params）和训练指标（train_metrics）
+        """
+        frame = self.indicators()
+        args = (self.base_params, self.params, self.sort_by, self.initial_cash, self.commission, self.slippage)
+        if self.workers == 1 or len(self.windows) <= 1:
+            _setup(frame, *args)
+            yield from map(_optimize_window, self.windows)
+            return
+
+        shared = SharedFrame(frame)
+        try:
+            with mp.Pool(min(self.workers, len(self.windows)), initializer=_init_worker,
+                         initargs=(shared.descriptor, *args)) as pool:
+                yield from pool.imap(_optimize_window, self.windows)
+        finally:
+            shared.close()
+
+    def liquidation_cost(self, outcome: Dict[str, Any], bar: pd.Series) -> float:
+        """
+        期末持仓按该 bar 收盘价卖出的成本：滑点（不低于最低价）加手续费，无持仓时为 0
+        :param outcome: run_percentile_vectorized 的结果
+        :param bar: 测试窗口的最后一根 bar
+        """
+        size = sum(trade['size'] for trade in outcome['trades'])
+        if size <= 0:
+            return 0.0
+        fill = sell_fill(bar['close'], bar['low'], self.slippage)
+        return float(size * (bar['close'] - fill) + size * self.commission * fill)
+
+    def run(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        运行滚动检验
+        :param callback: 每完成一个测试窗口时调用
+        :return: {'windows': 各窗口的参数、训练/测试指标和期末平仓成本, 'equity': 拼接的样本外资金曲线,
+                  'trades': 样本外成交记录, 'initial_value', 'final_value'（扣除最后一个窗口的平仓成本）,
+                  'total_return', 'max_drawdown'}
+        """
+        frame = self.indicators()
+        cash = self.initial_cash
+        rows, pieces, trades = [], [], []
+        for window in self.iter_windows():
+            begin, stop = window['test']
+            row = {
+                'window': window['window'],
+                'train_start': window['train_start'],
+                'train_end': window['train_end'],
+                'test_start': window['test_start'],
+                'test_end': window['test_end'],
+                **{f'train_{k}': v for k, v in (window['train_metrics'] or {}).items()},
+            }
+            if window['params'] is None or begin == stop:
+                rows.append(row)
+                continue
+
+            params = {**self.base_params, **window['params']}
+            percentile = frame[percentile_column(params['lookback_days'])].to_numpy()[begin:stop]
+            outcome = run_percentile_vectorized(frame.iloc[begin:stop], params, cash,
+                                                self.commission, self.slippage, percentile=percentile)
+            metrics = window_metrics(outcome, frame.index[begin:stop], cash,
+                                     window['test_start'], window['test_end'])
+            row.update(window['params'])
+            row.update({f'test_{k}': v for k, v in metrics.items()})
+            row['test_trades'] = len(outcome['trades'])
+            row['liquidation_cost'] = self.liquidation_cost(outcome, frame.iloc[stop - 1])
+            rows.append(row)
+            pieces.append(pd.Series(outcome['values'], index=frame.index[begin:stop]))
+            trades.extend(dict(trade, window=window['window']) for trade in outcome['trades'])
+            # 期末持仓按收盘价平仓，扣除平仓成本后结转为下一窗口的初始资金
+            cash = outcome['final_value'] - row['liquidation_cost']
+            if callback:
+                callback(row)
+
+        equity = pd.concat(pieces) if pieces else pd.Series(dtype=np.float64)
+        equity.name = 'equity'
+        return {
+            'symbol': self.symbol,
+            'windows': pd.DataFrame(rows),
+            'equity': equity,
+            'trades': trades,
+            'initial_value': self.initial_cash,
+            'final_value': cash,
+            'total_return': (cash - self.initial_cash) / self.initial_cash,
+            'max_drawdown': max_drawdown(equity.to_numpy()),
+        }
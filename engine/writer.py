@@ -0,0 +1,234 @@
+import os
+import uuid
+import queue
+import atexit
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+import backtrader as bt
+from datetime import datetime
+from typing import Dict, Any, List
+
+# 结果输出模式：off 不输出；memory 只保留在内存；npz / parquet / csv 在运行结束时一次性写文件
+WRITER_MODES = ('off', 'memory', 'npz', 'parquet', 'csv')
+EXTENSIONS = {'npz': '.npz', 'parquet': '.parquet', 'csv': '.csv'}
+
+
+def run_scoped_path(directory: str, prefix: str, extension: str) -> str:
+    """
+    生成本次运行独有的输出路径，并行运行互不覆盖
+    :param directory: 输出目录
+    :param prefix: 文件名前缀
+    :param extension: 扩展名（含点）
+    :return: <directory>/<prefix>-<时间>-<进程号>-<随机串><extension>
+    """
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(directory, f'{prefix}-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}{extension}')
+
+
+class ColumnarWriter(bt.WriterBase):
+    """
+    替代 bt.WriterFile 的列式 writer
+    每根 bar 把 cerebro 给出的原始值直接写入按列预分配的 NumPy 块（datetime 列为 datetime64[ns]，其余为 float64），
+    不做任何文本格式化，也不保留逐行的 Python 列表；块写满后再分配下一块（从 4096 行起倍增，最大 chunk_size 行），
+    运行结束时一次性写出（npz / parquet / csv）或只保留在内存（memory）。
+    background=True 时写满的块交给后台线程，由后台线程逐块写文件（csv 追加行、parquet 追加 row group，
+    npz 只能整体写出，在最后一块到达后写）；stop() 只投递最后一块，不等待磁盘，
+    读取结果的 columns() / frame() 和 join() 等待写完。已 stop 但尚未写完的 writer 在进程退出前等待完成
+    """
+    params = (
+        ('csv', True),  # 让 cerebro 传入逐 bar 的数据
+        ('format', 'memory'),
+        ('out', None),  # 输出文件路径，None 时在 directory 下生成本次运行独有的路径
+        ('directory', 'results'),
+        ('prefix', 'backtest'),
+        ('background', False),
+        ('chunk_size', 65536),  # 每块的最大行数
+    )
+
+    FIRST_BLOCK = 4096
+
+    def __init__(self):
+        if self.p.format not in WRITER_MODES or self.p.format == 'off':
+            raise ValueError(f"不支持的输出模式: {self.p.format}")
+        self.headers = []
+        self.names = None
+        self.keep = None
+        self.chunks = []
+        self.info = {}
+        self.path = None
+        self.error = None
+        self._block = None
+        self._filled = 0
+        self._capacity = 0
+        self._blocks = 0
+        self._queue = None
+        self._thread = None
+
+    def start(self):
+        if self.p.format != 'memory':
+            self.path = self.p.out or run_scoped_path(self.p.directory, self.p.prefix, EXTENSIONS[self.p.format])
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._columns_layout()
+        if self.p.background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._consume, name='columnar-writer', daemon=True)
+            self._thread.start()
+
+    def addheaders(self, headers: List[str]):
+        self.headers.extend(headers)
+
+    def addvalues(self, values: List[Any]):
+        if self._block is None:
+            self._allocate(values)
+        row = self._filled
+        for column, i in zip(self._block, self.keep):
+            try:
+                column[row] = values[i]
+            except (TypeError, ValueError):
+                column[row] = None if column.dtype.kind == 'M' else np.nan
+        self._filled += 1
+
+    def next(self):
+        if self._filled == self._capacity:
+            self._hand_over()
+
+    def writedict(self, dct: Dict[str, Any]):
+        # cerebro 在结束时传入数据和策略的参数信息
+        self.info.update(dct)
+
+    def stop(self):
+        self._hand_over()
+        if self._queue is not None:
+            self._queue.put(None)
+            _unfinished.add(self)
+            return
+        self._flush()
+
+    def join(self):
+        """
+        等待后台线程写完文件，后台线程出错时在此抛出
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        按列返回全部数据
+        """
+        self.join()
+        return self._concat()
+
+    def frame(self) -> pd.DataFrame:
+        """
+        全部数据转为 DataFrame
+        """
+        return pd.DataFrame(self.columns(), columns=self.names)
+
+    def _columns_layout(self):
+        # 表头由若干段组成：[段名, 'len', 列名...]，段名和 len 不输出，列名为 <段名>.<列名>
+        names, keep = [], []
+        section = None
+        sections = 0
+        i = 0
+        while i < len(self.headers):
+            if i + 1 < len(self.headers) and self.headers[i + 1] == 'len':
+                section = self.headers[i] or f'data{sections}'
+                sections += 1
+                i += 2
+                continue
+            names.append(f'{section}.{self.headers[i]}')
+            keep.append(i)
+            i += 1
+        self.names, self.keep = names, keep
+
+    def _allocate(self, values: List[Any]):
+        # 按第一行的值确定各列类型：数据源的 datetime 为 datetime 对象，指标和策略的 datetime 为浮点日期
+        self._capacity = max(min(self.FIRST_BLOCK << min(self._blocks, 16), self.p.chunk_size), 1)
+        self._blocks += 1
+        self._block = [np.empty(self._capacity, dtype='datetime64[ns]' if isinstance(values[i], datetime)
+                                else np.float64) for i in self.keep]
+        self._filled = 0
+
+    def _hand_over(self):
+        # 当前块截去未写的部分后交出，下一行到来时再分配新块
+        if self._block is None:
+            return
+        if self._filled < self._capacity:
+            chunk = {name: column[:self._filled].copy() for name, column in zip(self.names, self._block)}
+        else:
+            chunk = dict(zip(self.names, self._block))
+        self._block = None
+        if self._queue is not None:
+            self._queue.put(chunk)
+        else:
+            self.chunks.append(chunk)
+
+    def _concat(self) -> Dict[str, np.ndarray]:
+        if not self.chunks:
+            return {name: np.empty(0) for name in self.names or []}
+        return {name: np.concatenate([chunk[name] for chunk in self.chunks]) for name in self.names}
+
+    def _consume(self):
+        sink = None
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                self.chunks.append(chunk)
+                sink = self._write_part(chunk, sink)
+            if self.p.format == 'npz':
+                np.savez_compressed(self.path, **self._concat())
+            elif sink is None and self.p.format != 'memory':
+                # 没有任何行时也生成只有表头的文件
+                self._write_part({name: np.empty(0) for name in self.names}, None)
+        except Exception as e:
+            self.error = e
+        finally:
+            if sink is not None and self.p.format == 'parquet':
+                sink.close()
+            _unfinished.discard(self)
+
+    def _write_part(self, chunk: Dict[str, np.ndarray], sink):
+        # 把一块追加到文件；返回 parquet 的 ParquetWriter（其他格式为 True），首块时 sink 为 None
+        if self.p.format == 'csv':
+            pd.DataFrame(chunk, columns=self.names).to_csv(self.path, index=False, header=sink is None,
+                                                           mode='w' if sink is None else 'a')
+            return True
+        if self.p.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(pd.DataFrame(chunk, columns=self.names), preserve_index=False)
+            if sink is None:
+                sink = pq.ParquetWriter(self.path, table.schema)
+            sink.write_table(table)
+            return sink
+        return sink
+
+    def _flush(self):
+        if self.p.format == 'memory':
+            return
+        if self.p.format == 'npz':
+            np.savez_compressed(self.path, **self._concat())
+        elif self.p.format == 'parquet':
+            pd.DataFrame(self._concat(), columns=self.names).to_parquet(self.path, index=False)
+        else:
+            pd.DataFrame(self._concat(), columns=self.names).to_csv(self.path, index=False)
+
+
+# 已 stop、后台线程尚未写完的 writer；后台线程为 daemon 线程，进程退出前在此等待其写完
+_unfinished = weakref.WeakSet()
+
+
+@atexit.register
+def _join_unfinished():
+    for writer in list(_unfinished):
+        thread = writer._thread
+        if thread is not None:
+            thread.join()
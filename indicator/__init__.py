@@ -1,3 +1,3 @@
-from .percentile_indicator import PercentileIndicator
+from .percentile_indicator import PercentileIndicator, percentile_rank, percentile_ranks
 
-__all__ = ['PercentileIndicator'] 
\ No newline at end of file
+__all__ = ['PercentileIndicator', 'percentile_rank', 'percentile_ranks']
\ No newline at end of file
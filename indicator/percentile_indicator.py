@@ -1,42 +1,163 @@
 import backtrader as bt
 import numpy as np
+from array import array
+from bisect import bisect_left, bisect_right, insort
 from datetime import timedelta
 
+
+def _count_leq_before(ranks: np.ndarray, positions: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    离线统计：对每个查询 q，计算 ranks[:positions[q]] 中 <= values[q] 的元素个数
+    按二进制分块（块大小 1, 2, 4, ...）拆分前缀 [0, q)，每层用一次排序 + searchsorted 完成，
+    总复杂度 O(n log^2 n)，全部在 NumPy 中完成
+    :param ranks: 每个位置的排名（整数）
+    :param positions: 查询的前缀长度
+    :param values: 查询的排名阈值
+    :return: 每个查询的计数
+    """
+    n = len(ranks)
+    counts = np.zeros(len(positions), dtype=np.int64)
+    if n == 0 or len(positions) == 0:
+        return counts
+
+    m = np.int64(ranks.max()) + 1
+    index = np.arange(n, dtype=np.int64)
+    level = 0
+    while (1 << level) <= n:
+        size = 1 << level
+        # 该层的块号为 k >> level，按 (块号, 排名) 排序
+        keys = np.sort((index >> level) * m + ranks)
+
+        # 前缀 [0, q) 在第 level 位为 1 时，包含一个完整的块 (q >> level) - 1
+        hit = ((positions >> level) & 1).astype(bool)
+        if hit.any():
+            block = (positions[hit] >> level) - 1
+            counts[hit] += np.searchsorted(keys, block * m + values[hit], side='right') - block * size
+        level += 1
+    return counts
+
+
+def percentile_rank(dates: np.ndarray, closes: np.ndarray, lookback_days: float) -> np.ndarray:
+    """
+    向量化计算百分位序列，语义与 PercentileIndicator.next 一致：
+    窗口为 [当前日期 - lookback_days, 当前日期) 内的交易日（不含当前 bar），
+    历史数据不足 lookback_days 自然日时为 NaN
+    :param dates: 日期序列（backtrader 的浮点日期，单位为天，升序）
+    :param closes: 收盘价序列
+    :param lookback_days: 回看自然日天数
+    :return: 百分位序列
+    """
+    return percentile_ranks(dates, closes, [lookback_days])[0]
+
+
+def percentile_ranks(dates: np.ndarray, closes: np.ndarray, lookbacks) -> np.ndarray:
+    """
+    一次计算多个回看天数的百分位序列
+    排名和 [0, 当前 bar) 的前缀计数与回看天数无关，只计算一次；各回看天数的窗口起点合并为一次离线查询
+    :param dates: 日期序列（backtrader 的浮点日期，单位为天，升序）
+    :param closes: 收盘价序列
+    :param lookbacks: 回看自然日天数列表
+    :return: (len(lookbacks), n) 的百分位矩阵，第 k 行与 percentile_rank(dates, closes, lookbacks[k]) 相同
+    """
+    dates = np.asarray(dates, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(closes)
+    result = np.full((len(lookbacks), n), np.nan)
+    if n == 0 or not len(lookbacks):
+        return result
+
+    index = np.arange(n, dtype=np.int64)
+    start_dates = dates[None, :] - np.asarray(lookbacks, dtype=np.float64)[:, None]
+    starts = np.searchsorted(dates, start_dates.ravel(), side='left').astype(np.int64).reshape(start_dates.shape)
+    # 窗口起点不超过当前 bar
+    np.minimum(starts, index, out=starts)
+
+    # 缺失的收盘价排在所有有效值之后，不会被计为 <= 任何值
+    valid = ~np.isnan(closes)
+    uniq = np.unique(closes[valid])
+    ranks = np.searchsorted(uniq, closes).astype(np.int64)
+
+    before = _count_leq_before(ranks, index, ranks)
+    dropped = _count_leq_before(ranks, starts.ravel(), np.tile(ranks, len(lookbacks))).reshape(starts.shape)
+    counts = before - dropped
+    counts[:, ~valid] = 0
+    lengths = index - starts
+
+    ready = (dates[0] <= start_dates) & (lengths > 0)
+    result[ready] = counts[ready] / lengths[ready]
+    return result
+
+
 class PercentileIndicator(bt.Indicator):
     """
     自定义百分位指标
     计算当前价格在指定自然日区间内交易日的百分位排名
+    逐 bar 模式下维护有序窗口和双指针，每根 bar 的更新为 O(log w) 次比较加上 insort / del 的 O(w) 列表内存移动
+    （流式数据无法预先得知全部收盘价的排名，不使用按排名建立的树状数组）；
+    预加载（runonce）模式下由 once() 一次性向量化计算整条指标线
     """
     lines = ('percentile',)
-    
+
     def __init__(self, lookback_days):
-        self.trade_days = 0
         self.lookback_days = lookback_days
-    
+        # 当前窗口内的收盘价（有序）以及窗口起点的绝对位置
+        self.window = []
+        self.window_nan = 0
+        self.window_start = 0
+        self.first_date = None
+
+    @staticmethod
+    def warmup(lookback_days: float) -> timedelta:
+        """
+        指标需要的预热时长：当前 bar 之前 lookback_days 个自然日的数据
+        """
+        return timedelta(days=float(lookback_days))
+
     def next(self):
+        current = len(self.data) - 1
         current_value = self.data.close[0]
-        
-        # 获取当前日期（backtrader中的日期访问方式）和目标起始日期
-        current_date = self.data.datetime.datetime(0)
-        start_date = current_date - timedelta(days=self.lookback_days)
-
-        # 如果实际起始日大于目标起始日，则需要增加交易天数
-        while self.data.datetime.datetime(-self.trade_days+1) > start_date and self.trade_days < len(self.data.close):
-            self.trade_days += 1
-        
-        # 如果实际起始日小于目标起始日，则需要减去交易天数
-        while self.data.datetime.datetime(-self.trade_days+1) < start_date and self.trade_days > 1:
-            self.trade_days -= 1
-        
-        # 如果起始日大于目标起始日，说明历史数据不足，抛出异常
-        if self.data.datetime.datetime(-len(self.data.close)+1) > start_date:
+
+        # 获取当前日期（backtrader 的浮点日期）和目标起始日期
+        current_date = self.data.datetime[0]
+        start_date = current_date - self.lookback_days
+        if self.first_date is None:
+            self.first_date = current_date
+
+        # 上一根 bar 进入窗口
+        if current > 0:
+            self._push(self.data.close[-1])
+
+        # 移出早于目标起始日的交易日
+        while self.window_start < current and self.data.datetime[self.window_start - current] < start_date:
+            self._pop(self.data.close[self.window_start - current])
+            self.window_start += 1
+
+        # 如果起始日大于目标起始日，说明历史数据不足
+        window_size = len(self.window) + self.window_nan
+        if self.first_date > start_date or not window_size:
             self.lines.percentile[0] = float('nan')  # 设置为 NaN，表示跳过计算
             return
 
-        # 收集指定自然日期范围内的所有交易日数据
-        historical_data = [self.data.close[i] for i in range(-self.trade_days+1, 0)]
-        
         # 计算当前值在历史数据中的百分位
-        data_array = np.array(historical_data)
-        percentile = (np.sum(data_array <= current_value) / len(data_array))
-        self.lines.percentile[0] = percentile 
\ No newline at end of file
+        if current_value != current_value:
+            self.lines.percentile[0] = 0.0
+            return
+        self.lines.percentile[0] = bisect_right(self.window, current_value) / window_size
+
+    def _push(self, value):
+        if value != value:
+            self.window_nan += 1
+        else:
+            insort(self.window, value)
+
+    def _pop(self, value):
+        if value != value:
+            self.window_nan -= 1
+        else:
+            del self.window[bisect_left(self.window, value)]
+
+    def once(self, start, end):
+        dates = np.frombuffer(self.data.datetime.array, dtype=np.float64, count=end)
+        closes = np.frombuffer(self.data.close.array, dtype=np.float64, count=end)
+        values = percentile_rank(dates, closes, self.lookback_days)
+        self.lines.percentile.array[start:end] = array('d', values[start:end])
@@ -0,0 +1,144 @@
+import os
+import json
+import glob
+import hashlib
+import argparse
+import backtrader as bt
+import numpy as np
+from array import array
+from typing import Dict, Any, Optional, Iterable
+from data.dates import date2num_array
+from indicator.percentile_indicator import percentile_ranks
+
+DEFAULT_DIR = os.path.join('.cache', 'indicators')
+
+
+def indicator_key(data_hash: str, indicator: str, params: Dict[str, Any]) -> str:
+    """
+    指标线的存储键：数据指纹 + 指标名 + 参数
+    """
+    text = json.dumps({'data': data_hash, 'indicator': indicator, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class IndicatorStore:
+    """
+    预先计算的指标线的磁盘存储
+    每条指标线保存为一个 .npy 文件，以 (数据指纹, 指标, 参数) 为键，读取时以只读内存映射方式打开；
+    同一台机器上的多个进程映射同一文件，共享操作系统页缓存中的一份物理内存，不各自持有和重复计算。
+    缺失的多个回看天数在一次 percentile_ranks 中批量计算，写入时先写临时文件再原子替换
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIR):
+        """
+        :param directory: 存储目录
+        """
+        self.directory = directory
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_written': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        读取指标线
+        :return: 只读的内存映射数组，不存在时为 None
+        """
+        try:
+            values = np.load(self.path(key), mmap_mode='r')
+        except (OSError, ValueError):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return values
+
+    def put(self, key: str, values: np.ndarray) -> np.ndarray:
+        """
+        保存指标线
+        :return: 保存后的内存映射数组
+        """
+        path = self.path(key)
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(values, dtype=np.float64))
+        os.replace(tmp_path, path)
+        self.stats['bytes_written'] += os.path.getsize(path)
+        return np.load(path, mmap_mode='r')
+
+    def percentile(self, data, lookbacks: Iterable[float], data_hash: Optional[str] = None) -> Dict[float, np.ndarray]:
+        """
+        各回看天数的百分位线，与 data 的行逐一对齐；缺失的回看天数一次批量计算后保存
+        :param data: 含 close 列和日期索引的 DataFrame 或 CompactBars
+        :param lookbacks: 回看自然日天数
+        :param data_hash: data 的指纹（见 result_cache.data_fingerprint），None 时计算
+        :return: {回看天数: 只读的内存映射数组}
+        """
+        from engine.result_cache import data_fingerprint
+
+        if data_hash is None:
+            data_hash = data_fingerprint(data)
+        lines, missing = {}, []
+        for lookback_days in dict.fromkeys(lookbacks):
+            values = self.get(indicator_key(data_hash, 'percentile', {'lookback_days': lookback_days}))
+            if values is None or len(values) != len(data):
+                missing.append(lookback_days)
+            else:
+                lines[lookback_days] = values
+        if missing:
+            closes = np.asarray(data['close'].to_numpy(), dtype=np.float64)
+            computed = percentile_ranks(date2num_array(data.index), closes, missing)
+            for lookback_days, values in zip(missing, computed):
+                key = indicator_key(data_hash, 'percentile', {'lookback_days': lookback_days})
+                lines[lookback_days] = self.put(key, values)
+        return lines
+
+    def info(self) -> Dict[str, Any]:
+        """
+        存储的指标线条数和总字节数
+        """
+        files = glob.glob(os.path.join(self.directory, '*.npy'))
+        return {'directory': self.directory, 'entries': len(files),
+                'bytes': sum(os.path.getsize(path) for path in files), **self.stats}
+
+    def clear(self):
+        """
+        删除全部指标线（已映射的数组在进程内仍可读取）
+        """
+        for path in glob.glob(os.path.join(self.directory, '*.npy')):
+            os.remove(path)
+
+
+class StoredLine(bt.Indicator):
+    """
+    从预先计算的数组读取指标值的 backtrader 指标，values 与数据源的 bar 逐一对齐
+    预加载（runonce）模式下 once() 整段复制，逐 bar 模式下按 bar 位置读取
+    """
+    lines = ('value',)
+    params = (
+        ('values', None),
+    )
+
+    def __init__(self):
+        if self.p.values is None:
+            raise ValueError("StoredLine requires values")
+
+    def next(self):
+        self.lines.value[0] = float(self.p.values[len(self.data) - 1])
+
+    def once(self, start, end):
+        self.lines.value.array[start:end] = array('d', np.asarray(self.p.values[start:end], dtype=np.float64))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='预先计算的指标线存储')
+    parser.add_argument('command', choices=['info', 'clear'])
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    store = IndicatorStore(args.directory)
+    if args.command == 'info':
+        info = store.info()
+        print(f"{info['directory']}: {info['entries']} 条指标线, {info['bytes']:,} 字节")
+    else:
+        store.clear()
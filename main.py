@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime
 import pandas as pd
 from engine.backtest_engine import BacktestEngine
@@ -29,7 +30,7 @@ def run_backtest(strategy_name: str, data_file: str, start_date: str, end_date:
     end_date = datetime.strptime(end_date, '%Y-%m-%d')
     
     # 初始化回测引擎
-    engine = BacktestEngine()
+    engine = BacktestEngine(writer='csv', output_path='backtest_results.csv')
     
     # 设置策略
     if strategy_name == 'PercentileStrategy':
@@ -54,11 +55,18 @@ def run_backtest(strategy_name: str, data_file: str, start_date: str, end_date:
     print(f"最终资金: {results['final_value']:,.2f}")
     print(f"总收益率: {results['total_return']*100:.2f}%")
     print(f"年化收益率: {results['annual_return']*100:.2f}%")
+    print(f"最大回撤: {results['max_drawdown']*100:.2f}%")
+    print(f"夏普比率: {results['sharpe']:.2f}")
+    print(f"索提诺比率: {results['sortino']:.2f}")
+    print(f"胜率: {results['win_rate']*100:.2f}% ({results['round_trips']} 笔)")
+    print(f"平均持有天数: {results['avg_holding_days']:.1f}")
     
-    # 绘制回测结果图表
-    engine.plot(style='candlestick')
+    # 生成回测报告
+    print(f"报告: {engine.plot(path='backtest_report.html')}")
 
 if __name__ == '__main__':
+    # 输出策略的成交和订单失败事件
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     run_backtest(
         strategy_name='PercentileStrategy',
         data_file='baidu-sw.xlsx',
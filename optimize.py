@@ -0,0 +1,138 @@
+import argparse
+from datetime import datetime
+from typing import Dict, Any
+import pandas as pd
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+from data.file_loader import FileDataLoader
+from indicator.store import IndicatorStore
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+
+
+def parse_value(text: str):
+    """
+    把命令行中的参数值解析为 int / float
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_params(items) -> Dict[str, Any]:
+    """
+    解析 --param 参数
+    name=v1,v2,v3 表示候选值列表，name=low:high 表示随机搜索的取值区间
+    """
+    space = {}
+    for item in items:
+        name, _, values = item.partition('=')
+        if ':' in values:
+            low, high = values.split(':')
+            space[name] = (parse_value(low), parse_value(high))
+        else:
+            space[name] = [parse_value(v) for v in values.split(',')]
+    return space
+
+
+def run_optimize(strategy_name: str, data_file: str, start_date: str, end_date: str, space: Dict[str, Any],
+                 n_iter: int = 0, seed: int = None, workers: int = None, chunksize: int = 1,
+                 sort_by: str = 'total_return', top: int = 20, output: str = None,
+                 mode: str = 'cerebro', indicator_store: str = None) -> pd.DataFrame:
+    """
+    运行参数寻优
+    :param strategy_name: 策略名称
+    :param data_file: 数据文件路径
+    :param start_date: 开始日期 (YYYY-MM-DD)
+    :param end_date: 结束日期 (YYYY-MM-DD)
+    :param space: 参数空间
+    :param n_iter: 随机搜索次数，0 表示网格搜索
+    :param seed: 随机种子
+    :param workers: 进程数
+    :param chunksize: 每次分发给单个进程的参数组数
+    :param sort_by: 排名指标
+    :param top: 打印前几名
+    :param output: 结果保存路径 (.csv)
+    :param mode: 回测模式 ('cerebro' 或 'vectorized')
+    :param indicator_store: 指标线存储目录，设置时各 lookback_days 的百分位只计算一次，子进程共享读取
+    :return: 排名表
+    """
+    loader = FileDataLoader()
+    if data_file.endswith('.xlsx'):
+        data = loader.load_excel(data_file)
+    elif data_file.endswith('.csv'):
+        data = loader.load_csv(data_file)
+    else:
+        raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+
+    if strategy_name != 'PercentileStrategy':
+        raise ValueError(f"不支持的策略名称: {strategy_name}")
+
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(data)
+    engine.set_initial_cash(BACKTEST_PARAMS['initial_cash'])
+    if indicator_store:
+        engine.set_indicator_store(IndicatorStore(indicator_store))
+
+    done = [0]
+
+    def progress(result):
+        done[0] += 1
+        if 'error' in result:
+            print(f"[{done[0]}] {result['params']} 失败: {result['error']}")
+        else:
+            print(f"[{done[0]}] {result['params']} 总收益率: {result['total_return']*100:.2f}%")
+
+    start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    end_date = datetime.strptime(end_date, '%Y-%m-%d')
+    if n_iter:
+        table = engine.optimize(start_date, end_date, param_space=space, n_iter=n_iter, seed=seed,
+                                workers=workers, chunksize=chunksize, sort_by=sort_by, callback=progress)
+    else:
+        table = engine.optimize(start_date, end_date, param_grid=space,
+                                workers=workers, chunksize=chunksize, sort_by=sort_by, callback=progress)
+
+    print("\n=== 寻优结果 ===")
+    print(table.head(top).to_string())
+    if output:
+        table.to_csv(output)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 并行参数寻优')
+    parser.add_argument('--strategy', default='PercentileStrategy')
+    parser.add_argument('--data-file', default='baidu-sw.xlsx')
+    parser.add_argument('--start-date', default='2022-03-22')
+    parser.add_argument('--end-date', default='2025-06-07')
+    parser.add_argument('--param', action='append', default=[],
+                        help='name=v1,v2,... (候选值) 或 name=low:high (随机搜索区间)，可重复')
+    parser.add_argument('--random', type=int, default=0, help='随机搜索次数，默认网格搜索')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--sort-by', default='total_return')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--mode', default='cerebro', choices=BacktestEngine.MODES)
+    parser.add_argument('--indicator-store', default=None, help='指标线存储目录（如 .cache/indicators）')
+    args = parser.parse_args()
+
+    run_optimize(
+        strategy_name=args.strategy,
+        data_file=args.data_file,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        space=parse_params(args.param),
+        n_iter=args.random,
+        seed=args.seed,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        sort_by=args.sort_by,
+        top=args.top,
+        output=args.output,
+        mode=args.mode,
+        indicator_store=args.indicator_store,
+    )
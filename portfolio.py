@@ -0,0 +1,88 @@
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from engine.batch import find_data_files, resolve_symbols
+from engine.portfolio import PortfolioEngine, SIZING_MODES
+from data.file_loader import FileDataLoader
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from config.data_config import DATA_SOURCES
+
+
+def run_portfolio(data_dir: str, start_date: str, end_date: str, symbols: Optional[List[str]] = None,
+                  patterns: Optional[List[str]] = None, max_positions: int = 10, sizing: str = 'equal',
+                  position_size: float = None, initial_cash: float = BACKTEST_PARAMS['initial_cash'],
+                  output: str = None) -> Dict[str, Any]:
+    """
+    以共享资金运行多标的 PercentileStrategy 组合回测
+    :param data_dir: 数据目录
+    :param start_date: 开始日期 (YYYY-MM-DD)
+    :param end_date: 结束日期 (YYYY-MM-DD)
+    :param symbols: 标的代码列表，默认使用目录下的全部文件
+    :param patterns: 文件匹配模式
+    :param max_positions: 最多同时持有的标的数
+    :param sizing: 仓位分配方式，见 engine.portfolio.SIZING_MODES
+    :param position_size: 'equal' 方式下每个持仓占账户总价值的比例
+    :param initial_cash: 初始资金
+    :param output: 成交记录保存路径 (.csv)
+    :return: 回测结果
+    """
+    files = resolve_symbols(data_dir, symbols) if symbols else find_data_files(data_dir, patterns)
+    loader = FileDataLoader(data_dir)
+    data = {}
+    for symbol, file_name in files:
+        if file_name is None:
+            print(f"{symbol} 失败: 找不到数据文件")
+        elif file_name.endswith('.xlsx'):
+            data[symbol] = loader.load_excel(file_name)
+        elif file_name.endswith('.csv'):
+            data[symbol] = loader.load_csv(file_name)
+
+    engine = PortfolioEngine(STRATEGY_PARAMS['PercentileStrategy'], initial_cash=initial_cash,
+                             max_positions=max_positions, sizing=sizing, position_size=position_size)
+    engine.set_data(data)
+    results = engine.run(datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d'))
+
+    print("\n=== 组合回测结果 ===")
+    print(f"标的数: {len(results['symbols'])}")
+    print(f"回测区间: {results['start_date'].strftime('%Y-%m-%d')} 至 {results['end_date'].strftime('%Y-%m-%d')}")
+    print(f"初始资金: {results['initial_value']:,.2f}")
+    print(f"最终资金: {results['final_value']:,.2f}")
+    print(f"总收益率: {results['total_return']*100:.2f}%")
+    print(f"年化收益率: {results['annual_return']*100:.2f}%")
+    print(f"最大回撤: {results['max_drawdown']*100:.2f}%")
+    print(f"夏普比率: {results['sharpe']:.2f}")
+    print(f"胜率: {results['win_rate']*100:.2f}% ({results['round_trips']} 笔)")
+    print(f"期末持仓: {results['positions']}")
+    if output:
+        pd.DataFrame(results['trades']).to_csv(output, index=False)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 共享资金的多标的组合回测')
+    parser.add_argument('--data-dir', default=DATA_SOURCES['excel']['data_dir'])
+    parser.add_argument('--start-date', default='2022-03-22')
+    parser.add_argument('--end-date', default='2025-06-07')
+    parser.add_argument('--symbols', nargs='*', default=None, help='标的代码列表，默认使用目录下的全部文件')
+    parser.add_argument('--pattern', action='append', default=None, help='文件匹配模式，可重复')
+    parser.add_argument('--max-positions', type=int, default=10)
+    parser.add_argument('--sizing', default='equal', choices=SIZING_MODES)
+    parser.add_argument('--position-size', type=float, default=None)
+    parser.add_argument('--initial-cash', type=float, default=BACKTEST_PARAMS['initial_cash'])
+    parser.add_argument('--output', default=None, help='成交记录 (.csv)')
+    args = parser.parse_args()
+
+    run_portfolio(
+        data_dir=args.data_dir,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        symbols=args.symbols,
+        patterns=args.pattern,
+        max_positions=args.max_positions,
+        sizing=args.sizing,
+        position_size=args.position_size,
+        initial_cash=args.initial_cash,
+        output=args.output,
+    )
@@ -0,0 +1,89 @@
+import argparse
+from datetime import datetime
+from typing import List, Optional
+import pandas as pd
+from engine.backtest_engine import BacktestEngine
+from engine.batch import find_data_files, resolve_symbols
+from engine.report import write_reports, DOWNSAMPLE_METHODS, REPORT_FORMATS
+from strategy.percentile_strategy import PercentileStrategy
+from data.file_loader import FileDataLoader
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from config.data_config import DATA_SOURCES
+
+
+def run_reports(data_dir: str, start_date: str, end_date: str, output_dir: str = 'reports',
+                symbols: Optional[List[str]] = None, patterns: Optional[List[str]] = None,
+                formats: List[str] = ('html',), max_points: int = 2000, method: str = 'lttb',
+                mode: str = 'vectorized', workers: int = 1) -> pd.DataFrame:
+    """
+    对每个标的运行 PercentileStrategy 回测并生成报告，以及汇总各标的的 index.html
+    :param data_dir: 数据目录
+    :param start_date: 开始日期 (YYYY-MM-DD)
+    :param end_date: 结束日期 (YYYY-MM-DD)
+    :param output_dir: 报告目录
+    :param symbols: 标的代码列表，默认使用目录下的全部文件
+    :param patterns: 文件匹配模式
+    :param formats: 报告格式，见 engine.report.REPORT_FORMATS
+    :param max_points: 每条序列的最大点数
+    :param method: 降采样方式，见 engine.report.DOWNSAMPLE_METHODS
+    :param mode: 回测模式 ('cerebro' 或 'vectorized')
+    :param workers: 生成报告的进程数
+    :return: 汇总表；单个标的出错时打印原因并跳过，不影响其他标的
+    """
+    files = resolve_symbols(data_dir, symbols) if symbols else find_data_files(data_dir, patterns)
+    loader = FileDataLoader(data_dir)
+    start, end = datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+    results, data, percentiles, threshold = {}, {}, {}, None
+    for symbol, file_name in files:
+        if file_name is None:
+            print(f"{symbol} 失败: 找不到数据文件")
+            continue
+        try:
+            frame = loader.load_excel(file_name) if file_name.endswith('.xlsx') else loader.load_csv(file_name)
+            engine = BacktestEngine(mode=mode)
+            engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+            engine.set_data(frame)
+            engine.set_initial_cash(BACKTEST_PARAMS['initial_cash'])
+            report = engine.report(engine.run(start, end))
+        except Exception as e:
+            print(f"{symbol} 失败: {type(e).__name__}: {e}")
+            continue
+        results[symbol], data[symbol], percentiles[symbol] = report.result, report.data, report.percentile
+        threshold = report.threshold
+
+    table = write_reports(results, output_dir, data=data, percentiles=percentiles, formats=formats,
+                          workers=workers, threshold=threshold, max_points=max_points, method=method)
+    print(f"已生成 {len(table)} 个标的的报告: {output_dir}/index.html")
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 回测报告（降采样的价格/百分位/账户价值/回撤图）')
+    parser.add_argument('--data-dir', default=DATA_SOURCES['excel']['data_dir'])
+    parser.add_argument('--start-date', default='2022-03-22')
+    parser.add_argument('--end-date', default='2025-06-07')
+    parser.add_argument('--symbols', nargs='*', default=None, help='标的代码列表，默认使用目录下的全部文件')
+    parser.add_argument('--pattern', action='append', default=None, help='文件匹配模式，可重复')
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--format', action='append', default=None, choices=REPORT_FORMATS,
+                        help='报告格式，可重复，默认 html')
+    parser.add_argument('--max-points', type=int, default=2000, help='每条序列的最大点数')
+    parser.add_argument('--method', default='lttb', choices=DOWNSAMPLE_METHODS)
+    parser.add_argument('--mode', default='vectorized', choices=BacktestEngine.MODES)
+    parser.add_argument('--workers', type=int, default=1, help='生成报告的进程数')
+    args = parser.parse_args()
+
+    run_reports(
+        data_dir=args.data_dir,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        output_dir=args.output_dir,
+        symbols=args.symbols,
+        patterns=args.pattern,
+        formats=args.format or ['html'],
+        max_points=args.max_points,
+        method=args.method,
+        mode=args.mode,
+        workers=args.workers,
+    )
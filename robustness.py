@@ -0,0 +1,88 @@
+import time
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List
+from engine.backtest_engine import BacktestEngine
+from engine.robustness import MonteCarlo, METHODS
+from strategy.percentile_strategy import PercentileStrategy
+from data.file_loader import FileDataLoader
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+
+
+def run_robustness(data_file: str, start_date: str, end_date: str, methods: List[str], n: int = 10000,
+                   seed: int = None, workers: int = None, block_size: int = 20, ruin_level: float = 0.5,
+                   confidence: float = 0.95, mode: str = 'cerebro') -> Dict[str, Any]:
+    """
+    对 PercentileStrategy 的回测结果做 Monte Carlo / bootstrap 稳健性分析
+    :param data_file: 数据文件路径
+    :param start_date: 开始日期 (YYYY-MM-DD)
+    :param end_date: 结束日期 (YYYY-MM-DD)
+    :param methods: 重抽样方式，见 engine.robustness.METHODS
+    :param n: 每种方式的路径数
+    :param seed: 随机种子
+    :param workers: 进程数
+    :param block_size: 块重抽样的块长度（bar 数）
+    :param ruin_level: 破产线（净值，初始为 1）
+    :param confidence: 置信水平
+    :param mode: 回测模式 ('cerebro' 或 'vectorized')
+    :return: {重抽样方式: 分析结果}
+    """
+    loader = FileDataLoader()
+    if data_file.endswith('.xlsx'):
+        data = loader.load_excel(data_file)
+    elif data_file.endswith('.csv'):
+        data = loader.load_csv(data_file)
+    else:
+        raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(data)
+    engine.set_initial_cash(BACKTEST_PARAMS['initial_cash'])
+    result = engine.run(datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d'))
+
+    analysis = MonteCarlo.from_result(result, block_size=block_size, ruin_level=ruin_level, workers=workers)
+    print(f"逐日收益: {len(analysis.returns)} 个, 完整交易: {len(analysis.trade_returns)} 笔")
+    reports = {}
+    for method in methods:
+        started = time.perf_counter()
+        report = analysis.run(method, n=n, seed=seed, confidence=confidence)
+        elapsed = time.perf_counter() - started
+        print(f"\n=== {method} ({n} 条路径, {elapsed:.2f} 秒) ===")
+        print(report['summary'].to_string(float_format=lambda v: f'{v:.4f}'))
+        print(f"亏损概率: {report['prob_loss']*100:.2f}%")
+        print(f"破产概率 (净值 <= {ruin_level:g}): {report['risk_of_ruin']*100:.2f}%")
+        reports[method] = report
+    return reports
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 回测结果的 Monte Carlo / bootstrap 稳健性分析')
+    parser.add_argument('--data-file', default='baidu-sw.xlsx')
+    parser.add_argument('--start-date', default='2022-03-22')
+    parser.add_argument('--end-date', default='2025-06-07')
+    parser.add_argument('--method', action='append', choices=METHODS, default=None,
+                        help='重抽样方式，可重复，默认全部')
+    parser.add_argument('-n', type=int, default=10000, help='每种方式的路径数')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--block-size', type=int, default=20)
+    parser.add_argument('--ruin-level', type=float, default=0.5)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--mode', default='cerebro', choices=BacktestEngine.MODES)
+    args = parser.parse_args()
+
+    run_robustness(
+        data_file=args.data_file,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        methods=args.method or list(METHODS),
+        n=args.n,
+        seed=args.seed,
+        workers=args.workers,
+        block_size=args.block_size,
+        ruin_level=args.ruin_level,
+        confidence=args.confidence,
+        mode=args.mode,
+    )
@@ -1,3 +1,4 @@
 from .percentile_strategy import PercentileStrategy
+from .trade_log import TradeLog, TradeEvent
 
-__all__ = ['PercentileStrategy'] 
\ No newline at end of file
+__all__ = ['PercentileStrategy', 'TradeLog', 'TradeEvent'] 
\ No newline at end of file
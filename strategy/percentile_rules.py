@@ -0,0 +1,80 @@
+import math
+import numpy as np
+import pandas as pd
+
+# PercentileStrategy 的下单、止盈止损和冷静期规则，以及与 BacktestEngine 的 broker 设置
+# （cheat-on-close、百分比滑点、百分比手续费）一致的成交计算。
+# PercentileStrategy（cerebro）、run_percentile_vectorized、IncrementalPercentileState 和 PortfolioEngine
+# 共用这些函数，规则只在这里修改；参数可以是标量，也可以是按标的排列的数组
+
+
+def order_size(cash, price, commission: float, slippage: float):
+    """
+    可买股数：按收盘价并预留手续费和滑点后向下取整
+    :return: 标量时为 int，数组时为 int64 数组
+    """
+    shares = cash / price / (1 + commission + slippage)
+    if np.ndim(shares):
+        return shares.astype(np.int64)
+    return int(shares)
+
+
+def exit_hit(close, cost, profit_threshold: float, max_loss_threshold: float):
+    """
+    是否触发止盈（盈利比例超过 profit_threshold）或止损（亏损比例超过 max_loss_threshold）
+    """
+    ratio = (close - cost) / cost
+    return (ratio > profit_threshold) | (ratio < -max_loss_threshold)
+
+
+def cooling_end(sold_ns, cooling_days: float):
+    """
+    冷静期结束的时刻（纳秒时间戳），早于该时刻不买入
+    与按 (当前时间 - 卖出时间).days < cooling_days 判断等价
+    :param sold_ns: 卖单成交时刻的纳秒时间戳
+    """
+    if cooling_days <= 0:
+        return sold_ns
+    return sold_ns + pd.Timedelta(days=math.ceil(cooling_days)).value
+
+
+def buy_fill(price, high, slippage: float):
+    """
+    买入成交价：下单价按比例加滑点，不高于成交 bar 的最高价（BackBroker 的 slip_perc 规则）
+    """
+    if not slippage:
+        return price
+    return np.fmin(price * (1 + slippage), high)
+
+
+def sell_fill(price, low, slippage: float):
+    """
+    卖出成交价：下单价按比例减滑点，不低于成交 bar 的最低价
+    """
+    if not slippage:
+        return price
+    return np.fmax(price * (1 - slippage), low)
+
+
+def affordable(cash: float, size: int, price: float, fill: float, commission: float) -> bool:
+    """
+    买单是否有足够资金：提交时按下单价、成交时按成交价各检查一次，不足则订单失效
+    """
+    return not (cash - size * price - abs(size) * commission * price < 0
+                or cash - size * fill - abs(size) * commission * fill < 0)
+
+
+def position_value(size, cost, close):
+    """
+    持仓市值，计算顺序与 BackBroker 的估值一致（保证逐位相同的浮点结果）
+    """
+    unrealized = size * (close - cost) * 1.0
+    return (size * close - unrealized) / 1.0 + unrealized
+
+
+def sell_proceeds(size, cost, fill):
+    """
+    平仓回笼的资金（不含手续费），计算顺序与 BackBroker 一致
+    :param size: 卖出股数（正数）
+    """
+    return size * cost / 1.0 + size * (fill - cost) * 1.0
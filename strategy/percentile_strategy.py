@@ -1,6 +1,8 @@
 import backtrader as bt
 from indicator.percentile_indicator import PercentileIndicator
-from config.backtest_config import BACKTEST_PARAMS
+from indicator.store import StoredLine
+from strategy import trade_log
+from strategy.percentile_rules import order_size, exit_hit
 
 class PercentileStrategy(bt.Strategy):
     params = (
@@ -9,12 +11,25 @@ class PercentileStrategy(bt.Strategy):
         ('profit_threshold', 0.10),  # 盈利阈值，10%
         ('max_loss_threshold', 0.10),  # 最大亏损阈值，10%
         ('cooling_days', 3),  # 卖出后的冷静期天数
+        ('log_level', trade_log.INFO),  # 订单事件的记录级别，trade_log.OFF 关闭
+        ('log_capacity', None),  # 最多保留的订单事件数，None 表示不限
+        ('trade_start', None),  # 不早于此时间开仓，之前的 bar 只用于指标预热
+        ('percentile_line', None),  # 与数据源逐 bar 对齐的预先计算的百分位（如 IndicatorStore 的内存映射数组）
     )
 
-    def log(self, txt, dt=None):
-        # 简化日志记录，不使用日期
-        # pass
-        print(f'{txt}')
+    @classmethod
+    def warmup(cls, params=None):
+        """
+        开始交易前需要的预热时长，由百分位指标的回看天数决定
+        :param params: 策略参数，缺省项使用默认值
+        """
+        lookback_days = (params or {}).get('lookback_days', cls.params.lookback_days)
+        return PercentileIndicator.warmup(lookback_days)
+
+    def log(self, txt, dt=None, level=trade_log.INFO):
+        # 自由文本日志，交给 logging 按级别过滤
+        if trade_log.logger.isEnabledFor(level):
+            trade_log.logger.log(level, txt)
 
     def __init__(self):
         # 引用收盘价
@@ -24,60 +39,54 @@ class PercentileStrategy(bt.Strategy):
         # 跟踪订单
         self.order = None
         
-        # 计算百分位
-        self.percentile = PercentileIndicator(lookback_days=self.params.lookback_days)
+        # 计算百分位，已预先计算时直接读取
+        if self.params.percentile_line is not None:
+            self.percentile = StoredLine(values=self.params.percentile_line)
+        else:
+            self.percentile = PercentileIndicator(lookback_days=self.params.lookback_days)
         self.percentile.csv = True
 
         # 添加冷静期相关变量
         self.sell_datetime = None
 
+        # 订单事件日志
+        self.trade_log = trade_log.TradeLog(self.params.log_level, self.params.log_capacity)
+
+    def start(self):
+        # 按 broker 的实际费率计算可买股数
+        self._commission = self.broker.getcommissioninfo(self.data).p.commission
+        self._slippage = self.broker.p.slip_perc
+        # 开始交易的浮点日期，逐 bar 比较时不做日期转换
+        self._trade_start = bt.date2num(self.params.trade_start) if self.params.trade_start else None
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             return
 
         if order.status in [order.Completed]:
-            if order.isbuy():
-                # 打印更详细的价格信息
-                self.log(f'''
-                {self.datetime.datetime(0).date()} BUY EXECUTED
-                Executed Price: {order.executed.price:.2f}
-                Executed Size: {order.executed.size}
-                Bar Open: {self.data.open[0]:.2f}
-                Bar High: {self.data.high[0]:.2f}
-                Bar Low: {self.data.low[0]:.2f}
-                Bar Close: {self.data.close[0]:.2f}
-                Cost: {order.executed.value:.2f}
-                Comm: {order.executed.comm:.2f}
-                ''')
-            elif order.issell():
+            if order.issell():
                 # 记录卖出时间
                 self.sell_datetime = self.datetime.datetime(0)
-                self.log(f'''   
-                {self.datetime.datetime(0).date()} SELL EXECUTED
-                Executed Price: {order.executed.price:.2f}
-                Executed Size: {order.executed.size}
-                Bar Open: {self.data.open[0]:.2f}
-                Bar High: {self.data.high[0]:.2f}
-                Bar Low: {self.data.low[0]:.2f}
-                Bar Close: {self.data.close[0]:.2f}
-                Cost: {order.executed.value:.2f}
-                Comm: {order.executed.comm:.2f}
-                ''')
+            if self.trade_log.enabled(trade_log.INFO):
+                self.trade_log.record(
+                    trade_log.INFO, bt.num2date(order.executed.dt), trade_log.FILL,
+                    'buy' if order.isbuy() else 'sell', order.executed.size, order.executed.price,
+                    value=order.executed.value, comm=order.executed.comm, ref=order.ref,
+                    open=self.data.open[0], high=self.data.high[0], low=self.data.low[0], close=self.data.close[0],
+                )
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            status_map = {
-                order.Canceled: '订单被取消',
-                order.Margin: '保证金不足',
-                order.Rejected: '订单被拒绝'
-            }
-            reason = status_map.get(order.status, '未知原因')
-            self.log(f'''
-            {self.datetime.datetime(0).date()} 订单状态: {reason}
-            订单类型: {'买入' if order.isbuy() else '卖出'}
-            订单大小: {order.created.size}
-            订单价格: {order.created.price:.2f}
-            账户资金: {self.broker.getcash():.2f}
-            订单ID: {order.ref}
-            ''')
+            if self.trade_log.enabled(trade_log.WARNING):
+                status_map = {
+                    order.Canceled: '订单被取消',
+                    order.Margin: '保证金不足',
+                    order.Rejected: '订单被拒绝'
+                }
+                reason = status_map.get(order.status, '未知原因')
+                self.trade_log.record(
+                    trade_log.WARNING, self.datetime.datetime(0), trade_log.FAIL,
+                    'buy' if order.isbuy() else 'sell', order.created.size, order.created.price,
+                    cash=self.broker.getcash(), ref=order.ref, note=reason,
+                )
 
         self.order = None
 
@@ -86,6 +95,10 @@ class PercentileStrategy(bt.Strategy):
         if self.order:
             return
 
+        # 预热期内不交易
+        if self._trade_start is not None and self.datetime[0] < self._trade_start:
+            return
+
         # 检查是否持仓
         if not self.position:
             # 检查是否在冷静期内
@@ -102,9 +115,11 @@ class PercentileStrategy(bt.Strategy):
             if self.percentile[0] < self.params.percentile_threshold:
                 # 计算最大可以买入的股数
                 price = self.dataclose[0]
-                shares = int(self.broker.getcash() / price / (1 + BACKTEST_PARAMS['commission'] + BACKTEST_PARAMS['slippage']))
+                shares = order_size(self.broker.getcash(), price, self._commission, self._slippage)
                 
-                self.log(f'{self.datetime.datetime(0).date()} BUY CREATE, {shares} shares at {price:.2f}, cash: {self.broker.getcash():.2f}')
+                if self.trade_log.enabled(trade_log.DEBUG):
+                    self.trade_log.record(trade_log.DEBUG, self.datetime.datetime(0), trade_log.CREATE, 'buy',
+                                          shares, price, cash=self.broker.getcash())
 
                 self.order = self.buy(size=shares)
         else:
@@ -113,16 +128,17 @@ class PercentileStrategy(bt.Strategy):
             cost_price = self.position.price
             profit_ratio = (current_price - cost_price) / cost_price
 
-            # 如果盈利超过阈值，卖出所有持仓
-            if profit_ratio > self.params.profit_threshold:
-                self.log(f'{self.datetime.datetime(0).date()} SELL CREATE, {self.position.size} shares at {current_price:.2f}, Profit: {profit_ratio:.2%}')
-
-                self.order = self.sell(size=self.position.size) 
-            # 如果亏损超过阈值，卖出所有持仓
-            elif profit_ratio < -self.params.max_loss_threshold:
-                self.log(f'{self.datetime.datetime(0).date()} SELL CREATE, {self.position.size} shares at {current_price:.2f}, Profit: {profit_ratio:.2%}')
+            # 如果盈利或亏损超过阈值，卖出所有持仓
+            if exit_hit(current_price, cost_price, self.params.profit_threshold, self.params.max_loss_threshold):
+                self._record_sell(current_price, profit_ratio)
 
                 self.order = self.sell(size=self.position.size)
 
+    def _record_sell(self, price, profit_ratio):
+        if self.trade_log.enabled(trade_log.DEBUG):
+            self.trade_log.record(trade_log.DEBUG, self.datetime.datetime(0), trade_log.CREATE, 'sell',
+                                  self.position.size, price, cash=self.broker.getcash(),
+                                  profit=profit_ratio)
+
     def stop(self):
         pass
\ No newline at end of file
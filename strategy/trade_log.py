@@ -0,0 +1,165 @@
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import pandas as pd
+
+# 事件级别沿用 logging 的级别：下单为 DEBUG，成交为 INFO，订单失败为 WARNING
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+# 关闭事件记录
+OFF = logging.CRITICAL + 10
+
+# 事件种类
+CREATE = 'create'
+FILL = 'fill'
+FAIL = 'fail'
+
+logger = logging.getLogger('strategy.trade_log')
+# 未配置 logging 时不输出（避免 WARNING 事件经 lastResort 打到 stderr）
+logger.addHandler(logging.NullHandler())
+
+
+def quiet_params(strategy_class, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    关闭订单事件记录的策略参数：策略支持 log_level 且参数中未显式设置时设为 OFF
+    :param strategy_class: 策略类
+    :param params: 策略参数
+    :return: 新的参数字典
+    """
+    params = dict(params or {})
+    if 'log_level' in strategy_class.params._getkeys():
+        params.setdefault('log_level', OFF)
+    return params
+
+
+class TradeEvent:
+    """
+    一条订单事件，只保存原始数值，文本在需要时才格式化
+    """
+    __slots__ = ('level', 'dt', 'kind', 'side', 'size', 'price', 'value', 'comm', 'cash',
+                 'profit', 'ref', 'note', 'open', 'high', 'low', 'close')
+
+    FIELDS = __slots__
+
+    def __init__(self, level, dt, kind, side, size, price, value=None, comm=None, cash=None,
+                 profit=None, ref=None, note=None, open=None, high=None, low=None, close=None):
+        self.level = level
+        self.dt = dt
+        self.kind = kind
+        self.side = side
+        self.size = size
+        self.price = price
+        self.value = value
+        self.comm = comm
+        self.cash = cash
+        self.profit = profit
+        self.ref = ref
+        self.note = note
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __str__(self) -> str:
+        day = self.dt.date() if isinstance(self.dt, datetime) else self.dt
+        side = self.side.upper()
+        if self.kind == CREATE:
+            text = f'{day} {side} CREATE, {self.size} shares at {self.price:.2f}'
+            if self.cash is not None:
+                text += f', cash: {self.cash:.2f}'
+            if self.profit is not None:
+                text += f', Profit: {self.profit:.2%}'
+            return text
+        if self.kind == FILL:
+            text = f'{day} {side} EXECUTED, Price: {self.price:.2f}, Size: {self.size}'
+            if self.value is not None:
+                text += f', Cost: {self.value:.2f}'
+            if self.comm is not None:
+                text += f', Comm: {self.comm:.2f}'
+            if self.close is not None:
+                text += (f', Bar O/H/L/C: {self.open:.2f}/{self.high:.2f}/'
+                         f'{self.low:.2f}/{self.close:.2f}')
+            return text
+        return (f'{day} {side} {self.note}, Size: {self.size}, Price: {self.price:.2f}, '
+                f'Cash: {self.cash:.2f}, Ref: {self.ref}')
+
+    def __repr__(self) -> str:
+        return f'TradeEvent({self})'
+
+
+class TradeLog:
+    """
+    按级别过滤的结构化订单事件日志
+    低于 level 的事件直接丢弃，不构造记录也不格式化；记录的事件只在 logger 启用对应级别时才转成文本输出。
+    运行结束后可批量导出为 DataFrame / CSV / Parquet
+    """
+
+    def __init__(self, level: int = INFO, capacity: Optional[int] = None):
+        """
+        :param level: 记录的最低级别，OFF 表示不记录
+        :param capacity: 最多保留的事件数（环形缓冲），None 表示不限
+        """
+        self.level = level
+        self.events = deque(maxlen=capacity)
+
+    def enabled(self, level: int) -> bool:
+        """
+        该级别的事件是否会被记录，调用方可据此跳过事件参数的计算
+        """
+        return level >= self.level
+
+    def record(self, level: int, *args, **kwargs) -> Optional[TradeEvent]:
+        """
+        记录一条事件，参数同 TradeEvent（不含 level）
+        :return: 记录的事件，级别未启用时为 None
+        """
+        if level < self.level:
+            return None
+        event = TradeEvent(level, *args, **kwargs)
+        self.events.append(event)
+        if logger.isEnabledFor(level):
+            # 由 logging 延迟调用 __str__
+            logger.log(level, '%s', event)
+        return event
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def trades(self) -> List[Dict[str, Any]]:
+        """
+        成交记录，字段与 BacktestEngine.run 结果中的 trades 一致
+        """
+        return [{
+            'datetime': event.dt,
+            'side': event.side,
+            'size': event.size,
+            'price': event.price,
+            'comm': event.comm,
+        } for event in self.events if event.kind == FILL]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        全部事件转为 DataFrame，每个字段一列
+        """
+        columns = {name: [getattr(event, name) for event in self.events] for name in TradeEvent.FIELDS}
+        return pd.DataFrame(columns, columns=list(TradeEvent.FIELDS))
+
+    def to_csv(self, path: str):
+        """
+        导出为 CSV
+        """
+        self.to_frame().to_csv(path, index=False)
+
+    def to_parquet(self, path: str):
+        """
+        导出为 Parquet（需要 pyarrow 或 fastparquet）
+        """
+        self.to_frame().to_parquet(path, index=False)
@@ -0,0 +1,86 @@
+import argparse
+from datetime import datetime
+from engine.backtest_engine import BacktestEngine
+from engine.optimizer import grid_params, random_params, rank_results
+from engine.sweep_queue import SweepQueue, submit_sweep, run_worker, run_local
+from strategy.percentile_strategy import PercentileStrategy
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from config.data_config import DATA_SOURCES
+from optimize import parse_params
+
+DEFAULT_QUEUE = 'sweep_queue.sqlite'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 分布式参数扫描（SQLite 任务队列）')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help='队列文件路径，多台机器共用时放在支持文件锁的共享存储上（如 NFSv4）')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='写入扫描配置并提交工作单元（可重复执行）')
+    submit.add_argument('--data-dir', default=DATA_SOURCES['excel']['data_dir'])
+    submit.add_argument('--symbols', nargs='*', default=None, help='标的代码列表，默认使用目录下的全部文件')
+    submit.add_argument('--pattern', action='append', default=None, help='文件匹配模式，可重复')
+    submit.add_argument('--start-date', default='2022-03-22')
+    submit.add_argument('--end-date', default='2025-06-07')
+    submit.add_argument('--param', action='append', default=[],
+                        help='name=v1,v2,... (候选值) 或 name=low:high (随机搜索区间)，可重复')
+    submit.add_argument('--random', type=int, default=0, help='随机搜索次数，默认网格搜索')
+    submit.add_argument('--seed', type=int, default=None)
+    submit.add_argument('--mode', default='cerebro', choices=BacktestEngine.MODES)
+
+    work = commands.add_parser('work', help='启动工作进程处理队列')
+    work.add_argument('--processes', type=int, default=1, help='本机启动的工作进程数')
+    work.add_argument('--data-dir', default=None, help='本机的数据目录，默认使用扫描配置中的目录')
+    work.add_argument('--batch', type=int, default=1, help='每次领取的单元数')
+    work.add_argument('--lease', type=float, default=300.0, help='租约时长（秒），运行中自动续约')
+    work.add_argument('--max-attempts', type=int, default=3)
+    work.add_argument('--no-wait', action='store_true', help='没有可领取的单元时立即退出')
+    work.add_argument('--indicator-store', default=None, help='本机的指标线存储目录，工作进程共享读取预先计算的百分位')
+
+    commands.add_parser('status', help='各状态的单元数')
+
+    results = commands.add_parser('results', help='导出结果')
+    results.add_argument('--sort-by', default='total_return')
+    results.add_argument('--top', type=int, default=20)
+    results.add_argument('--output', default=None)
+
+    commands.add_parser('retry', help='把失败的单元放回队列')
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        space = parse_params(args.param)
+        params = random_params(space, args.random, args.seed) if args.random else grid_params(space)
+        progress = submit_sweep(
+            args.queue, args.data_dir, PercentileStrategy, params,
+            datetime.strptime(args.start_date, '%Y-%m-%d'), datetime.strptime(args.end_date, '%Y-%m-%d'),
+            base_params=STRATEGY_PARAMS['PercentileStrategy'],
+            symbols=args.symbols,
+            patterns=args.pattern,
+            initial_cash=BACKTEST_PARAMS['initial_cash'],
+            mode=args.mode,
+        )
+        print(f"新增 {progress['added']} 个单元，队列共 {progress['total']} 个")
+    elif args.command == 'work':
+        kwargs = dict(data_dir=args.data_dir, batch=args.batch, lease_seconds=args.lease,
+                      max_attempts=args.max_attempts, wait=not args.no_wait, indicator_dir=args.indicator_store)
+        if args.processes > 1:
+            run_local(args.queue, args.processes, **kwargs)
+        else:
+            stats = run_worker(args.queue, **kwargs)
+            print(f"完成 {stats['done']} 个, 失败 {stats['failed']} 个, 已被其他进程完成 {stats['duplicate']} 个")
+    else:
+        queue = SweepQueue(args.queue)
+        if args.command == 'status':
+            progress = queue.progress()
+            print(', '.join(f'{status}: {count}' for status, count in progress.items()))
+        elif args.command == 'retry':
+            print(f'放回 {queue.retry_failed()} 个单元')
+        else:
+            table = queue.results()
+            if not table.empty:
+                table = rank_results(table.to_dict('records'), args.sort_by)
+            print(table.head(args.top).to_string())
+            if args.output:
+                table.to_csv(args.output)
+        queue.close()
@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DATA_DIR = os.path.join(ROOT, 'data')
+
+
+@pytest.fixture(scope='session')
+def baidu():
+    """
+    data/baidu-sw.xlsx 的日线数据（不读写磁盘缓存）
+    """
+    from data.file_loader import FileDataLoader
+    return FileDataLoader(DATA_DIR, use_cache=False).load_excel('baidu-sw.xlsx')
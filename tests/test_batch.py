@@ -0,0 +1,67 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from datetime import datetime
+from config.strategy_config import STRATEGY_PARAMS
+from engine.backtest_engine import BacktestEngine
+from engine.batch import BatchRunner, find_data_files, resolve_symbols
+from strategy.percentile_strategy import PercentileStrategy
+from conftest import DATA_DIR
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+PARAMS = STRATEGY_PARAMS['PercentileStrategy']
+
+
+@pytest.fixture
+def data_dir(tmp_path, baidu):
+    shutil.copy(os.path.join(DATA_DIR, 'baidu-sw.xlsx'), tmp_path / 'baidu-sw.xlsx')
+    baidu.iloc[::-1].to_csv(tmp_path / 'reversed.csv')
+    (tmp_path / 'garbage.csv').write_text('not,a\nprice,file\n')
+    (tmp_path / 'broken.xlsx').write_bytes(b'PK\x03\x04 truncated')
+    return tmp_path
+
+
+def test_find_and_resolve(data_dir):
+    assert find_data_files(str(data_dir)) == [
+        ('baidu-sw', 'baidu-sw.xlsx'), ('broken', 'broken.xlsx'),
+        ('garbage', 'garbage.csv'), ('reversed', 'reversed.csv'),
+    ]
+    assert resolve_symbols(str(data_dir), ['baidu-sw', 'missing']) == [('baidu-sw', 'baidu-sw.xlsx'), ('missing', None)]
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_bad_files_become_error_rows(data_dir, baidu, mode):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, PARAMS)
+    engine.set_data(baidu)
+    expected = engine.run(START, END)
+
+    done = []
+    output = data_dir / 'batch.csv'
+    runner = BatchRunner(PercentileStrategy, PARAMS, data_dir=str(data_dir), workers=2, mode=mode)
+    table = runner.run(START, END, symbols=['baidu-sw', 'broken', 'garbage', 'missing', 'reversed'],
+                       output=str(output), callback=done.append)
+
+    assert sorted(row['symbol'] for row in done) == list(table.index)
+    assert list(table.index) == ['baidu-sw', 'broken', 'garbage', 'missing', 'reversed']
+    errors = table['error']
+    assert errors[['broken', 'garbage', 'missing']].notna().all()
+    assert errors['missing'].startswith('FileNotFoundError')
+    # 其他标的照常完成
+    for symbol in ('baidu-sw', 'reversed'):
+        assert pd.isna(errors[symbol])
+        assert table.loc[symbol, 'bars'] == len(baidu)
+        assert table.loc[symbol, 'final_value'] == pytest.approx(expected['final_value'], rel=1e-9)
+        assert table.loc[symbol, 'trades'] == len(expected['trades'])
+
+    saved = pd.read_csv(output, index_col='symbol')
+    assert list(saved.index) == list(table.index)
+    assert saved['error'].notna().sum() == 3
+
+
+def test_run_all_files(data_dir):
+    runner = BatchRunner(PercentileStrategy, PARAMS, data_dir=str(data_dir), workers=1, mode='vectorized')
+    table = runner.run(START, END, patterns=['*.csv'])
+    assert list(table.index) == ['garbage', 'reversed']
+    assert table['error'].isna().tolist() == [False, True]
@@ -0,0 +1,31 @@
+import pytest
+from benchmarks.drift import drift
+from benchmarks.synthetic import make_ohlcv
+
+TOLERANCE = 1e-3
+
+
+@pytest.fixture(params=['baidu', 'synthetic'])
+def data(request, baidu):
+    return baidu if request.param == 'baidu' else make_ohlcv(5000, seed=0)
+
+
+@pytest.fixture
+def rows(data):
+    return {(row['mode'], row['price_dtype']): row for row in drift(data)}
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_int32_matches_float64(rows, mode):
+    row = rows[mode, 'int32']
+    assert row['trades'] > 0
+    assert row['same_trades']
+    assert row['final_value'] == row['reference_final_value']
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_float32_within_tolerance(rows, mode):
+    row = rows[mode, 'float32']
+    assert row['trades'] > 0
+    assert row['final_value_drift'] <= TOLERANCE
+    assert row['max_drawdown_drift'] <= TOLERANCE
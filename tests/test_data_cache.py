@@ -0,0 +1,93 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from data.cache import DataCache, warm_cache
+from data.file_loader import FileDataLoader
+from conftest import DATA_DIR
+
+
+@pytest.fixture
+def data_dir(tmp_path, baidu):
+    shutil.copy(os.path.join(DATA_DIR, 'baidu-sw.xlsx'), tmp_path / 'baidu-sw.xlsx')
+    baidu.iloc[:200].to_csv(tmp_path / 'short.csv')
+    return tmp_path
+
+
+def test_miss_then_hit(data_dir, baidu):
+    loader = FileDataLoader(str(data_dir))
+    first = loader.load_excel('baidu-sw.xlsx')
+    assert loader.cache.stats['misses'] == 1 and loader.cache.stats['hits'] == 0
+    second = FileDataLoader(str(data_dir)).load_excel('baidu-sw.xlsx')
+    pd.testing.assert_frame_equal(first, baidu)
+    pd.testing.assert_frame_equal(second, baidu)
+
+
+def test_cached_frame_keeps_layout(data_dir, baidu):
+    FileDataLoader(str(data_dir)).load_excel('baidu-sw.xlsx')
+    loader = FileDataLoader(str(data_dir))
+    cached = loader.load_excel('baidu-sw.xlsx')
+    assert loader.cache.stats['hits'] == 1
+    assert list(cached.columns) == list(baidu.columns)
+    assert cached.index.name == baidu.index.name
+    assert isinstance(cached.index, pd.DatetimeIndex)
+    assert loader.validate_data(cached)
+
+
+def test_cached_frame_is_writable(data_dir, baidu):
+    FileDataLoader(str(data_dir)).load_csv('short.csv')
+    cached = FileDataLoader(str(data_dir)).load_csv('short.csv')
+    cached.loc[cached.index[0], 'close'] = 1.0
+    assert cached['close'].iloc[0] == 1.0
+    # 修改不写回缓存
+    again = FileDataLoader(str(data_dir)).load_csv('short.csv')
+    assert again['close'].iloc[0] == baidu['close'].iloc[0]
+
+
+def test_touched_file_with_same_content_hits(data_dir):
+    FileDataLoader(str(data_dir)).load_csv('short.csv')
+    path = data_dir / 'short.csv'
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    loader = FileDataLoader(str(data_dir))
+    loader.load_csv('short.csv')
+    assert loader.cache.stats['hits'] == 1 and loader.cache.stats['misses'] == 0
+
+
+def test_changed_content_misses(data_dir, baidu):
+    FileDataLoader(str(data_dir)).load_csv('short.csv')
+    path = data_dir / 'short.csv'
+    stat = os.stat(path)
+    changed = baidu.iloc[:200].copy()
+    changed['close'] += 1
+    changed.to_csv(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    loader = FileDataLoader(str(data_dir))
+    df = loader.load_csv('short.csv')
+    assert loader.cache.stats['misses'] == 1
+    np.testing.assert_allclose(df['close'].to_numpy(), changed['close'].to_numpy())
+
+
+def test_read_params_are_part_of_key(data_dir):
+    loader = FileDataLoader(str(data_dir))
+    loader.load_csv('short.csv')
+    loader.load_csv('short.csv', parse_dates=False)
+    assert loader.cache.stats['misses'] == 2
+
+
+def test_warm_cache(data_dir, baidu):
+    stats = warm_cache(str(data_dir))
+    assert stats['misses'] == 2 and stats['bytes_written'] > 0
+    loader = FileDataLoader(str(data_dir))
+    pd.testing.assert_frame_equal(loader.load_excel('baidu-sw.xlsx'), baidu)
+    loader.load_csv('short.csv')
+    assert loader.cache.stats['hits'] == 2 and loader.cache.stats['misses'] == 0
+
+
+def test_clear(data_dir):
+    loader = FileDataLoader(str(data_dir))
+    loader.load_csv('short.csv')
+    loader.cache.clear()
+    assert not os.path.exists(loader.cache.cache_dir)
+    assert isinstance(loader.cache, DataCache)
@@ -0,0 +1,144 @@
+import os
+import json
+import asyncio
+import pandas as pd
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from data.downloader import MarketDataDownloader
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'kline_hk_daily.json')
+
+
+class KlineAPI:
+    """
+    本地的 K 线接口替身：返回录制的 JSON，可按标的设置先失败若干次或返回错误码
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.failures = {}
+        self.errors = set()
+        self.requests = []
+
+    async def kline(self, request):
+        loop = asyncio.get_running_loop()
+        symbol = request.query['symbol']
+        limit = int(request.query['limit'])
+        self.requests.append((loop.time(), symbol, limit))
+        if self.failures.get(symbol, 0) > 0:
+            self.failures[symbol] -= 1
+            return web.Response(status=503)
+        if symbol in self.errors:
+            return web.json_response({'code': 0, 'message': 'symbol not found', 'data': []})
+        return web.json_response({**self.payload, 'data': self.payload['data'][-limit:]})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/hk/kline', self.kline)
+        return app
+
+
+@pytest.fixture
+def payload():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def api(payload):
+    return KlineAPI(payload)
+
+
+@pytest.fixture
+def download(api, tmp_path):
+    """
+    启动本地测试服务器，用指向它的 MarketDataDownloader 下载
+    """
+    def run(symbols, incremental=True, **kwargs):
+        async def main():
+            server = TestServer(api.app())
+            await server.start_server()
+            try:
+                config = {'base_url': str(server.make_url('')).rstrip('/'), 'headers': {}}
+                kwargs.setdefault('backoff', 0.01)
+                downloader = MarketDataDownloader(str(tmp_path), api_config=config, **kwargs)
+                return await downloader.download(symbols, incremental)
+            finally:
+                await server.close()
+        return asyncio.run(main()).set_index('symbol')
+    return run
+
+
+def expected(payload):
+    df = pd.DataFrame(payload['data'])
+    df['day'] = pd.to_datetime(df['day'])
+    df = df.set_index('day')
+    return df.apply(pd.to_numeric)
+
+
+def stored(tmp_path, symbol):
+    return pd.read_csv(tmp_path / f'{symbol}.csv', index_col='day', parse_dates=True)
+
+
+def test_full_download(download, payload, tmp_path):
+    summary = download(['00700', '09888'])
+    assert summary['error'].isna().all()
+    assert (summary['rows'] == len(payload['data'])).all()
+    for symbol in ('00700', '09888'):
+        pd.testing.assert_frame_equal(stored(tmp_path, symbol), expected(payload), check_dtype=False,
+                                      check_index_type=False, check_freq=False)
+
+
+def test_retries_transient_errors(download, api, payload, tmp_path):
+    api.failures['00700'] = 2
+    summary = download(['00700'], retries=3)
+    assert pd.isna(summary.loc['00700', 'error'])
+    assert summary.loc['00700', 'rows'] == len(payload['data'])
+    assert len(api.requests) == 3
+
+
+def test_gives_up_after_retries_without_affecting_others(download, api, tmp_path):
+    api.failures['00700'] = 5
+    api.errors.add('99999')
+    summary = download(['00700', '99999', '09888'], retries=1)
+    assert '503' in summary.loc['00700', 'error']
+    assert 'DownloadError' in summary.loc['99999', 'error']
+    assert pd.isna(summary.loc['09888', 'error'])
+    assert not (tmp_path / '00700.csv').exists()
+    assert (tmp_path / '09888.csv').exists()
+    assert sum(1 for _, symbol, _ in api.requests if symbol == '00700') == 2
+
+
+def test_rate_limit_spaces_requests(download, api):
+    rate = 20
+    download([f'{i:05d}' for i in range(6)], rate_limit=rate, concurrency=6)
+    times = sorted(t for t, _, _ in api.requests)
+    assert len(times) == 6
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert min(gaps) >= 1 / rate * 0.8
+
+
+def test_incremental_append(download, api, payload, tmp_path):
+    full = expected(payload)
+    full.iloc[:20].to_csv(tmp_path / '00700.csv', index_label='day')
+
+    summary = download(['00700'], limit=3650)
+    assert summary.loc['00700', 'rows'] == len(full) - 20
+    assert summary.loc['00700', 'last_date'] == full.index[-1]
+    # 增量请求的数量少于全量
+    assert api.requests[0][2] < 3650
+    pd.testing.assert_frame_equal(stored(tmp_path, '00700'), full, check_dtype=False,
+                                  check_index_type=False, check_freq=False)
+
+    # 没有新数据时不追加
+    summary = download(['00700'])
+    assert summary.loc['00700', 'rows'] == 0
+    assert len(stored(tmp_path, '00700')) == len(full)
+
+
+def test_non_incremental_overwrites(download, payload, tmp_path):
+    expected(payload).iloc[:5].to_csv(tmp_path / '00700.csv', index_label='day')
+    summary = download(['00700'], incremental=False)
+    assert summary.loc['00700', 'rows'] == len(payload['data'])
+    assert len(stored(tmp_path, '00700')) == len(payload['data'])
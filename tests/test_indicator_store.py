@@ -0,0 +1,97 @@
+import backtrader as bt
+import numpy as np
+import pytest
+from config.strategy_config import STRATEGY_PARAMS
+from data.dates import date2num_array
+from engine.backtest_engine import BacktestEngine
+from engine.result_cache import data_fingerprint
+from indicator.percentile_indicator import percentile_rank
+from indicator.store import IndicatorStore, StoredLine, indicator_key
+from strategy.percentile_strategy import PercentileStrategy
+from benchmarks.synthetic import make_ohlcv
+
+LOOKBACKS = [30, 120, 365, 730]
+
+
+def run(mode, data, lookback_days, store=None):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, dict(STRATEGY_PARAMS['PercentileStrategy'], lookback_days=lookback_days))
+    engine.set_data(data)
+    engine.set_indicator_store(store)
+    return engine.run(data.index[0], data.index[-1])
+
+
+def direct(data, lookback_days):
+    return percentile_rank(date2num_array(data.index), data['close'].to_numpy(dtype=np.float64), lookback_days)
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+@pytest.mark.parametrize('lookback_days', LOOKBACKS)
+def test_store_does_not_change_results(tmp_path, baidu, mode, lookback_days):
+    store = IndicatorStore(str(tmp_path))
+    plain = run(mode, baidu, lookback_days)
+    stored = run(mode, baidu, lookback_days, store)
+    # 第二次直接读取已保存的线
+    reused = run(mode, baidu, lookback_days, store)
+    assert store.stats['hits'] >= 1
+    for result in (stored, reused):
+        for name in ('final_value', 'total_return', 'max_drawdown', 'sharpe'):
+            assert result[name] == plain[name], name
+        assert result['trades'] == plain['trades']
+
+
+def test_batch_matches_single_lookbacks(tmp_path, baidu):
+    store = IndicatorStore(str(tmp_path))
+    lines = store.percentile(baidu, LOOKBACKS)
+    assert store.stats['misses'] == len(LOOKBACKS)
+    for lookback_days in LOOKBACKS:
+        np.testing.assert_allclose(lines[lookback_days], direct(baidu, lookback_days),
+                                   rtol=0, atol=1e-12, equal_nan=True)
+
+    again = IndicatorStore(str(tmp_path)).percentile(baidu, LOOKBACKS[::-1])
+    for lookback_days in LOOKBACKS:
+        np.testing.assert_array_equal(again[lookback_days], lines[lookback_days])
+
+
+def test_length_mismatch_is_recomputed(tmp_path, baidu):
+    store = IndicatorStore(str(tmp_path))
+    data_hash = data_fingerprint(baidu)
+    key = indicator_key(data_hash, 'percentile', {'lookback_days': 365})
+    store.put(key, np.zeros(10))
+    bytes_written = store.stats['bytes_written']
+
+    values = store.percentile(baidu, [365], data_hash=data_hash)[365]
+    assert len(values) == len(baidu)
+    assert store.stats['bytes_written'] > bytes_written
+    np.testing.assert_allclose(values, direct(baidu, 365), rtol=0, atol=1e-12, equal_nan=True)
+    assert len(store.get(key)) == len(baidu)
+
+
+class Record(bt.Strategy):
+    params = (('values', None),)
+
+    def __init__(self):
+        self.line = StoredLine(values=self.p.values)
+        self.values = []
+
+    def next(self):
+        self.values.append(self.line[0])
+
+
+@pytest.mark.parametrize('runonce', [True, False])
+def test_stored_line_matches_values(tmp_path, runonce):
+    data = make_ohlcv(400, seed=5)
+    values = IndicatorStore(str(tmp_path)).percentile(data, [60])[60]
+    cerebro = bt.Cerebro(stdstats=False, runonce=runonce, preload=True)
+    cerebro.adddata(bt.feeds.PandasData(dataname=data))
+    cerebro.addstrategy(Record, values=values)
+    strategy = cerebro.run()[0]
+    np.testing.assert_array_equal(np.array(strategy.values), np.asarray(values))
+
+
+def test_stored_line_requires_values():
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=make_ohlcv(20)))
+    cerebro.addstrategy(Record)
+    with pytest.raises(ValueError):
+        cerebro.run()
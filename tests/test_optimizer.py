@@ -0,0 +1,31 @@
+import pytest
+from datetime import datetime
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+from config.strategy_config import STRATEGY_PARAMS
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+GRID = {'lookback_days': [180, 365], 'percentile_threshold': [0.3, 10]}
+
+
+@pytest.mark.parametrize('mode', ['vectorized', 'cerebro'])
+@pytest.mark.parametrize('commission, slippage', [(0.01, 0.0), (0.0, 0.005)])
+def test_optimize_uses_engine_costs(baidu, mode, commission, slippage):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(baidu)
+    engine.set_initial_cash(20000)
+    engine.set_commission(commission)
+    engine.set_slippage(slippage)
+    table = engine.optimize(START, END, param_grid=GRID, workers=1)
+    assert len(table) == 4
+
+    for _, row in table.iterrows():
+        params = {name: row[name] for name in GRID}
+        single = BacktestEngine(mode=mode)
+        single.set_strategy(PercentileStrategy, {**STRATEGY_PARAMS['PercentileStrategy'], **params})
+        single.set_data(baidu)
+        single.set_initial_cash(20000)
+        single.set_commission(commission)
+        single.set_slippage(slippage)
+        assert row['final_value'] == pytest.approx(single.run(START, END)['final_value'], rel=1e-9)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from engine.backtest_engine import BacktestEngine
+from engine.incremental import IncrementalPercentileState
+from engine.portfolio import PortfolioEngine
+from engine.vectorized import run_percentile_vectorized
+from strategy.percentile_strategy import PercentileStrategy
+from benchmarks.synthetic import make_ohlcv
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+CASH, COMMISSION, SLIPPAGE = 30000, 0.001, 0.001
+
+PARAM_SETS = [
+    {'lookback_days': 365, 'percentile_threshold': 10},
+    {'lookback_days': 90, 'percentile_threshold': 0.2, 'cooling_days': 0},
+    {'lookback_days': 180, 'percentile_threshold': 0.3, 'profit_threshold': 0.05, 'max_loss_threshold': 0.05,
+     'cooling_days': 5},
+]
+
+
+def same_trades(a, b):
+    assert len(a) == len(b) and len(a) > 0
+    for x, y in zip(a, b):
+        assert (x['datetime'], x['side'], x['size']) == (y['datetime'], y['side'], y['size'])
+        assert x['price'] == pytest.approx(y['price'], rel=1e-12)
+        assert x['comm'] == pytest.approx(y['comm'], rel=1e-12)
+
+
+@pytest.fixture(params=['baidu', 'synthetic'])
+def data(request, baidu):
+    return baidu if request.param == 'baidu' else make_ohlcv(1500, seed=3)
+
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_incremental_matches_vectorized(data, params):
+    vectorized = run_percentile_vectorized(data, params, CASH, COMMISSION, SLIPPAGE)
+    state = IncrementalPercentileState(params, CASH, COMMISSION, SLIPPAGE)
+    state.append(data)
+    same_trades(state.trades, vectorized['trades'])
+    assert state.value == pytest.approx(vectorized['final_value'], rel=1e-12)
+
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_saved_state_resumes(data, params, tmp_path):
+    split = len(data) // 2
+    full = IncrementalPercentileState(params, CASH, COMMISSION, SLIPPAGE)
+    full.append(data)
+
+    state = IncrementalPercentileState(params, CASH, COMMISSION, SLIPPAGE)
+    state.append(data.iloc[:split])
+    state.save(tmp_path / 'state.json')
+    resumed = IncrementalPercentileState.load(tmp_path / 'state.json')
+    resumed.append(data.iloc[split:])
+    same_trades(resumed.trades, full.trades)
+    assert resumed.summary() == full.summary()
+
+
+def test_state_version_is_checked(tmp_path):
+    state = IncrementalPercentileState({'trade_start': datetime(2020, 1, 1)})
+    payload = state.to_dict()
+    assert IncrementalPercentileState.from_dict(payload).params['trade_start'] == datetime(2020, 1, 1)
+    with pytest.raises(ValueError):
+        IncrementalPercentileState.from_dict(dict(payload, version=payload['version'] + 1))
+    (tmp_path / 'bad').write_bytes(b'\x80\x04not json')
+    with pytest.raises(ValueError):
+        IncrementalPercentileState.load(tmp_path / 'bad')
+
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_single_symbol_portfolio_matches_vectorized(baidu, params):
+    engine = BacktestEngine(mode='vectorized')
+    engine.set_strategy(PercentileStrategy, params)
+    engine.set_data(baidu)
+    engine.set_initial_cash(CASH)
+    engine.set_commission(COMMISSION)
+    engine.set_slippage(SLIPPAGE)
+    vectorized = engine.run(START, END)
+
+    portfolio = PortfolioEngine(params, initial_cash=CASH, commission=COMMISSION, slippage=SLIPPAGE,
+                                max_positions=1, position_size=1.0)
+    portfolio.set_data({'baidu-sw': baidu})
+    result = portfolio.run(START, END)
+    same_trades(result['trades'], vectorized['trades'])
+    assert result['final_value'] == pytest.approx(vectorized['final_value'], rel=1e-9)
+    np.testing.assert_allclose(result['equity'].to_numpy(), vectorized['equity'].to_numpy(), rtol=1e-9)
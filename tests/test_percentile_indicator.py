@@ -0,0 +1,88 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import timedelta
+from indicator.percentile_indicator import PercentileIndicator, percentile_rank
+from data.dates import date2num_array
+from benchmarks.synthetic import make_ohlcv
+
+
+class BaselinePercentileIndicator(bt.Indicator):
+    """
+    改写前的逐 bar O(n * w) 实现，作为对照
+    """
+    lines = ('percentile',)
+
+    def __init__(self, lookback_days):
+        self.trade_days = 0
+        self.lookback_days = lookback_days
+
+    def next(self):
+        current_value = self.data.close[0]
+        current_date = self.data.datetime.datetime(0)
+        start_date = current_date - timedelta(days=self.lookback_days)
+
+        while self.data.datetime.datetime(-self.trade_days+1) > start_date and self.trade_days < len(self.data.close):
+            self.trade_days += 1
+        while self.data.datetime.datetime(-self.trade_days+1) < start_date and self.trade_days > 1:
+            self.trade_days -= 1
+
+        if self.data.datetime.datetime(-len(self.data.close)+1) > start_date:
+            self.lines.percentile[0] = float('nan')
+            return
+
+        historical_data = [self.data.close[i] for i in range(-self.trade_days+1, 0)]
+        data_array = np.array(historical_data)
+        percentile = (np.sum(data_array <= current_value) / len(data_array))
+        self.lines.percentile[0] = percentile
+
+
+class Record(bt.Strategy):
+    params = (('lookback_days', 365),)
+
+    def __init__(self):
+        self.fast = PercentileIndicator(lookback_days=self.p.lookback_days)
+        self.slow = BaselinePercentileIndicator(lookback_days=self.p.lookback_days)
+        self.values = []
+
+    def next(self):
+        self.values.append((self.fast[0], self.slow[0]))
+
+
+def run_both(data: pd.DataFrame, lookback_days: float, runonce: bool) -> np.ndarray:
+    cerebro = bt.Cerebro(stdstats=False, runonce=runonce, preload=True)
+    cerebro.adddata(bt.feeds.PandasData(dataname=data))
+    cerebro.addstrategy(Record, lookback_days=lookback_days)
+    strategy = cerebro.run()[0]
+    return np.array(strategy.values, dtype=np.float64)
+
+
+def synthetic(n: int, seed: int) -> pd.DataFrame:
+    data = make_ohlcv(n, seed=seed)
+    # 去掉部分交易日制造不规则间隔，并把价格取整制造重复值
+    keep = np.random.default_rng(seed).random(n) > 0.2
+    data = data[keep].copy()
+    data['close'] = np.round(data['close'])
+    return data
+
+
+@pytest.mark.parametrize('runonce', [True, False])
+@pytest.mark.parametrize('lookback_days', [30, 365])
+def test_matches_baseline_on_baidu(baidu, lookback_days, runonce):
+    values = run_both(baidu, lookback_days, runonce)
+    np.testing.assert_allclose(values[:, 0], values[:, 1], rtol=0, atol=1e-12, equal_nan=True)
+    assert np.isfinite(values[:, 0]).any()
+
+
+@pytest.mark.parametrize('runonce', [True, False])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_matches_baseline_on_synthetic(seed, runonce):
+    values = run_both(synthetic(600, seed), 45, runonce)
+    np.testing.assert_allclose(values[:, 0], values[:, 1], rtol=0, atol=1e-12, equal_nan=True)
+
+
+def test_percentile_rank_matches_indicator(baidu):
+    values = run_both(baidu, 365, runonce=True)
+    direct = percentile_rank(date2num_array(baidu.index), baidu['close'].to_numpy(dtype=np.float64), 365)
+    np.testing.assert_allclose(direct, values[:, 0], rtol=0, atol=1e-12, equal_nan=True)
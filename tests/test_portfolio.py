@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from config.strategy_config import STRATEGY_PARAMS
+from engine.backtest_engine import BacktestEngine
+from engine.portfolio import PortfolioEngine
+from strategy.percentile_strategy import PercentileStrategy
+from benchmarks.synthetic import make_ohlcv
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+PARAMS = STRATEGY_PARAMS['PercentileStrategy']
+
+
+def cash_path(trades, initial_cash):
+    """
+    按成交顺序重放现金变化
+    """
+    cash = [float(initial_cash)]
+    for trade in trades:
+        cash.append(cash[-1] - trade['size'] * trade['price'] - trade['comm'])
+    return np.array(cash)
+
+
+def test_single_symbol_matches_backtest_engine(baidu):
+    engine = BacktestEngine(mode='vectorized')
+    engine.set_strategy(PercentileStrategy, PARAMS)
+    engine.set_data(baidu)
+    expected = engine.run(START, END)
+
+    portfolio = PortfolioEngine(PARAMS, max_positions=1, position_size=1.0)
+    portfolio.set_data({'baidu-sw': baidu})
+    result = portfolio.run(START, END)
+
+    assert round(result['final_value'], 2) == round(expected['final_value'], 2) == 76389.38
+    assert len(result['trades']) == len(expected['trades']) == 34
+    for ours, theirs in zip(result['trades'], expected['trades']):
+        assert ours.pop('symbol') == 'baidu-sw'
+        assert ours == theirs
+    assert result['max_drawdown'] == pytest.approx(expected['max_drawdown'], rel=1e-12)
+    np.testing.assert_allclose(result['equity'].to_numpy(), expected['equity'].to_numpy(), rtol=1e-12)
+
+
+@pytest.mark.parametrize('sizing, max_positions, position_size, first_entries', [
+    # 每个持仓占一半资金，6 个信号只有 2 个能成交
+    ('equal', 6, 0.5, 2),
+    ('equal', 6, None, 6),
+    # 名额只有 3 个
+    ('cash', 3, None, 3),
+])
+def test_shared_cash_on_simultaneous_signals(sizing, max_positions, position_size, first_entries):
+    # 相同的行情让全部标的在同一根 bar 上发出买入信号
+    base = make_ohlcv(1200, seed=11)
+    data = {f's{k}': base.copy() for k in range(6)}
+    params = dict(PARAMS, lookback_days=90, percentile_threshold=0.2, cooling_days=0)
+    start, end = base.index[200], base.index[-1]
+    portfolio = PortfolioEngine(params, initial_cash=30000, max_positions=max_positions, sizing=sizing,
+                                position_size=position_size)
+    portfolio.set_data(data)
+    result = portfolio.run(start, end)
+
+    trades = result['trades']
+    buys = [trade for trade in trades if trade['side'] == 'buy']
+    assert buys
+    first_bar = buys[0]['datetime']
+    entered = {trade['symbol'] for trade in buys if trade['datetime'] == first_bar}
+    assert len(entered) == first_entries
+
+    cash = cash_path(trades, 30000)
+    assert cash.min() >= -1e-6
+    # 任一时刻持仓数不超过上限
+    held = set()
+    for trade in trades:
+        (held.add if trade['side'] == 'buy' else held.discard)(trade['symbol'])
+        assert len(held) <= max_positions
+
+    last = base['close'].iloc[-1]
+    final = cash[-1] + sum(shares * last for shares in result['positions'].values())
+    assert result['final_value'] == pytest.approx(final, rel=1e-12)
@@ -0,0 +1,85 @@
+import json
+import pytest
+from datetime import datetime
+from config.strategy_config import STRATEGY_PARAMS
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+CEREBRO_PHASES = {'set_data', 'preload', 'strategy_init', 'strategy_start', 'loop', 'strategy_stop', 'results', 'run'}
+
+
+def make_engine(mode, data):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(data)
+    return engine
+
+
+def callback_calls(report):
+    return {(c['kind'], c['name']): c['calls'] for c in report['callbacks']}
+
+
+def test_cerebro_profile(baidu, tmp_path):
+    path = str(tmp_path / 'profile.json')
+    results = make_engine('cerebro', baidu).run(START, END, profile=True, profile_path=path, sample_interval=0.001)
+    report = results['profile']
+
+    assert report['mode'] == 'cerebro' and report['bars'] == len(baidu)
+    assert set(report['phases']) == CEREBRO_PHASES
+    for phase in report['phases'].values():
+        assert phase['calls'] == 1 and phase['wall'] >= 0 and phase['cpu'] >= 0
+    assert report['phases']['run']['wall'] >= report['phases']['loop']['wall']
+
+    calls = callback_calls(report)
+    assert calls[('strategy', 'PercentileStrategy.next')] == len(baidu)
+    assert calls[('strategy', 'PercentileStrategy.notify_trade')] == len(results['trades'])
+    assert calls[('analyzer', 'EquityRecorder.next')] == len(baidu)
+    assert ('indicator', 'PercentileIndicator.once') in calls
+    assert [c['wall'] for c in report['callbacks']] == sorted((c['wall'] for c in report['callbacks']), reverse=True)
+
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved['phases'].keys() == report['phases'].keys()
+    assert len(saved['callbacks']) == len(report['callbacks'])
+    assert saved['samples'] == report['samples']
+    with open(f'{path}.folded', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == report['samples']
+    assert not (tmp_path / 'profile.json.prof').exists()
+
+
+def test_profile_hooks_are_removed(baidu):
+    engine = make_engine('cerebro', baidu)
+    original = vars(PercentileStrategy).copy()
+    profiled = engine.run(START, END, profile=True, cprofile=True)
+    assert vars(PercentileStrategy) == original
+    assert profiled['profile']['cprofile']
+
+    plain = engine.run(START, END)
+    assert 'profile' not in plain
+    for name in ('final_value', 'total_return', 'max_drawdown', 'sharpe'):
+        assert plain[name] == profiled[name], name
+    assert plain['trades'] == profiled['trades']
+
+
+def test_vectorized_profile(baidu, tmp_path):
+    engine = make_engine('vectorized', baidu)
+    plain = engine.run(START, END)
+    assert 'profile' not in plain
+
+    path = str(tmp_path / 'profile.json')
+    results = engine.run(START, END, profile=True, profile_path=path, cprofile=True)
+    report = results['profile']
+    assert set(report['phases']) == {'set_data', 'vectorized', 'results', 'run'}
+    assert report['callbacks'] == []
+    assert results['final_value'] == plain['final_value']
+    assert (tmp_path / 'profile.json.prof').exists()
+    assert not (tmp_path / 'profile.json.folded').exists()
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_profile_off_adds_no_keys(baidu, mode):
+    results = make_engine(mode, baidu).run(START, END)
+    assert 'profile' not in results
+    assert not {'phases', 'callbacks', 'samples', 'stacks', 'cprofile'} & set(results)
@@ -0,0 +1,85 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from datetime import datetime
+from engine.portfolio import PortfolioEngine
+from engine.report import BacktestReport, DOWNSAMPLE_METHODS, downsample, minmax, thin_markers
+from benchmarks.synthetic import make_ohlcv
+from conftest import DATA_DIR
+
+START, END = datetime(2001, 1, 1), datetime(2007, 12, 31)
+PARAMS = {'lookback_days': 60, 'percentile_threshold': 0.4, 'profit_threshold': 0.01, 'max_loss_threshold': 0.01,
+          'cooling_days': 0}
+
+
+@pytest.fixture(scope='module')
+def portfolio():
+    data = {f's{i}': make_ohlcv(2000, seed=i) for i in range(4)}
+    engine = PortfolioEngine(PARAMS, max_positions=4, position_size=0.25)
+    engine.set_data(data)
+    return data, engine.run(START, END)
+
+
+def test_thin_markers():
+    x = np.sort(np.random.default_rng(0).integers(0, 10 ** 12, 5000))
+    y = np.arange(5000, dtype=np.float64)
+    tx, ty = thin_markers(x[::-1], y[::-1], 100)
+    assert 0 < len(tx) <= 100
+    assert np.all(np.diff(tx) >= 0)
+    assert set(ty) <= set(y) and tx[0] == x[0]
+    sx, _ = thin_markers(x[:50], y[:50], 100)
+    np.testing.assert_array_equal(sx, x[:50])
+
+
+@pytest.mark.parametrize('n_out', [4, 5, 10, 101, 1000])
+def test_minmax_respects_max_points(n_out):
+    y = np.random.default_rng(1).normal(size=10007).cumsum()
+    y[::97] = np.nan
+    keep = minmax(y, n_out)
+    assert len(keep) <= n_out
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert np.nanargmax(y) in keep and np.nanargmin(y) in keep
+
+
+@pytest.mark.parametrize('method', DOWNSAMPLE_METHODS)
+def test_downsample_respects_max_points(method):
+    x = np.arange(5000, dtype=np.float64)
+    y = np.sin(x / 50)
+    dx, dy = downsample(x, y, 300, method)
+    assert len(dx) == len(dy) <= 300
+
+
+def test_markers_filtered_by_symbol(portfolio):
+    data, result = portfolio
+    symbols = {trade['symbol'] for trade in result['trades']}
+    assert len(symbols) > 1
+    for symbol in symbols:
+        series = BacktestReport(result, data[symbol], symbol=symbol, max_markers=10 ** 6).series()
+        own = [t for t in result['trades'] if t['symbol'] == symbol]
+        assert len(series['buys'][0]) + len(series['sells'][0]) == len(own)
+    # 未指定标的时不把各标的的成交画在同一价格轴上
+    series = BacktestReport(result, data['s0']).series()
+    assert len(series['buys'][0]) == len(series['sells'][0]) == 0
+
+
+def test_markers_are_capped(portfolio, tmp_path):
+    data, result = portfolio
+    own = sum(1 for t in result['trades'] if t['symbol'] == 's0')
+    assert own > 40
+    small = BacktestReport(result, data['s0'], symbol='s0', max_markers=10)
+    assert all(len(small.series()[side][0]) <= 10 for side in ('buys', 'sells'))
+    html = small.to_html(str(tmp_path / 's0.html'))
+    assert open(html, encoding='utf-8').read().count('<path d=') <= 20
+
+
+def test_run_reports_skips_failed_symbol(tmp_path, capsys):
+    from report import run_reports
+
+    shutil.copy(os.path.join(DATA_DIR, 'baidu-sw.xlsx'), tmp_path / 'baidu-sw.xlsx')
+    (tmp_path / 'broken.csv').write_text('not,a,kline\n1,2,3\n')
+    table = run_reports(str(tmp_path), '2022-03-22', '2025-06-07', output_dir=str(tmp_path / 'reports'))
+    assert list(table['symbol']) == ['baidu-sw']
+    assert 'broken 失败' in capsys.readouterr().out
+    assert os.path.exists(tmp_path / 'reports' / 'index.html')
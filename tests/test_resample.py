@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import make_ohlcv, MINUTES_PER_DAY
+from config.strategy_config import STRATEGY_PARAMS
+from data.file_loader import FileDataLoader
+from data.resample import AGGREGATIONS, MultiTimeframe, align_positions, resample_ohlcv
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+
+
+@pytest.fixture(scope='module')
+def minutes():
+    return make_ohlcv(MINUTES_PER_DAY * 60, freq='minute', seed=3)
+
+
+def pandas_resample(data, rule):
+    how = {name: AGGREGATIONS.get(name, 'last') for name in data.columns}
+    # resample_ohlcv 的桶从 1970-01-01 起划分
+    return data.resample(pd.Timedelta(rule), origin='epoch').agg(how).dropna()
+
+
+@pytest.mark.parametrize('rule', ['5min', '1h', '1D'])
+def test_resample_matches_pandas(minutes, rule):
+    # 去掉部分 bar，制造不完整和空的周期；high / low 中的 NaN 与 pandas 一样被跳过
+    data = minutes.drop(minutes.index[1003:1500])
+    position = np.arange(len(data))
+    data = data.assign(high=data['high'].where(position % 5 != 1), low=data['low'].where(position % 7 != 3))
+    pd.testing.assert_frame_equal(resample_ohlcv(data, rule), pandas_resample(data, rule), check_freq=False)
+
+
+def test_resample_daily_input(baidu):
+    pd.testing.assert_frame_equal(resample_ohlcv(baidu, '7D'), pandas_resample(baidu, '7D'), check_freq=False)
+
+
+def test_resample_rejects_unsorted(minutes):
+    with pytest.raises(ValueError):
+        resample_ohlcv(minutes.iloc[::-1], '1D')
+    with pytest.raises(ValueError):
+        resample_ohlcv(minutes, '1M')
+
+
+def test_align_positions_does_not_look_ahead(minutes):
+    index = minutes.index
+    positions = align_positions(index, '1D')
+    day = np.repeat(np.arange(60), MINUTES_PER_DAY)
+    last = np.tile(np.arange(MINUTES_PER_DAY) == MINUTES_PER_DAY - 1, 60)
+    # 当天最后一根分钟 bar 才能使用当天的日线，之前的只能看到前一天
+    np.testing.assert_array_equal(positions, np.where(last, day, day - 1))
+    assert (positions[:MINUTES_PER_DAY - 1] == -1).all()
+
+    data = MultiTimeframe(minutes, ('1D',))
+    closes = data.align('1D', data.frame('1D')['close'].to_numpy())
+    assert np.isnan(closes[:MINUTES_PER_DAY - 1]).all()
+    assert closes[MINUTES_PER_DAY] == minutes['close'].iloc[MINUTES_PER_DAY - 1]
+    assert closes[2 * MINUTES_PER_DAY - 2] == minutes['close'].iloc[MINUTES_PER_DAY - 1]
+    assert closes[2 * MINUTES_PER_DAY - 1] == minutes['close'].iloc[2 * MINUTES_PER_DAY - 1]
+
+
+def test_set_timeframes_parity(minutes):
+    params = dict(STRATEGY_PARAMS['PercentileStrategy'], lookback_days=10, percentile_threshold=0.3,
+                  profit_threshold=0.02, max_loss_threshold=0.02, cooling_days=0)
+    data = MultiTimeframe(minutes, ('1D',))
+    results = {}
+    for mode in ('cerebro', 'vectorized'):
+        engine = BacktestEngine(mode=mode)
+        engine.set_strategy(PercentileStrategy, params)
+        engine.set_timeframes(data)
+        results[mode] = engine.run(minutes.index[0], minutes.index[-1])
+    cerebro, vectorized = results['cerebro'], results['vectorized']
+    assert len(vectorized['trades']) > 10
+    assert vectorized['trades'] == cerebro['trades']
+    for name in ('final_value', 'total_return', 'max_drawdown'):
+        assert vectorized[name] == pytest.approx(cerebro[name], rel=1e-9), name
+
+
+def test_load_resampled_cache(tmp_path, minutes):
+    path = tmp_path / 'minute.csv'
+    minutes.to_csv(path)
+    first = FileDataLoader(str(tmp_path)).load_resampled('minute.csv', '1h')
+    loader = FileDataLoader(str(tmp_path))
+    pd.testing.assert_frame_equal(loader.load_resampled('minute.csv', '1h'), first)
+    assert loader.cache.stats['hits'] == 1 and loader.cache.stats['misses'] == 0
+    # 每个周期单独缓存
+    loader.load_resampled('minute.csv', '1D')
+    assert loader.cache.stats['misses'] == 1
+
+    changed = minutes.assign(close=minutes['close'] * 2)
+    changed.to_csv(path)
+    loader = FileDataLoader(str(tmp_path))
+    resampled = loader.load_resampled('minute.csv', '1h')
+    # 源文件和聚合结果都重新读取
+    assert loader.cache.stats['misses'] == 2 and loader.cache.stats['hits'] == 0
+    pd.testing.assert_frame_equal(resampled, resample_ohlcv(loader.load_csv('minute.csv'), '1h'))
+    np.testing.assert_allclose(resampled['close'].to_numpy(), first['close'].to_numpy() * 2)
@@ -0,0 +1,48 @@
+import os
+from datetime import datetime
+from engine import result_cache
+from engine.result_cache import PROJECT_ROOT, ResultCache, result_key, source_fingerprint, _source_files
+from strategy.percentile_strategy import PercentileStrategy
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+
+
+def test_source_files_cover_result_pipeline():
+    files = {os.path.relpath(path, PROJECT_ROOT) for path in _source_files(PercentileStrategy)}
+    for name in ('engine/analytics.py', 'engine/backtest_engine.py', 'engine/cerebro.py', 'engine/vectorized.py',
+                 'data/resample.py', 'data/compact.py', 'strategy/percentile_rules.py',
+                 'strategy/percentile_strategy.py', 'indicator/percentile_indicator.py'):
+        assert os.path.normpath(name) in files
+
+
+def test_shared_source_change_invalidates(tmp_path, monkeypatch):
+    root = tmp_path / 'project'
+    (root / 'engine').mkdir(parents=True)
+    analytics = root / 'engine' / 'analytics.py'
+    analytics.write_text('A = 1\n')
+    monkeypatch.setattr(result_cache, 'PROJECT_ROOT', str(root))
+    monkeypatch.setattr(result_cache, 'SHARED_SOURCES', (os.path.join('engine', 'analytics.py'),))
+    before = source_fingerprint(PercentileStrategy)
+    analytics.write_text('A = 2\n')
+    assert source_fingerprint(PercentileStrategy) != before
+
+
+def test_cache_version_is_part_of_key(monkeypatch):
+    args = ('data', PercentileStrategy, {'lookback_days': 365}, 'vectorized', 30000, 0.001, 0.001, START, END)
+    key = result_key(*args)
+    monkeypatch.setattr(result_cache, 'CACHE_VERSION', result_cache.CACHE_VERSION + 1)
+    assert result_key(*args) != key
+
+
+def test_round_trip(tmp_path, baidu):
+    from engine.backtest_engine import BacktestEngine
+
+    cache = ResultCache(str(tmp_path / 'results.sqlite'))
+    engine = BacktestEngine(mode='vectorized')
+    engine.set_strategy(PercentileStrategy, {'lookback_days': 180})
+    engine.set_data(baidu)
+    engine.set_result_cache(cache)
+    first = engine.run(START, END)
+    second = engine.run(START, END)
+    assert cache.stats['hits'] == 1
+    assert second['final_value'] == first['final_value']
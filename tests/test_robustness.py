@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from config.strategy_config import STRATEGY_PARAMS
+from engine.backtest_engine import BacktestEngine
+from engine.robustness import METHODS, MonteCarlo, path_metrics
+from strategy.percentile_strategy import PercentileStrategy
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+
+
+@pytest.fixture(scope='module')
+def result(baidu):
+    engine = BacktestEngine(mode='vectorized')
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(baidu)
+    return engine.run(START, END)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_interval_ordering(result, method):
+    analysis = MonteCarlo.from_result(result, workers=1, chunk=1000)
+    report = analysis.run(method, n=2000, seed=7)
+    summary = report['summary']
+    assert (summary['lower'] <= summary['median']).all()
+    assert (summary['median'] <= summary['upper']).all()
+    assert len(report['samples']) == 2000
+    assert 0 <= report['prob_loss'] <= 1 and 0 <= report['risk_of_ruin'] <= 1
+    assert ((summary['observed_percentile'] >= 0) & (summary['observed_percentile'] <= 1)).all()
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_no_ruin_when_every_return_is_positive(method):
+    rng = np.random.default_rng(1)
+    analysis = MonteCarlo(rng.uniform(0.001, 0.02, 250), rng.uniform(0.01, 0.1, 30), periods=250, workers=1)
+    report = analysis.run(method, n=1000, seed=3)
+    assert report['risk_of_ruin'] == 0.0
+    assert report['prob_loss'] == 0.0
+    assert (report['samples']['max_drawdown'] == 0).all()
+    assert (report['samples']['min_value'] == 1.0).all()
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_results_do_not_depend_on_workers(result, method):
+    serial = MonteCarlo.from_result(result, workers=1, chunk=500).samples(method, n=2000, seed=11)
+    parallel = MonteCarlo.from_result(result, workers=2, chunk=500).samples(method, n=2000, seed=11)
+    pd.testing.assert_frame_equal(serial, parallel)
+    again = MonteCarlo.from_result(result, workers=1, chunk=500, batch_bytes=1 << 12).samples(method, n=2000, seed=11)
+    pd.testing.assert_frame_equal(serial, again)
+    other = MonteCarlo.from_result(result, workers=1, chunk=500).samples(method, n=2000, seed=12)
+    assert not serial.equals(other)
+
+
+def test_path_metrics():
+    total, drawdown, low = path_metrics(np.array([[0.1, -0.5, 0.2], [-0.2, 0.0, 0.0]]))
+    np.testing.assert_allclose(total, [1.1 * 0.5 * 1.2 - 1, -0.2])
+    np.testing.assert_allclose(drawdown, [0.5, 0.2])
+    np.testing.assert_allclose(low, [0.55, 0.8])
+
+
+def test_invalid_arguments(result):
+    with pytest.raises(ValueError):
+        MonteCarlo(np.array([0.01, np.nan]))
+    with pytest.raises(ValueError):
+        MonteCarlo(np.array([0.01]), ruin_level=1.0)
+    analysis = MonteCarlo(np.array([0.01, 0.02]), workers=1)
+    with pytest.raises(ValueError):
+        analysis.run('trade_shuffle', n=10)
+    with pytest.raises(ValueError):
+        analysis.run('unknown', n=10)
@@ -0,0 +1,62 @@
+import functools
+import backtrader as bt
+import numpy as np
+import pytest
+from datetime import datetime
+from data.stream_loader import StreamingCSVLoader, DEFAULT_DTYPES
+from engine.analytics import RunningMetrics, compute_metrics
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+from benchmarks.synthetic import make_ohlcv
+
+PARAMS = {'lookback_days': 180, 'percentile_threshold': 0.3, 'profit_threshold': 0.05, 'max_loss_threshold': 0.05}
+START, END = datetime(2004, 1, 1), datetime(2011, 6, 30)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return make_ohlcv(3000, seed=5)
+
+
+def engine_for(data, tmp_path=None, points=None):
+    engine = BacktestEngine(mode='cerebro')
+    engine.set_strategy(PercentileStrategy, PARAMS)
+    if tmp_path is None:
+        engine.set_data(data)
+    else:
+        data.to_csv(tmp_path / 'bars.csv')
+        loader = StreamingCSVLoader(str(tmp_path), chunksize=500,
+                                    dtypes={name: 'float64' for name in DEFAULT_DTYPES})
+        engine.set_stream(functools.partial(loader.iter_bars, 'bars.csv'), lookback_bars=200,
+                          equity_points=points)
+    return engine
+
+
+@pytest.mark.parametrize('points', [64, 1001, 100000])
+def test_streaming_equity_is_bounded(data, tmp_path, points):
+    preloaded = engine_for(data).run(START, END)
+    streamed = engine_for(data, tmp_path, points).run(START, END)
+
+    assert len(preloaded['trades']) > 0
+    assert streamed['trades'] == preloaded['trades']
+    for name in ('final_value', 'total_return', 'max_drawdown', 'volatility', 'sharpe', 'sortino', 'round_trips'):
+        assert streamed[name] == pytest.approx(preloaded[name], rel=1e-9), name
+
+    equity = streamed['equity']
+    assert len(equity) <= points + 1
+    assert equity.iloc[-1] == preloaded['equity'].iloc[-1]
+    assert equity.index[-1] == preloaded['equity'].index[-1]
+    # 抽稀后的点都取自完整的资金曲线
+    full = preloaded['equity']
+    np.testing.assert_array_equal(equity.to_numpy(), full.reindex(equity.index).to_numpy())
+
+
+def test_running_metrics_match_compute_metrics(data):
+    values = 10000 * data['close'].to_numpy() / data['close'].iloc[0]
+    index = data.index
+    running = RunningMetrics(START)
+    for value, date in zip(values, index):
+        running.update(value, bt.date2num(date.to_pydatetime()))
+    expected = compute_metrics(values, index, [], values[0], START, END)
+    for name, value in running.metrics().items():
+        assert value == pytest.approx(expected[name], rel=1e-9), name
@@ -0,0 +1,60 @@
+import time
+import pytest
+from datetime import datetime
+from engine import session
+from engine.sweep_queue import SweepQueue, submit_sweep, run_worker, DONE
+from strategy.percentile_strategy import PercentileStrategy
+from conftest import DATA_DIR
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+PARAMS = [{'lookback_days': 180}, {'lookback_days': 365}]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    submit_sweep(path, DATA_DIR, PercentileStrategy, PARAMS, START, END, symbols=['baidu-sw'], mode='vectorized')
+    return path
+
+
+def test_rollback_journal(path):
+    queue = SweepQueue(path)
+    try:
+        assert queue.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    finally:
+        queue.close()
+
+
+def test_worker_completes_units(path):
+    stats = run_worker(path, wait=False)
+    assert stats == {'done': 2, 'failed': 0, 'duplicate': 0}
+    queue = SweepQueue(path)
+    try:
+        table = queue.results()
+        assert list(table['status']) == [DONE, DONE]
+        assert sorted(table['lookback_days']) == [180, 365]
+    finally:
+        queue.close()
+
+
+def test_lease_renewed_while_unit_runs(path, monkeypatch):
+    lease = 0.3
+    run = session.BacktestSession.run
+    stolen = []
+
+    def slow_run(self, *args, **kwargs):
+        # 单个单元运行超过数倍租约时长，期间其他进程不能领取
+        deadline = time.time() + 4 * lease
+        while time.time() < deadline:
+            other = SweepQueue(path, lease_seconds=lease)
+            try:
+                stolen.extend(other.claim('other', limit=10))
+            finally:
+                other.close()
+            time.sleep(lease / 2)
+        return run(self, *args, **kwargs)
+
+    monkeypatch.setattr(session.BacktestSession, 'run', slow_run)
+    stats = run_worker(path, worker='slow', batch=2, lease_seconds=lease, wait=False)
+    assert stolen == []
+    assert stats['done'] == 2
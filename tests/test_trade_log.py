@@ -0,0 +1,135 @@
+import logging
+import pandas as pd
+import pytest
+from datetime import datetime
+from config.strategy_config import STRATEGY_PARAMS
+from engine.backtest_engine import BacktestEngine
+from strategy import trade_log
+from strategy.percentile_strategy import PercentileStrategy
+from strategy.trade_log import TradeEvent, TradeLog, quiet_params
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+
+
+def run(mode, data, **params):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, dict(STRATEGY_PARAMS['PercentileStrategy'], **params))
+    engine.set_data(data)
+    return engine.run(START, END, use_cache=False)
+
+
+@pytest.fixture
+def formatted(monkeypatch):
+    """
+    统计 TradeEvent 被格式化的次数
+    """
+    calls = []
+    original = TradeEvent.__str__
+
+    def counting(event):
+        calls.append(event)
+        return original(event)
+    monkeypatch.setattr(TradeEvent, '__str__', counting)
+    return calls
+
+
+def fill(log, level=trade_log.INFO, k=0):
+    return log.record(level, datetime(2024, 1, 1 + k), trade_log.FILL, 'buy', 100 + k, 10.0 + k,
+                      value=1000.0, comm=1.0, ref=k)
+
+
+def test_events_below_level_are_dropped(formatted, caplog):
+    log = TradeLog(level=trade_log.WARNING)
+    assert not log.enabled(trade_log.INFO)
+    with caplog.at_level(logging.DEBUG, logger='strategy.trade_log'):
+        assert fill(log) is None
+    assert len(log) == 0 and formatted == [] and caplog.records == []
+
+    assert TradeLog(level=trade_log.OFF).record(trade_log.WARNING, datetime(2024, 1, 1), trade_log.FAIL,
+                                                 'buy', 1, 1.0) is None
+
+
+def test_recorded_events_are_formatted_lazily(formatted, caplog):
+    log = TradeLog(level=trade_log.DEBUG)
+    event = fill(log)
+    # logger 未启用 INFO 时只记录，不格式化
+    assert len(log) == 1 and formatted == []
+
+    with caplog.at_level(logging.INFO, logger='strategy.trade_log'):
+        fill(log, k=1)
+        log.record(trade_log.DEBUG, datetime(2024, 1, 3), trade_log.CREATE, 'sell', 5, 11.0)
+    # 只有 logger 启用的 INFO 事件被格式化（caplog 的各个 handler 各格式化一次）
+    assert formatted and all(e is log.events[1] for e in formatted)
+    assert caplog.messages == [str(log.events[1])]
+    assert str(event).startswith('2024-01-01 BUY EXECUTED, Price: 10.00, Size: 100')
+
+
+def test_engine_log_level_off_never_formats(baidu, formatted):
+    results = run('cerebro', baidu, log_level=trade_log.OFF)
+    assert len(results['events']) == 0
+    assert formatted == []
+    assert len(results['trades']) > 0
+
+
+def test_capacity_bounds_buffer():
+    log = TradeLog(level=trade_log.INFO, capacity=3)
+    for k in range(10):
+        fill(log, k=k)
+    assert len(log) == 3
+    assert [event.ref for event in log] == [7, 8, 9]
+
+
+def test_engine_log_capacity(baidu):
+    full = run('cerebro', baidu, log_level=trade_log.DEBUG)
+    bounded = run('cerebro', baidu, log_level=trade_log.DEBUG, log_capacity=10)
+    assert len(full['events']) > 10 and len(bounded['events']) == 10
+    # 订单编号是 backtrader 的全局计数，不参与比较
+    fields = [name for name in TradeEvent.FIELDS if name != 'ref']
+    assert ([[getattr(e, name) for name in fields] for e in bounded['events']]
+            == [[getattr(e, name) for name in fields] for e in full['events']][-10:])
+    assert bounded['trades'] == full['trades']
+
+
+def frame_roundtrip(log, read):
+    expected = log.to_frame()
+    loaded = read()
+    assert list(loaded.columns) == list(TradeEvent.FIELDS)
+    assert len(loaded) == len(expected)
+    loaded['dt'] = pd.to_datetime(loaded['dt'])
+    expected['dt'] = pd.to_datetime(expected['dt'])
+    for name in ('level', 'kind', 'side', 'size', 'price', 'comm', 'ref', 'close'):
+        pd.testing.assert_series_equal(loaded[name], expected[name], check_dtype=False, check_names=False)
+    pd.testing.assert_series_equal(loaded['dt'], expected['dt'], check_names=False, check_dtype=False)
+
+
+def test_csv_roundtrip(baidu, tmp_path):
+    log = run('cerebro', baidu, log_level=trade_log.DEBUG)['events']
+    path = tmp_path / 'events.csv'
+    log.to_csv(str(path))
+    frame_roundtrip(log, lambda: pd.read_csv(path))
+
+
+def test_parquet_roundtrip(baidu, tmp_path):
+    pytest.importorskip('pyarrow')
+    log = run('cerebro', baidu, log_level=trade_log.DEBUG)['events']
+    path = tmp_path / 'events.parquet'
+    log.to_parquet(str(path))
+    frame_roundtrip(log, lambda: pd.read_parquet(path))
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_trades_match_logged_fills(baidu, mode):
+    results = run(mode, baidu)
+    fills = results['events'].trades()
+    assert len(fills) == len(results['trades']) > 0
+    for logged, trade in zip(fills, results['trades']):
+        assert logged['side'] == trade['side']
+        assert abs(logged['size']) == abs(trade['size'])
+        assert logged['price'] == pytest.approx(trade['price'], rel=1e-12)
+        assert logged['comm'] == pytest.approx(trade['comm'], rel=1e-12)
+
+
+def test_quiet_params():
+    assert quiet_params(PercentileStrategy, {'lookback_days': 30}) == {'lookback_days': 30,
+                                                                       'log_level': trade_log.OFF}
+    assert quiet_params(PercentileStrategy, {'log_level': trade_log.INFO})['log_level'] == trade_log.INFO
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from engine.backtest_engine import BacktestEngine
+from strategy.percentile_strategy import PercentileStrategy
+from config.strategy_config import STRATEGY_PARAMS
+
+START, END = datetime(2022, 3, 22), datetime(2025, 6, 7)
+
+PARAM_SETS = [
+    {},
+    {'lookback_days': 180},
+    {'lookback_days': 90, 'percentile_threshold': 0.2, 'cooling_days': 0},
+    {'lookback_days': 365, 'percentile_threshold': 0.3, 'profit_threshold': 0.05, 'max_loss_threshold': 0.05},
+    {'lookback_days': 730, 'profit_threshold': 0.2, 'max_loss_threshold': 0.15, 'cooling_days': 10},
+]
+
+
+def run(mode, data, params, cash=None, commission=None, slippage=None):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, {**STRATEGY_PARAMS['PercentileStrategy'], **params})
+    engine.set_data(data)
+    if cash is not None:
+        engine.set_initial_cash(cash)
+    if commission is not None:
+        engine.set_commission(commission)
+    if slippage is not None:
+        engine.set_slippage(slippage)
+    return engine.run(START, END)
+
+
+def assert_same(cerebro, vectorized):
+    assert cerebro['trades']
+    assert vectorized['final_value'] == pytest.approx(cerebro['final_value'], rel=1e-9)
+    assert len(vectorized['trades']) == len(cerebro['trades'])
+    for a, b in zip(cerebro['trades'], vectorized['trades']):
+        assert a['datetime'] == b['datetime']
+        assert a['side'] == b['side']
+        assert a['size'] == b['size']
+        assert b['price'] == pytest.approx(a['price'], rel=1e-9)
+        assert b['comm'] == pytest.approx(a['comm'], rel=1e-9)
+    np.testing.assert_allclose(vectorized['equity'].to_numpy(), cerebro['equity'].to_numpy(), rtol=1e-9)
+
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_modes_match(baidu, params):
+    assert_same(run('cerebro', baidu, params, cash=30000), run('vectorized', baidu, params, cash=30000))
+
+
+@pytest.mark.parametrize('commission, slippage', [(0.0, 0.0), (0.01, 0.002)])
+def test_modes_match_with_costs(baidu, commission, slippage):
+    assert_same(run('cerebro', baidu, {}, commission=commission, slippage=slippage),
+                run('vectorized', baidu, {}, commission=commission, slippage=slippage))
+
+
+def test_default_initial_cash_matches(baidu):
+    cerebro, vectorized = run('cerebro', baidu, {}), run('vectorized', baidu, {})
+    assert cerebro['initial_value'] == vectorized['initial_value']
+    assert_same(cerebro, vectorized)
+
+
+@pytest.mark.parametrize('mode', ['cerebro', 'vectorized'])
+def test_engine_rerun_is_repeatable(baidu, mode):
+    engine = BacktestEngine(mode=mode)
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(baidu)
+    first = engine.run(START, END)
+    second = engine.run(START, END)
+    assert first['initial_value'] == second['initial_value'] == engine.initial_cash
+    for name in ('final_value', 'total_return', 'annual_return', 'max_drawdown', 'sharpe'):
+        assert second[name] == first[name], name
+    assert second['trades'] == first['trades']
+    np.testing.assert_array_equal(second['equity'].to_numpy(), first['equity'].to_numpy())
+
+
+def test_cerebro_runs_without_default_observers(baidu):
+    engine = BacktestEngine(mode='cerebro')
+    engine.set_strategy(PercentileStrategy, STRATEGY_PARAMS['PercentileStrategy'])
+    engine.set_data(baidu)
+    engine.run(START, END)
+    strategy = engine.cerebro.runstrats[0][0]
+    assert len(strategy.observers) == 0
@@ -0,0 +1,35 @@
+import pytest
+from engine.walkforward import WalkForward
+
+GRID = {'lookback_days': [90, 180], 'percentile_threshold': [0.3, 10]}
+
+
+@pytest.fixture(scope='module')
+def walk(baidu):
+    return WalkForward(baidu, param_grid=GRID, train_years=1, test_months=6, workers=1,
+                       commission=0.002, slippage=0.003)
+
+
+@pytest.fixture(scope='module')
+def result(walk):
+    return walk.run()
+
+
+def test_windows_keep_index_ranges(walk, result):
+    windows = list(walk.iter_windows())
+    assert len(windows) == len(result['windows']) > 1
+    for window in windows:
+        assert isinstance(window['train'], tuple) and isinstance(window['test'], tuple)
+        assert isinstance(window['train_metrics'], dict)
+
+
+def test_carried_value_pays_exit_costs(walk, result, baidu):
+    rows = result['windows']
+    assert (rows['liquidation_cost'] > 0).any()
+    # 每个测试窗口的初始资金为上一窗口期末价值减去平仓成本
+    cash = walk.initial_cash
+    for window, row in zip(walk.windows, rows.itertuples()):
+        begin, stop = window['test']
+        assert result['equity'].loc[baidu.index[begin]] == pytest.approx(cash)
+        cash = result['equity'].loc[baidu.index[stop - 1]] - row.liquidation_cost
+    assert result['final_value'] == pytest.approx(cash)
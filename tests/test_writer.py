@@ -0,0 +1,73 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+import backtrader as bt
+from engine.writer import ColumnarWriter
+from strategy.percentile_strategy import PercentileStrategy
+from strategy.trade_log import OFF
+
+
+def run(data, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=data))
+    cerebro.addstrategy(PercentileStrategy, log_level=OFF)
+    cerebro.addobserver(bt.observers.Broker)
+    cerebro.addwriter(ColumnarWriter, **kwargs)
+    cerebro.run()
+    return cerebro.runwriters[0]
+
+
+@pytest.fixture(scope='module')
+def reference(baidu):
+    return run(baidu).frame()
+
+
+def test_columns(baidu, reference):
+    assert len(reference) == len(baidu)
+    assert reference['data0.datetime'].dtype == 'datetime64[ns]'
+    np.testing.assert_array_equal(reference['data0.datetime'].to_numpy(), baidu.index.to_numpy(dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(reference['data0.close'].to_numpy(), baidu['close'].to_numpy(dtype=np.float64))
+    assert all(dtype == np.float64 for name, dtype in reference.dtypes.items() if name != 'data0.datetime')
+
+
+@pytest.mark.parametrize('background', [False, True])
+@pytest.mark.parametrize('chunk_size', [1, 7, 65536])
+def test_blocks(baidu, reference, background, chunk_size):
+    writer = run(baidu, background=background, chunk_size=chunk_size)
+    pd.testing.assert_frame_equal(writer.frame(), reference)
+    assert writer._thread is None
+
+
+@pytest.mark.parametrize('background', [False, True])
+@pytest.mark.parametrize('fmt', ['npz', 'csv'])
+def test_files(baidu, reference, tmp_path, background, fmt):
+    writer = run(baidu, format=fmt, directory=str(tmp_path), background=background, chunk_size=100)
+    writer.join()
+    if fmt == 'npz':
+        with np.load(writer.path) as saved:
+            frame = pd.DataFrame({name: saved[name] for name in writer.names})
+    else:
+        frame = pd.read_csv(writer.path, parse_dates=['data0.datetime'])
+        frame['data0.datetime'] = frame['data0.datetime'].astype('datetime64[ns]')
+    pd.testing.assert_frame_equal(frame, reference)
+
+
+def test_stop_does_not_wait_for_disk(baidu, tmp_path, monkeypatch):
+    gate, parts = threading.Event(), []
+    write_part = ColumnarWriter._write_part
+
+    def slow_write(self, chunk, sink):
+        gate.wait(10)
+        parts.append(len(chunk['data0.close']))
+        return write_part(self, chunk, sink)
+
+    monkeypatch.setattr(ColumnarWriter, '_write_part', slow_write)
+    writer = run(baidu, format='csv', directory=str(tmp_path), background=True, chunk_size=100)
+    # 运行已结束，后台线程仍在等待写文件
+    assert writer._thread.is_alive() and not parts
+    gate.set()
+    writer.join()
+    # 逐块追加写入
+    assert len(parts) > 1 and sum(parts) == len(baidu)
+    assert len(pd.read_csv(writer.path)) == len(baidu)
@@ -0,0 +1,97 @@
+import argparse
+from typing import Dict, Any
+from engine.walkforward import WalkForward
+from data.file_loader import FileDataLoader
+from config.strategy_config import STRATEGY_PARAMS
+from config.backtest_config import BACKTEST_PARAMS
+from optimize import parse_params
+
+
+def run_walk_forward(data_file: str, space: Dict[str, Any], train_years: int = 3, test_months: int = 6,
+                     step_months: int = None, n_iter: int = 0, seed: int = None, workers: int = None,
+                     sort_by: str = 'total_return', output: str = None, equity_output: str = None) -> Dict[str, Any]:
+    """
+    运行 PercentileStrategy 的滚动样本外检验
+    :param data_file: 数据文件路径
+    :param space: 参数空间
+    :param train_years: 训练窗口长度（年）
+    :param test_months: 测试窗口长度（月）
+    :param step_months: 滚动步长（月）
+    :param n_iter: 随机搜索次数，0 表示网格搜索
+    :param seed: 随机种子
+    :param workers: 进程数
+    :param sort_by: 选择参数所依据的训练指标
+    :param output: 各窗口结果保存路径 (.csv)
+    :param equity_output: 样本外资金曲线保存路径 (.csv)
+    :return: 检验结果
+    """
+    loader = FileDataLoader()
+    if data_file.endswith('.xlsx'):
+        data = loader.load_excel(data_file)
+    elif data_file.endswith('.csv'):
+        data = loader.load_csv(data_file)
+    else:
+        raise ValueError("不支持的文件格式，请使用 .xlsx 或 .csv 文件")
+
+    walk = WalkForward(
+        data,
+        param_grid=None if n_iter else space,
+        param_space=space if n_iter else None,
+        n_iter=n_iter,
+        seed=seed,
+        base_params=STRATEGY_PARAMS['PercentileStrategy'],
+        train_years=train_years,
+        test_months=test_months,
+        step_months=step_months,
+        sort_by=sort_by,
+        initial_cash=BACKTEST_PARAMS['initial_cash'],
+        workers=workers,
+    )
+
+    def progress(row):
+        print(f"[{row['window']}] {row['test_start']:%Y-%m-%d} 至 {row['test_end']:%Y-%m-%d} "
+              f"样本外收益率: {row['test_total_return']*100:.2f}%")
+
+    result = walk.run(callback=progress)
+    print("\n=== 滚动检验结果 ===")
+    print(result['windows'].to_string(index=False))
+    print(f"初始资金: {result['initial_value']:,.2f}")
+    print(f"最终资金: {result['final_value']:,.2f}")
+    print(f"样本外总收益率: {result['total_return']*100:.2f}%")
+    print(f"样本外最大回撤: {result['max_drawdown']*100:.2f}%")
+    if output:
+        result['windows'].to_csv(output, index=False)
+    if equity_output:
+        result['equity'].to_csv(equity_output)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PercentileStrategy 滚动样本外检验')
+    parser.add_argument('--data-file', default='baidu-sw.xlsx')
+    parser.add_argument('--param', action='append', default=[],
+                        help='name=v1,v2,... (候选值) 或 name=low:high (随机搜索区间)，可重复')
+    parser.add_argument('--train-years', type=int, default=3)
+    parser.add_argument('--test-months', type=int, default=6)
+    parser.add_argument('--step-months', type=int, default=None)
+    parser.add_argument('--random', type=int, default=0, help='随机搜索次数，默认网格搜索')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sort-by', default='total_return')
+    parser.add_argument('--output', default=None, help='各窗口结果 (.csv)')
+    parser.add_argument('--equity-output', default=None, help='样本外资金曲线 (.csv)')
+    args = parser.parse_args()
+
+    run_walk_forward(
+        data_file=args.data_file,
+        space=parse_params(args.param),
+        train_years=args.train_years,
+        test_months=args.test_months,
+        step_months=args.step_months,
+        n_iter=args.random,
+        seed=args.seed,
+        workers=args.workers,
+        sort_by=args.sort_by,
+        output=args.output,
+        equity_output=args.equity_output,
+    )